@@ -0,0 +1,264 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+from dataclasses import asdict
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+from benchmarks.data import Dataset, DatasetSize, generate_dataset
+from benchmarks.harness import BenchmarkResult, Operation, measure
+from benchmarks.scenarios import (
+    FixedRateProvider,
+    http_scenarios,
+    interactor_scenarios,
+    repository_scenarios,
+)
+from core.facade import AwesomeBitcoinService
+from core.interactors.admin_interactor import BitcoinServiceAdminInteractor
+from core.interactors.fee_provider import PercentageFeeProvider
+from core.interactors.tokens import HardCodedTokenValidator, RandomHexTokenProvider
+from core.interactors.transaction_interactor import BitcoinServiceTransactionInteractor
+from core.interactors.user_interactor import BitcoinServiceUserInteractor
+from core.interactors.wallet_interactor import BitcoinServiceWalletInteractor
+from infra.persistence.sqlite.db_setup import (
+    SqliteConnectionPool,
+    SqliteSettings,
+    create_db,
+)
+from infra.persistence.sqlite.group_commit import GroupCommitTransactionRepository
+from infra.persistence.sqlite.sqlite_transaction_repository import (
+    SqliteTransactionRepository,
+)
+from infra.persistence.sqlite.sqlite_user_repository import SqliteUserRepository
+from infra.persistence.sqlite.sqlite_wallet_repository import SqliteWalletRepository
+from runner.setup import (
+    ADMIN_TOKEN,
+    DB_READERS,
+    DB_SYNCHRONOUS,
+    DB_WRITERS,
+    FEE_PERCENTAGE,
+    GROUP_COMMIT_MAX_BATCH_SIZE,
+    GROUP_COMMIT_MAX_WAIT_US,
+    INITIAL_DEPOSIT,
+    MAX_WALLETS,
+    TOKEN_LENGTH_BYTES,
+    setup,
+)
+
+RESULTS_DIR: str = os.path.join("benchmarks", "results")
+
+
+def open_pool(db_path: str, synchronous: str) -> SqliteConnectionPool:
+    db = SqliteConnectionPool(
+        SqliteSettings(
+            db_path, synchronous=synchronous, readers=DB_READERS, writers=DB_WRITERS
+        )
+    )
+    with db.writer() as con:
+        create_db(con)
+        con.commit()
+    return db
+
+
+def populate(db: SqliteConnectionPool, size: DatasetSize, seed: int) -> Dataset:
+    return generate_dataset(
+        SqliteUserRepository(db),
+        SqliteWalletRepository(db),
+        SqliteTransactionRepository(db),
+        PercentageFeeProvider(FEE_PERCENTAGE),
+        size,
+        seed=seed,
+    )
+
+
+def build_service(db: SqliteConnectionPool) -> AwesomeBitcoinService:
+    user_repo = SqliteUserRepository(db)
+    wallet_repo = SqliteWalletRepository(db)
+    transaction_repo = SqliteTransactionRepository(db)
+    token_provider = RandomHexTokenProvider(TOKEN_LENGTH_BYTES)
+    return AwesomeBitcoinService(
+        BitcoinServiceUserInteractor(user_repo, token_provider),
+        BitcoinServiceWalletInteractor(
+            token_provider,
+            user_repo,
+            wallet_repo,
+            FixedRateProvider(),
+            INITIAL_DEPOSIT,
+            MAX_WALLETS,
+        ),
+        BitcoinServiceTransactionInteractor(
+            user_repo,
+            wallet_repo,
+            transaction_repo,
+            PercentageFeeProvider(FEE_PERCENTAGE),
+        ),
+        BitcoinServiceAdminInteractor(
+            HardCodedTokenValidator(ADMIN_TOKEN), transaction_repo
+        ),
+    )
+
+
+def run_scenarios(
+    level: str, scenarios: dict[str, Operation], args: argparse.Namespace
+) -> list[BenchmarkResult]:
+    results = []
+    for name, operation in scenarios.items():
+        result = measure(
+            name, level, operation, args.operations, args.concurrency, args.warmup
+        )
+        print(
+            f"{level:<10} {name:<24} {result.throughput:>10.1f} ops/s"
+            f" p50={result.p50_ms:.3f}ms p99={result.p99_ms:.3f}ms"
+        )
+        results.append(result)
+    return results
+
+
+def run_repository_level(
+    directory: str, size: DatasetSize, args: argparse.Namespace
+) -> list[BenchmarkResult]:
+    db = open_pool(os.path.join(directory, "repository.db"), args.synchronous)
+    direct = SqliteTransactionRepository(db)
+    grouped = GroupCommitTransactionRepository(
+        direct, GROUP_COMMIT_MAX_BATCH_SIZE, GROUP_COMMIT_MAX_WAIT_US
+    )
+    grouped.start()
+    try:
+        dataset = populate(db, size, args.seed)
+        scenarios = repository_scenarios(direct, grouped, dataset, args.seed)
+        return run_scenarios("repository", scenarios, args)
+    finally:
+        grouped.stop()
+        db.close()
+
+
+def run_interactor_level(
+    directory: str, size: DatasetSize, args: argparse.Namespace
+) -> list[BenchmarkResult]:
+    db = open_pool(os.path.join(directory, "interactor.db"), args.synchronous)
+    try:
+        dataset = populate(db, size, args.seed)
+        scenarios = interactor_scenarios(
+            build_service(db), dataset, ADMIN_TOKEN, args.seed
+        )
+        return run_scenarios("interactor", scenarios, args)
+    finally:
+        db.close()
+
+
+def run_http_level(
+    directory: str, size: DatasetSize, args: argparse.Namespace
+) -> list[BenchmarkResult]:
+    db_path = os.path.join(directory, "http.db")
+    db = open_pool(db_path, args.synchronous)
+    try:
+        dataset = populate(db, size, args.seed)
+    finally:
+        db.close()
+
+    with TestClient(setup(db_path, FixedRateProvider())) as client:
+        scenarios = http_scenarios(client, dataset, ADMIN_TOKEN, args.seed)
+        return run_scenarios("http", scenarios, args)
+
+
+def compare(results: list[BenchmarkResult], baseline_path: str) -> None:
+    with open(baseline_path) as file:
+        baseline = {
+            (result["level"], result["name"]): result
+            for result in json.load(file)["results"]
+        }
+
+    for result in results:
+        previous = baseline.get((result.level, result.name))
+        if previous is None or previous["throughput"] == 0:
+            continue
+        change = result.throughput / previous["throughput"] - 1
+        print(
+            f"{result.level:<10} {result.name:<24} throughput {change:+.1%}"
+            f" p99 {previous['p99_ms']:.3f}ms -> {result.p99_ms:.3f}ms"
+        )
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Measure throughput and latency of the service's hot paths",
+    )
+    parser.add_argument("--users", type=int, default=DatasetSize.users)
+    parser.add_argument(
+        "--wallets-per-user", type=int, default=DatasetSize.wallets_per_user
+    )
+    parser.add_argument("--transactions", type=int, default=DatasetSize.transactions)
+    parser.add_argument("--operations", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--synchronous",
+        choices=["OFF", "NORMAL", "FULL", "EXTRA"],
+        default=DB_SYNCHRONOUS,
+        help="SQLite sync mode, the http level follows DB_SYNCHRONOUS instead",
+    )
+    parser.add_argument(
+        "--levels",
+        nargs="+",
+        choices=["repository", "interactor", "http"],
+        default=["interactor", "http"],
+    )
+    parser.add_argument("--output", help="defaults to benchmarks/results/<time>.json")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str]) -> int:
+    args = parse_args(argv)
+    size = DatasetSize(args.users, args.wallets_per_user, args.transactions)
+    started_at = datetime.now(timezone.utc)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        if "repository" in args.levels:
+            results += run_repository_level(directory, size, args)
+        if "interactor" in args.levels:
+            results += run_interactor_level(directory, size, args)
+        if "http" in args.levels:
+            results += run_http_level(directory, size, args)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, started_at.strftime("%Y%m%dT%H%M%SZ.json")
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(
+            {
+                "started_at": started_at.isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "parameters": {
+                    "users": size.users,
+                    "wallets_per_user": size.wallets_per_user,
+                    "transactions": size.transactions,
+                    "operations": args.operations,
+                    "warmup": args.warmup,
+                    "concurrency": args.concurrency,
+                    "seed": args.seed,
+                    "synchronous": args.synchronous,
+                },
+                "results": [asdict(result) for result in results],
+            },
+            file,
+            indent=2,
+        )
+    print(f"results saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,76 @@
+import random
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from core.interactors.fee_provider import FeeProvider
+from core.models.transaction import Transaction
+from core.models.user import User
+from core.models.wallet import Wallet
+from core.repositories.transaction_repository import TransactionRepository
+from core.repositories.user_repository import UserRepository
+from core.repositories.wallet_repository import WalletRepository
+
+
+@dataclass(frozen=True)
+class DatasetSize:
+    users: int = 100
+    wallets_per_user: int = 3
+    transactions: int = 10_000
+
+
+@dataclass
+class Dataset:
+    user_tokens: list[str] = field(default_factory=list)
+    wallet_addresses: list[str] = field(default_factory=list)
+    owners: dict[str, str] = field(default_factory=dict)
+
+
+def generate_dataset(
+    user_repo: UserRepository,
+    wallet_repo: WalletRepository,
+    transaction_repo: TransactionRepository,
+    fee_provider: FeeProvider,
+    size: DatasetSize,
+    initial_balance: Decimal = Decimal(1_000_000),
+    seed: int = 0,
+    batch_size: int = 1000,
+) -> Dataset:
+    rng = random.Random(seed)
+    dataset = Dataset()
+
+    for index in range(size.users):
+        token = rng.randbytes(16).hex()
+        if not user_repo.create_user(User(f"bench-user-{index}", token)):
+            raise RuntimeError(f"Could not create benchmark user {index}")
+        dataset.user_tokens.append(token)
+
+        for _ in range(size.wallets_per_user):
+            address = rng.randbytes(16).hex()
+            if not wallet_repo.create_wallet(Wallet(address, initial_balance, token)):
+                raise RuntimeError(f"Could not create benchmark wallet {address}")
+            dataset.wallet_addresses.append(address)
+            dataset.owners[address] = token
+
+    if len(dataset.wallet_addresses) < 2:
+        return dataset
+
+    for start in range(0, size.transactions, batch_size):
+        count = min(batch_size, size.transactions - start)
+        batch = [random_transaction(rng, dataset, fee_provider) for _ in range(count)]
+        if not all(transaction_repo.transfer_many(batch, atomic=False)):
+            raise RuntimeError("Benchmark wallets ran out of balance")
+
+    return dataset
+
+
+def random_transaction(
+    rng: random.Random, dataset: Dataset, fee_provider: FeeProvider
+) -> Transaction:
+    source, destination = rng.sample(dataset.wallet_addresses, 2)
+    amount = Decimal(rng.randint(1, 10_000)) / 10_000
+    fee = (
+        fee_provider.provide(amount)
+        if dataset.owners[source] != dataset.owners[destination]
+        else Decimal(0)
+    )
+    return Transaction(source, destination, fee, amount)
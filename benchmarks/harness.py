@@ -0,0 +1,65 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+Operation = Callable[[int], None]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    level: str
+    operations: int
+    concurrency: int
+    seconds: float
+    throughput: float
+    p50_ms: float
+    p99_ms: float
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+
+    ordered = sorted(samples)
+    rank = math.ceil(fraction * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def measure(
+    name: str,
+    level: str,
+    operation: Operation,
+    operations: int,
+    concurrency: int = 1,
+    warmup: int = 0,
+    clock: Callable[[], float] = time.perf_counter,
+) -> BenchmarkResult:
+    for index in range(warmup):
+        operation(index)
+
+    def timed(index: int) -> float:
+        start = clock()
+        operation(warmup + index)
+        return clock() - start
+
+    started = clock()
+    if concurrency == 1:
+        latencies = [timed(index) for index in range(operations)]
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(timed, range(operations)))
+    elapsed = clock() - started
+
+    return BenchmarkResult(
+        name,
+        level,
+        operations,
+        concurrency,
+        elapsed,
+        operations / elapsed if elapsed > 0 else 0.0,
+        percentile(latencies, 0.50) * 1000,
+        percentile(latencies, 0.99) * 1000,
+    )
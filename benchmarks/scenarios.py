@@ -0,0 +1,146 @@
+import random
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+
+from benchmarks.data import Dataset
+from benchmarks.harness import Operation
+from core.facade import AwesomeBitcoinService
+from core.interactors.admin_interactor import AdminStatus
+from core.interactors.transaction_interactor import TransactionStatus
+from core.interactors.wallet_interactor import WalletStatus
+from core.models.transaction import Transaction
+from core.repositories.transaction_repository import TransactionRepository
+
+TRANSFER_AMOUNT: Decimal = Decimal("0.0001")
+HISTORY_PAGE_SIZE: int = 100
+PICKS: int = 4096
+
+
+class FixedRateProvider:
+    def __init__(self, rate: Decimal = Decimal(20_000)):
+        self._rate = rate
+
+    def fetch(self) -> Decimal | None:
+        return self._rate
+
+
+def expect(name: str, actual: object, expected: object) -> None:
+    if actual != expected:
+        raise RuntimeError(f"{name} returned {actual}, expected {expected}")
+
+
+def pick_transfers(dataset: Dataset, seed: int) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    transfers = []
+    for _ in range(PICKS):
+        source, destination = rng.sample(dataset.wallet_addresses, 2)
+        transfers.append((source, destination))
+    return transfers
+
+
+def interactor_scenarios(
+    service: AwesomeBitcoinService, dataset: Dataset, admin_token: str, seed: int = 0
+) -> dict[str, Operation]:
+    transfers = pick_transfers(dataset, seed)
+    users = dataset.user_tokens
+
+    def do_transaction(index: int) -> None:
+        source, destination = transfers[index % PICKS]
+        response = service.transaction_interactor.do_transaction(
+            source, destination, dataset.owners[source], TRANSFER_AMOUNT
+        )
+        expect("do_transaction", response.status, TransactionStatus.SUCCESS)
+
+    def get_wallet(index: int) -> None:
+        address = transfers[index % PICKS][0]
+        response = service.wallet_interactor.get_wallet(
+            address, dataset.owners[address]
+        )
+        expect("get_wallet", response.status, WalletStatus.SUCCESS)
+
+    def get_user_transactions(index: int) -> None:
+        response = service.transaction_interactor.get_transactions(
+            users[index % len(users)], HISTORY_PAGE_SIZE
+        )
+        expect("get_user_transactions", response.status, TransactionStatus.SUCCESS)
+
+    def get_statistics(index: int) -> None:
+        response = service.admin_interactor.get_statistics(admin_token)
+        expect("get_statistics", response.status, AdminStatus.SUCCESS)
+
+    return {
+        "do_transaction": do_transaction,
+        "get_wallet": get_wallet,
+        "get_user_transactions": get_user_transactions,
+        "get_statistics": get_statistics,
+    }
+
+
+def repository_scenarios(
+    direct: TransactionRepository,
+    grouped: TransactionRepository,
+    dataset: Dataset,
+    seed: int = 0,
+) -> dict[str, Operation]:
+    transfers = pick_transfers(dataset, seed)
+
+    def transfer_with(repo: TransactionRepository, name: str) -> Operation:
+        def transfer(index: int) -> None:
+            source, destination = transfers[index % PICKS]
+            succeeded = repo.transfer(
+                Transaction(source, destination, Decimal(0), TRANSFER_AMOUNT)
+            )
+            expect(name, succeeded, True)
+
+        return transfer
+
+    return {
+        "transfer": transfer_with(direct, "transfer"),
+        "transfer_group_commit": transfer_with(grouped, "transfer_group_commit"),
+    }
+
+
+def http_scenarios(
+    client: TestClient, dataset: Dataset, admin_token: str, seed: int = 0
+) -> dict[str, Operation]:
+    transfers = pick_transfers(dataset, seed)
+    users = dataset.user_tokens
+
+    def do_transaction(index: int) -> None:
+        source, destination = transfers[index % PICKS]
+        response = client.post(
+            "/transactions",
+            json={
+                "token": dataset.owners[source],
+                "from_wallet": source,
+                "to_wallet": destination,
+                "amount": str(TRANSFER_AMOUNT),
+            },
+        )
+        expect("POST /transactions", response.status_code, 200)
+
+    def get_wallet(index: int) -> None:
+        address = transfers[index % PICKS][0]
+        response = client.get(
+            f"/wallets/{address}", params={"token": dataset.owners[address]}
+        )
+        expect("GET /wallets/{address}", response.status_code, 200)
+
+    def get_user_transactions(index: int) -> None:
+        response = client.get(
+            "/transactions",
+            params={"token": users[index % len(users)], "limit": HISTORY_PAGE_SIZE},
+        )
+        expect("GET /transactions", response.status_code, 200)
+
+    def get_statistics(index: int) -> None:
+        response = client.get("/statistics", params={"token": admin_token})
+        expect("GET /statistics", response.status_code, 200)
+
+    return {
+        "do_transaction": do_transaction,
+        "get_wallet": get_wallet,
+        "get_user_transactions": get_user_transactions,
+        "get_statistics": get_statistics,
+    }
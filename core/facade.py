@@ -1,16 +1,32 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Protocol
+from typing import Any, Callable, Protocol, TypeVar
 
-from core.interactors.admin_interactor import AdminInteractor, AdminResponse
+from core.interactors.admin_interactor import (
+    AdminInteractor,
+    AdminResponse,
+    ExportResponse,
+    WindowResponse,
+)
 from core.interactors.transaction_interactor import (
     TransactionInteractor,
     TransactionResponse,
+    TransferRequest,
 )
 from core.interactors.user_interactor import UserInteractor, UserResponse
-from core.interactors.wallet_interactor import WalletInteractor, WalletResponse
+from core.interactors.wallet_interactor import (
+    WalletInteractor,
+    WalletResponse,
+    WalletsResponse,
+)
 from core.models.transaction import Transaction
 
+R = TypeVar("R")
+
 
 class BitcoinService(Protocol):
     def register_user(self, username: str) -> UserResponse:
@@ -22,22 +38,49 @@ class BitcoinService(Protocol):
     def get_wallet(self, token: str, address: str) -> WalletResponse:
         pass
 
+    def get_wallets(self, token: str) -> WalletsResponse:
+        pass
+
     def perform_transaction(
-        self, token: str, from_address: str, to_address: str, amount: Decimal
+        self,
+        token: str,
+        from_address: str,
+        to_address: str,
+        amount: Decimal,
+        idempotency_key: str | None = None,
     ) -> TransactionResponse[Transaction | None]:
         pass
 
-    def get_transactions(self, token: str) -> TransactionResponse[list[Transaction]]:
+    def perform_transactions(
+        self, token: str, transfers: list[TransferRequest], atomic: bool
+    ) -> list[TransactionResponse[Transaction | None]]:
+        pass
+
+    def get_transactions(
+        self, token: str, limit: int | None = None, after_id: int = 0
+    ) -> TransactionResponse[list[Transaction]]:
         pass
 
     def get_wallet_transactions(
-        self, token: str, address: str
+        self, token: str, address: str, limit: int | None = None, after_id: int = 0
     ) -> TransactionResponse[list[Transaction]]:
         pass
 
     def get_statistics(self, token: str) -> AdminResponse:
         pass
 
+    def get_window_statistics(self, token: str, minutes: int) -> WindowResponse:
+        pass
+
+    def export_transactions(
+        self,
+        token: str,
+        wallet_address: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> ExportResponse:
+        pass
+
 
 @dataclass
 class AwesomeBitcoinService:
@@ -55,20 +98,211 @@ class AwesomeBitcoinService:
     def get_wallet(self, token: str, address: str) -> WalletResponse:
         return self.wallet_interactor.get_wallet(address, token)
 
+    def get_wallets(self, token: str) -> WalletsResponse:
+        return self.wallet_interactor.get_wallets(token)
+
     def perform_transaction(
-        self, token: str, from_address: str, to_address: str, amount: Decimal
+        self,
+        token: str,
+        from_address: str,
+        to_address: str,
+        amount: Decimal,
+        idempotency_key: str | None = None,
     ) -> TransactionResponse[Transaction | None]:
         return self.transaction_interactor.do_transaction(
-            from_address, to_address, token, amount
+            from_address, to_address, token, amount, idempotency_key
         )
 
-    def get_transactions(self, token: str) -> TransactionResponse[list[Transaction]]:
-        return self.transaction_interactor.get_transactions(token)
+    def perform_transactions(
+        self, token: str, transfers: list[TransferRequest], atomic: bool
+    ) -> list[TransactionResponse[Transaction | None]]:
+        return self.transaction_interactor.do_transactions(transfers, token, atomic)
+
+    def get_transactions(
+        self, token: str, limit: int | None = None, after_id: int = 0
+    ) -> TransactionResponse[list[Transaction]]:
+        return self.transaction_interactor.get_transactions(token, limit, after_id)
 
     def get_wallet_transactions(
-        self, token: str, address: str
+        self, token: str, address: str, limit: int | None = None, after_id: int = 0
     ) -> TransactionResponse[list[Transaction]]:
-        return self.transaction_interactor.get_transactions_by_wallet(address, token)
+        return self.transaction_interactor.get_transactions_by_wallet(
+            address, token, limit, after_id
+        )
 
     def get_statistics(self, token: str) -> AdminResponse:
         return self.admin_interactor.get_statistics(token)
+
+    def get_window_statistics(self, token: str, minutes: int) -> WindowResponse:
+        return self.admin_interactor.get_window_statistics(token, minutes)
+
+    def export_transactions(
+        self,
+        token: str,
+        wallet_address: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> ExportResponse:
+        return self.admin_interactor.export_transactions(
+            token, wallet_address, since, until
+        )
+
+
+class AsyncBitcoinService(Protocol):
+    async def register_user(self, username: str) -> UserResponse:
+        pass
+
+    async def create_wallet(self, token: str) -> WalletResponse:
+        pass
+
+    async def get_wallet(self, token: str, address: str) -> WalletResponse:
+        pass
+
+    async def get_wallets(self, token: str) -> WalletsResponse:
+        pass
+
+    async def perform_transaction(
+        self,
+        token: str,
+        from_address: str,
+        to_address: str,
+        amount: Decimal,
+        idempotency_key: str | None = None,
+    ) -> TransactionResponse[Transaction | None]:
+        pass
+
+    async def perform_transactions(
+        self, token: str, transfers: list[TransferRequest], atomic: bool
+    ) -> list[TransactionResponse[Transaction | None]]:
+        pass
+
+    async def get_transactions(
+        self, token: str, limit: int | None = None, after_id: int = 0
+    ) -> TransactionResponse[list[Transaction]]:
+        pass
+
+    async def get_wallet_transactions(
+        self, token: str, address: str, limit: int | None = None, after_id: int = 0
+    ) -> TransactionResponse[list[Transaction]]:
+        pass
+
+    async def get_statistics(self, token: str) -> AdminResponse:
+        pass
+
+    async def get_window_statistics(self, token: str, minutes: int) -> WindowResponse:
+        pass
+
+    async def export_transactions(
+        self,
+        token: str,
+        wallet_address: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> ExportResponse:
+        pass
+
+
+class ExecutorBitcoinService:
+    def __init__(
+        self,
+        service: BitcoinService,
+        max_workers: int,
+        transfer_workers: int | None = None,
+    ):
+        self._service = service
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="bitcoin-service"
+        )
+        # Transfers waiting on a group commit hold their thread, a pool of their
+        # own lets a full batch queue up without starving reads
+        self._transfer_executor = (
+            self._executor
+            if transfer_workers is None
+            else ThreadPoolExecutor(
+                max_workers=transfer_workers, thread_name_prefix="bitcoin-transfer"
+            )
+        )
+
+    def shutdown(self) -> None:
+        self._transfer_executor.shutdown(wait=True)
+        self._executor.shutdown(wait=True)
+
+    async def register_user(self, username: str) -> UserResponse:
+        return await self._run(self._service.register_user, username)
+
+    async def create_wallet(self, token: str) -> WalletResponse:
+        return await self._run(self._service.create_wallet, token)
+
+    async def get_wallet(self, token: str, address: str) -> WalletResponse:
+        return await self._run(self._service.get_wallet, token, address)
+
+    async def get_wallets(self, token: str) -> WalletsResponse:
+        return await self._run(self._service.get_wallets, token)
+
+    async def perform_transaction(
+        self,
+        token: str,
+        from_address: str,
+        to_address: str,
+        amount: Decimal,
+        idempotency_key: str | None = None,
+    ) -> TransactionResponse[Transaction | None]:
+        return await self._run_transfer(
+            self._service.perform_transaction,
+            token,
+            from_address,
+            to_address,
+            amount,
+            idempotency_key,
+        )
+
+    async def perform_transactions(
+        self, token: str, transfers: list[TransferRequest], atomic: bool
+    ) -> list[TransactionResponse[Transaction | None]]:
+        return await self._run_transfer(
+            self._service.perform_transactions, token, transfers, atomic
+        )
+
+    async def get_transactions(
+        self, token: str, limit: int | None = None, after_id: int = 0
+    ) -> TransactionResponse[list[Transaction]]:
+        return await self._run(self._service.get_transactions, token, limit, after_id)
+
+    async def get_wallet_transactions(
+        self, token: str, address: str, limit: int | None = None, after_id: int = 0
+    ) -> TransactionResponse[list[Transaction]]:
+        return await self._run(
+            self._service.get_wallet_transactions, token, address, limit, after_id
+        )
+
+    async def get_statistics(self, token: str) -> AdminResponse:
+        return await self._run(self._service.get_statistics, token)
+
+    async def get_window_statistics(self, token: str, minutes: int) -> WindowResponse:
+        return await self._run(self._service.get_window_statistics, token, minutes)
+
+    async def export_transactions(
+        self,
+        token: str,
+        wallet_address: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> ExportResponse:
+        return await self._run(
+            self._service.export_transactions, token, wallet_address, since, until
+        )
+
+    async def _run(self, function: Callable[..., R], *args: Any) -> R:
+        return await self._run_in(self._executor, function, *args)
+
+    async def _run_transfer(self, function: Callable[..., R], *args: Any) -> R:
+        return await self._run_in(self._transfer_executor, function, *args)
+
+    async def _run_in(
+        self, executor: ThreadPoolExecutor, function: Callable[..., R], *args: Any
+    ) -> R:
+        # run_in_executor does not carry context variables over on its own
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, functools.partial(context.run, function, *args)
+        )
@@ -1,9 +1,11 @@
 from dataclasses import dataclass
-from decimal import Decimal
 from enum import Enum
-from typing import Protocol
+from typing import Iterator, Protocol
 
+from core.interactors.rolling_statistics import RollingStatistics
 from core.interactors.tokens import TokenValidator
+from core.models.statistics import Statistics, WindowStatistics
+from core.models.transaction import Transaction
 from core.repositories.transaction_repository import TransactionRepository
 
 
@@ -13,37 +15,80 @@ class AdminStatus(Enum):
 
 
 @dataclass
-class Statistics:
-    profit: Decimal = Decimal("0")
-    transaction_count: int = 0
+class AdminResponse:
+    status: AdminStatus
+    statistics: Statistics | None
 
 
 @dataclass
-class AdminResponse:
+class WindowResponse:
     status: AdminStatus
-    statistics: Statistics | None
+    statistics: WindowStatistics | None
+
+
+@dataclass
+class ExportResponse:
+    status: AdminStatus
+    transactions: Iterator[Transaction] | None
 
 
 class AdminInteractor(Protocol):
     def get_statistics(self, admin_token: str) -> AdminResponse:
         pass
 
+    def get_window_statistics(self, admin_token: str, minutes: int) -> WindowResponse:
+        pass
+
+    def export_transactions(
+        self,
+        admin_token: str,
+        wallet_address: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> ExportResponse:
+        pass
+
 
 class BitcoinServiceAdminInteractor:
     def __init__(
-        self, token_validator: TokenValidator, transaction_repo: TransactionRepository
+        self,
+        token_validator: TokenValidator,
+        transaction_repo: TransactionRepository,
+        rolling_statistics: RollingStatistics | None = None,
     ):
         self._token_validator = token_validator
         self._transaction_repo = transaction_repo
+        self._rolling_statistics = rolling_statistics or RollingStatistics(
+            transaction_repo
+        )
 
     def get_statistics(self, admin_token: str) -> AdminResponse:
         if not self._token_validator.validate_token(admin_token):
             return AdminResponse(AdminStatus.UNAUTHORIZED, None)
 
-        stats = Statistics()
+        return AdminResponse(
+            AdminStatus.SUCCESS, self._transaction_repo.get_statistics()
+        )
 
-        for transaction in self._transaction_repo.get_all_transactions():
-            stats.transaction_count += 1
-            stats.profit += transaction.fee
+    def get_window_statistics(self, admin_token: str, minutes: int) -> WindowResponse:
+        if not self._token_validator.validate_token(admin_token):
+            return WindowResponse(AdminStatus.UNAUTHORIZED, None)
+
+        return WindowResponse(
+            AdminStatus.SUCCESS, self._rolling_statistics.window(minutes)
+        )
+
+    def export_transactions(
+        self,
+        admin_token: str,
+        wallet_address: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> ExportResponse:
+        if not self._token_validator.validate_token(admin_token):
+            return ExportResponse(AdminStatus.UNAUTHORIZED, None)
 
-        return AdminResponse(AdminStatus.SUCCESS, stats)
+        return ExportResponse(
+            AdminStatus.SUCCESS,
+            self._transaction_repo.iter_transactions(wallet_address, since, until),
+        )
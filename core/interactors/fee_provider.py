@@ -1,10 +1,27 @@
-from dataclasses import dataclass
-from decimal import Decimal
-from typing import Protocol
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Callable, Protocol
+
+from core.models.bitcoin import SATOSHI, from_satoshis, to_satoshis
+
+logger = logging.getLogger(__name__)
 
 
 class FeeProvider(Protocol):
-    def provide(self, transaction_amount: Decimal) -> Decimal:
+    def provide(
+        self, transaction_amount: Decimal, username: str | None = None
+    ) -> Decimal:
+        pass
+
+    def provide_many(
+        self, transaction_amounts: list[Decimal], username: str | None = None
+    ) -> list[Decimal]:
         pass
 
 
@@ -12,5 +29,144 @@ class FeeProvider(Protocol):
 class PercentageFeeProvider:
     fee_ratio: Decimal
 
-    def provide(self, transaction_amount: Decimal) -> Decimal:
-        return transaction_amount * self.fee_ratio
+    def provide(
+        self, transaction_amount: Decimal, username: str | None = None
+    ) -> Decimal:
+        fee = transaction_amount * self.fee_ratio
+        return fee.quantize(SATOSHI, rounding=ROUND_HALF_UP)
+
+    def provide_many(
+        self, transaction_amounts: list[Decimal], username: str | None = None
+    ) -> list[Decimal]:
+        return [self.provide(amount) for amount in transaction_amounts]
+
+
+@dataclass(frozen=True)
+class FeeTable:
+    # Tier i covers amounts from breakpoints[i] up to the next breakpoint
+    breakpoints: list[int]
+    rates: list[Decimal]
+    fixed: list[int]
+    minimum: int = 0
+    maximum: int | None = None
+
+    def fee(self, amount: int) -> int:
+        tier = bisect_right(self.breakpoints, amount) - 1
+        fee = int((amount * self.rates[tier]).to_integral_value(rounding=ROUND_HALF_UP))
+        fee = max(fee + self.fixed[tier], self.minimum)
+        return fee if self.maximum is None else min(fee, self.maximum)
+
+
+@dataclass(frozen=True)
+class FeeSchedule:
+    default: FeeTable
+    users: dict[str, FeeTable] = field(default_factory=dict)
+
+    # Overrides are keyed by username, bearer tokens never belong in the file
+    def table(self, username: str | None) -> FeeTable:
+        if username is None:
+            return self.default
+        return self.users.get(username, self.default)
+
+
+def compile_fee_table(
+    document: dict[str, Any], defaults: FeeTable | None = None
+) -> FeeTable:
+    if "tiers" not in document:
+        if defaults is None:
+            raise ValueError("Fee schedule has no tiers")
+        breakpoints, rates, fixed = defaults.breakpoints, defaults.rates, defaults.fixed
+    else:
+        tiers = sorted(
+            (
+                to_satoshis(Decimal(tier["from"])),
+                Decimal(tier["rate"]),
+                to_satoshis(Decimal(tier.get("fixed", "0"))),
+            )
+            for tier in document["tiers"]
+        )
+        breakpoints = [start for start, _, _ in tiers]
+        if not breakpoints or breakpoints[0] != 0:
+            raise ValueError("The first fee tier must start at 0")
+        if len(set(breakpoints)) != len(breakpoints):
+            raise ValueError("Fee tiers must start at distinct amounts")
+        rates = [rate for _, rate, _ in tiers]
+        fixed = [amount for _, _, amount in tiers]
+
+    minimum = (
+        to_satoshis(Decimal(document["minimum"]))
+        if "minimum" in document
+        else 0 if defaults is None else defaults.minimum
+    )
+    maximum = (
+        to_satoshis(Decimal(document["maximum"]))
+        if document.get("maximum") is not None
+        else None if defaults is None else defaults.maximum
+    )
+    if maximum is not None and maximum < minimum:
+        raise ValueError("Fee maximum is below the minimum")
+    return FeeTable(breakpoints, rates, fixed, minimum, maximum)
+
+
+def compile_fee_schedule(document: dict[str, Any]) -> FeeSchedule:
+    default = compile_fee_table(document)
+    # Overrides inherit whatever they leave out from the default table
+    users = {
+        username: compile_fee_table(override, default)
+        for username, override in document.get("users", {}).items()
+    }
+    return FeeSchedule(default, users)
+
+
+def load_fee_schedule(path: str) -> FeeSchedule:
+    with open(path) as file:
+        # Decimal floats keep amounts like 0.015 exact
+        return compile_fee_schedule(json.load(file, parse_float=Decimal))
+
+
+class ScheduleFeeProvider:
+    def __init__(
+        self,
+        path: str,
+        reload_interval_seconds: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._path = path
+        self._reload_interval = reload_interval_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # A broken schedule at startup fails loudly, later ones are skipped
+        self._modified_at = os.stat(path).st_mtime_ns
+        self._schedule = load_fee_schedule(path)
+        self._checked_at = clock()
+
+    def provide(
+        self, transaction_amount: Decimal, username: str | None = None
+    ) -> Decimal:
+        return self.provide_many([transaction_amount], username)[0]
+
+    def provide_many(
+        self, transaction_amounts: list[Decimal], username: str | None = None
+    ) -> list[Decimal]:
+        table = self._current().table(username)
+        return [
+            from_satoshis(table.fee(to_satoshis(amount)))
+            for amount in transaction_amounts
+        ]
+
+    def _current(self) -> FeeSchedule:
+        with self._lock:
+            now = self._clock()
+            if now - self._checked_at < self._reload_interval:
+                return self._schedule
+            self._checked_at = now
+
+            try:
+                modified_at = os.stat(self._path).st_mtime_ns
+                if modified_at != self._modified_at:
+                    # Recorded first so a broken edit is reported once, not per check
+                    self._modified_at = modified_at
+                    self._schedule = load_fee_schedule(self._path)
+            except (OSError, ValueError, KeyError, TypeError, ArithmeticError):
+                logger.exception("Keeping the previous fee schedule")
+            return self._schedule
@@ -1,6 +1,8 @@
+import threading
+import time
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Protocol
+from typing import Callable, Protocol
 
 import requests
 
@@ -13,10 +15,11 @@ class RateProvider(Protocol):
 @dataclass
 class GeckoRateProvider:
     url: str
+    timeout_seconds: float = 5
 
     def fetch(self) -> Decimal | None:
         try:
-            response = requests.get(self.url)
+            response = requests.get(self.url, timeout=self.timeout_seconds)
             if response.status_code == 200:
                 data = response.json()
                 rate = data["bitcoin"]["usd"]
@@ -26,5 +29,110 @@ class GeckoRateProvider:
                 return Decimal(rate)
             return None
 
-        except RuntimeError:
+        except (RuntimeError, requests.RequestException):
             return None
+
+
+@dataclass
+class RateCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    failures: int = 0
+
+
+class CachingRateProvider:
+    def __init__(
+        self,
+        provider: RateProvider,
+        ttl_seconds: float,
+        max_staleness_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._provider = provider
+        self._ttl = ttl_seconds
+        self._max_staleness = max_staleness_seconds
+        self._clock = clock
+
+        self._rate: Decimal | None = None
+        self._fetched_at = 0.0
+        self._attempts = 0
+        self._stats = RateCacheStats()
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+
+        self._stopped = threading.Event()
+        self._refresher: threading.Thread | None = None
+
+    @property
+    def stats(self) -> RateCacheStats:
+        with self._lock:
+            return RateCacheStats(
+                self._stats.hits,
+                self._stats.misses,
+                self._stats.stale,
+                self._stats.failures,
+            )
+
+    def fetch(self) -> Decimal | None:
+        with self._lock:
+            rate, attempts = self._rate, self._attempts
+            age = self._clock() - self._fetched_at
+            if rate is not None and age < self._ttl:
+                self._stats.hits += 1
+                return rate
+            if rate is not None and age < self._max_staleness:
+                self._stats.stale += 1
+                return rate
+            self._stats.misses += 1
+
+        return self._refresh(seen_attempts=attempts)
+
+    def refresh(self) -> Decimal | None:
+        return self._refresh(seen_attempts=None)
+
+    def start(self) -> None:
+        if self._refresher is not None:
+            return
+
+        self._stopped.clear()
+        self._refresher = threading.Thread(
+            target=self._refresh_periodically, name="rate-refresher", daemon=True
+        )
+        self._refresher.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
+
+    def _refresh_periodically(self) -> None:
+        while not self._stopped.is_set():
+            self.refresh()
+            self._stopped.wait(self._ttl)
+
+    def _refresh(self, seen_attempts: int | None) -> Decimal | None:
+        with self._fetch_lock:
+            # Another caller asked upstream while we were waiting for the lock,
+            # its answer stands even when it failed, so an outage costs one timeout
+            if seen_attempts is not None and self._attempts != seen_attempts:
+                with self._lock:
+                    return self._usable_rate()
+
+            rate = self._provider.fetch()
+
+            with self._lock:
+                self._attempts += 1
+                if rate is None:
+                    self._stats.failures += 1
+                    return self._usable_rate()
+
+                self._rate = rate
+                self._fetched_at = self._clock()
+                return rate
+
+    def _usable_rate(self) -> Decimal | None:
+        if self._clock() - self._fetched_at < self._max_staleness:
+            return self._rate
+        return None
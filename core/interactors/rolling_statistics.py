@@ -0,0 +1,154 @@
+import math
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from decimal import Decimal
+from typing import Callable
+
+from core.models.bitcoin import from_satoshis
+from core.models.statistics import (
+    ROLLUP_RETENTION_MINUTES,
+    MinuteStatistics,
+    WindowStatistics,
+    bucket_size,
+)
+from core.repositories.transaction_repository import TransactionRepository
+
+# Transfers committed this late may still land in these minutes, so they are
+# read again on every request instead of being cached
+OPEN_MINUTES = 2
+# Spare slots let a window slide this far before its oldest minutes are reused
+SPARE_MINUTES = 60
+
+
+@dataclass
+class WindowTotals:
+    first_minute: int
+    last_minute: int
+    volume: Decimal = Decimal("0")
+    profit: Decimal = Decimal("0")
+    transaction_count: int = 0
+    sizes: Counter[int] = field(default_factory=Counter)
+
+    def add(self, minute: MinuteStatistics) -> None:
+        self.volume += minute.volume
+        self.profit += minute.profit
+        self.transaction_count += minute.transaction_count
+        self.sizes.update(minute.sizes)
+
+    def subtract(self, minute: MinuteStatistics) -> None:
+        self.volume -= minute.volume
+        self.profit -= minute.profit
+        self.transaction_count -= minute.transaction_count
+        self.sizes.subtract(minute.sizes)
+
+    def copy(self) -> "WindowTotals":
+        return replace(self, sizes=Counter(self.sizes))
+
+
+def percentile(sizes: Counter[int], fraction: float) -> Decimal | None:
+    total = sum(sizes.values())
+    if total == 0:
+        return None
+
+    rank = max(math.ceil(total * fraction), 1)
+    seen = 0
+    for bucket in sorted(sizes):
+        seen += sizes[bucket]
+        if seen >= rank:
+            return from_satoshis(bucket_size(bucket))
+    raise AssertionError("Percentile rank exceeds the transfer count")
+
+
+class RollingStatistics:
+    def __init__(
+        self,
+        repo: TransactionRepository,
+        retention_minutes: int = ROLLUP_RETENTION_MINUTES,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._repo = repo
+        self._retention = retention_minutes
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        # Closed minutes never change once written, each is read only once
+        self._ring: list[MinuteStatistics | None] = [None] * (
+            retention_minutes + SPARE_MINUTES
+        )
+        self._loaded_until: int | None = None
+        self._windows: dict[int, WindowTotals] = {}
+
+    def window(self, minutes: int) -> WindowStatistics:
+        if not OPEN_MINUTES <= minutes <= self._retention:
+            raise ValueError(f"Window of {minutes} minutes is not retained")
+
+        now = int(self._clock()) // 60
+        closed_until = now - OPEN_MINUTES
+        with self._lock:
+            self._load(closed_until)
+            totals = self._slide(minutes, closed_until)
+
+        for minute in self._repo.get_minute_statistics(closed_until + 1, now):
+            totals.add(minute)
+        return WindowStatistics(
+            totals.volume,
+            totals.profit,
+            totals.transaction_count,
+            percentile(totals.sizes, 0.5),
+            percentile(totals.sizes, 0.99),
+        )
+
+    def _load(self, closed_until: int) -> None:
+        if self._loaded_until is not None and closed_until <= self._loaded_until:
+            return
+
+        first = closed_until - len(self._ring) + 1
+        if self._loaded_until is not None:
+            first = max(first, self._loaded_until + 1)
+        loaded = {
+            minute.minute: minute
+            for minute in self._repo.get_minute_statistics(first, closed_until)
+        }
+        for minute in range(first, closed_until + 1):
+            self._ring[minute % len(self._ring)] = loaded.get(
+                minute, MinuteStatistics(minute)
+            )
+        self._loaded_until = closed_until
+
+    def _slide(self, minutes: int, closed_until: int) -> WindowTotals:
+        first = closed_until - (minutes - OPEN_MINUTES) + 1
+        totals = self._windows.get(minutes)
+        if totals is None or not self._advance(totals, first, closed_until):
+            totals = WindowTotals(first, closed_until)
+            for minute in self._range(first, closed_until) or []:
+                totals.add(minute)
+            self._windows[minutes] = totals
+        return totals.copy()
+
+    def _advance(self, totals: WindowTotals, first: int, last: int) -> bool:
+        if not first <= totals.last_minute <= last:
+            return False
+
+        # Only the minutes that left or joined are touched, unless the ring
+        # has already reused the slots of those that left
+        expired = self._range(totals.first_minute, first - 1)
+        joined = self._range(totals.last_minute + 1, last)
+        if expired is None or joined is None:
+            return False
+        for minute in expired:
+            totals.subtract(minute)
+        for minute in joined:
+            totals.add(minute)
+        totals.first_minute, totals.last_minute = first, last
+        return True
+
+    def _range(self, first: int, last: int) -> list[MinuteStatistics] | None:
+        minutes = []
+        for index in range(first, last + 1):
+            minute = self._ring[index % len(self._ring)]
+            if minute is None or minute.minute != index:
+                return None
+            minutes.append(minute)
+        return minutes
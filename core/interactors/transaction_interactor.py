@@ -1,10 +1,14 @@
+import hashlib
 from dataclasses import dataclass
 from decimal import Decimal
 from enum import Enum
 from typing import Generic, Protocol, TypeVar
 
 from core.interactors.fee_provider import FeeProvider
+from core.models.bitcoin import to_satoshis
+from core.models.idempotency import IdempotencyKey
 from core.models.transaction import Transaction
+from core.repositories.idempotency_repository import IdempotencyRepository
 from core.repositories.transaction_repository import TransactionRepository
 from core.repositories.user_repository import UserRepository
 from core.repositories.wallet_repository import WalletRepository
@@ -15,6 +19,8 @@ class TransactionStatus(Enum):
     WALLET_NOT_FOUND = 2
     BALANCE_INSUFFICIENT = 3
     SUCCESS = 4
+    ABORTED = 5
+    IDEMPOTENCY_KEY_REUSED = 6
 
 
 T = TypeVar("T")
@@ -26,6 +32,20 @@ class TransactionResponse(Generic[T]):
     value: T
 
 
+@dataclass
+class TransferRequest:
+    wallet_address_from: str
+    wallet_address_to: str
+    amount: Decimal
+
+
+def transfer_hash(
+    wallet_address_from: str, wallet_address_to: str, amount: Decimal
+) -> str:
+    request = f"{wallet_address_from}\0{wallet_address_to}\0{to_satoshis(amount)}"
+    return hashlib.sha256(request.encode()).hexdigest()
+
+
 class TransactionInteractor(Protocol):
     def do_transaction(
         self,
@@ -33,16 +53,26 @@ class TransactionInteractor(Protocol):
         wallet_address_to: str,
         user_token: str,
         amount: Decimal,
+        idempotency_key: str | None = None,
     ) -> TransactionResponse[Transaction | None]:
         pass
 
+    def do_transactions(
+        self, transfers: list[TransferRequest], user_token: str, atomic: bool
+    ) -> list[TransactionResponse[Transaction | None]]:
+        pass
+
     def get_transactions(
-        self, user_token: str
+        self, user_token: str, limit: int | None = None, after_id: int = 0
     ) -> TransactionResponse[list[Transaction]]:
         pass
 
     def get_transactions_by_wallet(
-        self, wallet_address: str, user_token: str
+        self,
+        wallet_address: str,
+        user_token: str,
+        limit: int | None = None,
+        after_id: int = 0,
     ) -> TransactionResponse[list[Transaction]]:
         pass
 
@@ -54,11 +84,13 @@ class BitcoinServiceTransactionInteractor:
         wallet_repo: WalletRepository,
         transaction_repo: TransactionRepository,
         fee_provider: FeeProvider,
+        idempotency_repo: IdempotencyRepository | None = None,
     ):
         self._user_repo = user_repo
         self._wallet_repo = wallet_repo
         self._transaction_repo = transaction_repo
         self._fee_provider = fee_provider
+        self._idempotency_repo = idempotency_repo
 
     def do_transaction(
         self,
@@ -66,6 +98,50 @@ class BitcoinServiceTransactionInteractor:
         wallet_address_to: str,
         user_token: str,
         amount: Decimal,
+        idempotency_key: str | None = None,
+    ) -> TransactionResponse[Transaction | None]:
+        if idempotency_key is None or self._idempotency_repo is None:
+            return self._do_transaction(
+                wallet_address_from, wallet_address_to, user_token, amount
+            )
+
+        # Keys are scoped to the caller, so users cannot collide or probe each other
+        key = IdempotencyKey(
+            user_token,
+            idempotency_key,
+            transfer_hash(wallet_address_from, wallet_address_to, amount),
+        )
+        replayed = self._replay(self._idempotency_repo, key)
+        if replayed is not None:
+            return replayed
+
+        # The key is stored in the transfer's own commit, nothing is left behind
+        # when the request fails or the process dies
+        response = self._do_transaction(
+            wallet_address_from, wallet_address_to, user_token, amount, key
+        )
+        if response.status == TransactionStatus.BALANCE_INSUFFICIENT:
+            # A concurrent request with the same key may have committed first
+            return self._replay(self._idempotency_repo, key) or response
+        return response
+
+    def _replay(
+        self, repo: IdempotencyRepository, key: IdempotencyKey
+    ) -> TransactionResponse[Transaction | None] | None:
+        record = repo.get(key.user_token, key.key)
+        if record is None:
+            return None
+        if record.request_hash != key.request_hash:
+            return TransactionResponse(TransactionStatus.IDEMPOTENCY_KEY_REUSED, None)
+        return TransactionResponse(TransactionStatus.SUCCESS, record.transaction)
+
+    def _do_transaction(
+        self,
+        wallet_address_from: str,
+        wallet_address_to: str,
+        user_token: str,
+        amount: Decimal,
+        idempotency_key: IdempotencyKey | None = None,
     ) -> TransactionResponse[Transaction | None]:
         wallet_from = self._wallet_repo.get_wallet(wallet_address_from)
         wallet_to = self._wallet_repo.get_wallet(wallet_address_to)
@@ -77,7 +153,7 @@ class BitcoinServiceTransactionInteractor:
             return TransactionResponse(TransactionStatus.UNAUTHORIZED, None)
 
         fee = (
-            self._fee_provider.provide(amount)
+            self._fee_provider.provide(amount, self._username(user_token))
             if wallet_from.owner_token != wallet_to.owner_token
             else Decimal(0)
         )
@@ -85,34 +161,146 @@ class BitcoinServiceTransactionInteractor:
         if wallet_from.balance < fee + amount:
             return TransactionResponse(TransactionStatus.BALANCE_INSUFFICIENT, None)
 
-        self._wallet_repo.update_wallet_balance_if_exists(
-            wallet_address_from, wallet_from.balance - fee - amount
-        )
-
-        self._wallet_repo.update_wallet_balance_if_exists(
-            wallet_address_to, wallet_to.balance + amount
-        )
-
         transaction = Transaction(wallet_address_from, wallet_address_to, fee, amount)
 
-        self._transaction_repo.add_transaction(transaction)
+        # The balance may have changed since it was read, the repository re-checks
+        if not self._transaction_repo.transfer(transaction, idempotency_key):
+            return TransactionResponse(self._rejection([transaction])[0], None)
 
         return TransactionResponse(TransactionStatus.SUCCESS, transaction)
 
+    def do_transactions(
+        self, transfers: list[TransferRequest], user_token: str, atomic: bool
+    ) -> list[TransactionResponse[Transaction | None]]:
+        addresses = {
+            address
+            for transfer in transfers
+            for address in (transfer.wallet_address_from, transfer.wallet_address_to)
+        }
+        wallets = {
+            wallet.address: wallet
+            for wallet in self._wallet_repo.get_wallets(list(addresses))
+        }
+
+        responses: dict[int, TransactionResponse[Transaction | None]] = {}
+        pending: list[tuple[int, Transaction]] = []
+        charged: list[Transaction] = []
+        for index, transfer in enumerate(transfers):
+            wallet_from = wallets.get(transfer.wallet_address_from)
+            wallet_to = wallets.get(transfer.wallet_address_to)
+
+            if wallet_from is None or wallet_to is None:
+                responses[index] = TransactionResponse(
+                    TransactionStatus.WALLET_NOT_FOUND, None
+                )
+                continue
+
+            if user_token != wallet_from.owner_token:
+                responses[index] = TransactionResponse(
+                    TransactionStatus.UNAUTHORIZED, None
+                )
+                continue
+
+            transaction = Transaction(
+                transfer.wallet_address_from,
+                transfer.wallet_address_to,
+                Decimal(0),
+                transfer.amount,
+            )
+            pending.append((index, transaction))
+            if wallet_from.owner_token != wallet_to.owner_token:
+                charged.append(transaction)
+
+        # One schedule lookup for the batch instead of one per transfer
+        fees = self._fee_provider.provide_many(
+            [transaction.amount for transaction in charged], self._username(user_token)
+        )
+        for transaction, fee in zip(charged, fees):
+            transaction.fee = fee
+
+        rejected = len(pending) != len(transfers)
+        if pending and not (atomic and rejected):
+            results = self._transaction_repo.transfer_many(
+                [transaction for _, transaction in pending], atomic
+            )
+            failed = [
+                (index, transaction)
+                for (index, transaction), success in zip(pending, results)
+                if not success
+            ]
+            statuses = self._rejection([transaction for _, transaction in failed])
+            for (index, _), status in zip(failed, statuses):
+                responses[index] = TransactionResponse(status, None)
+            for (index, transaction), success in zip(pending, results):
+                if success:
+                    responses[index] = TransactionResponse(
+                        TransactionStatus.SUCCESS, transaction
+                    )
+            rejected = rejected or bool(failed)
+
+        if atomic and rejected:
+            # Nothing was written, so transfers that would have succeeded are aborted
+            for index, _ in pending:
+                response = responses.get(index)
+                if response is None or response.status == TransactionStatus.SUCCESS:
+                    responses[index] = TransactionResponse(
+                        TransactionStatus.ABORTED, None
+                    )
+
+        return [responses[index] for index in range(len(transfers))]
+
+    def _rejection(self, transactions: list[Transaction]) -> list[TransactionStatus]:
+        if not transactions:
+            return []
+
+        # The repository refuses transfers between wallets it cannot find as well,
+        # those are reported as missing rather than short of funds
+        addresses = {
+            address
+            for transaction in transactions
+            for address in (
+                transaction.from_wallet_address,
+                transaction.to_wallet_address,
+            )
+        }
+        found = {
+            wallet.address for wallet in self._wallet_repo.get_wallets(list(addresses))
+        }
+        return [
+            (
+                TransactionStatus.BALANCE_INSUFFICIENT
+                if transaction.from_wallet_address in found
+                and transaction.to_wallet_address in found
+                else TransactionStatus.WALLET_NOT_FOUND
+            )
+            for transaction in transactions
+        ]
+
+    def _username(self, user_token: str) -> str | None:
+        # Fee schedules name users, the token itself never reaches the provider
+        user = self._user_repo.get_user(user_token)
+        return None if user is None else user.username
+
     def get_transactions(
-        self, user_token: str
+        self, user_token: str, limit: int | None = None, after_id: int = 0
     ) -> TransactionResponse[list[Transaction]]:
         user = self._user_repo.get_user(user_token)
 
         if user is None:
             return TransactionResponse(TransactionStatus.UNAUTHORIZED, [])
 
-        transactions = self._transaction_repo.get_user_transactions(user_token)
+        transactions = self._transaction_repo.get_user_transactions(
+            user_token, limit, after_id
+        )
 
         return TransactionResponse(TransactionStatus.SUCCESS, transactions)
 
     def get_transactions_by_wallet(
-        self, wallet_address: str, user_token: str
+        self,
+        wallet_address: str,
+        user_token: str,
+        limit: int | None = None,
+        after_id: int = 0,
     ) -> TransactionResponse[list[Transaction]]:
         wallet = self._wallet_repo.get_wallet(wallet_address)
 
@@ -122,6 +310,8 @@ class BitcoinServiceTransactionInteractor:
         if wallet.owner_token != user_token:
             return TransactionResponse(TransactionStatus.UNAUTHORIZED, [])
 
-        transactions = self._transaction_repo.get_transactions(wallet_address)
+        transactions = self._transaction_repo.get_transactions(
+            wallet_address, limit, after_id
+        )
 
         return TransactionResponse(TransactionStatus.SUCCESS, transactions)
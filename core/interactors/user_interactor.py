@@ -36,6 +36,8 @@ class BitcoinServiceUserInteractor:
         token = self.token_provider.provide_token()
         response = self.repo.create_user(User(username, token))
         if response is not True:
+            if self.repo.username_taken(username):
+                return UserResponse(UserStatus.USERNAME_IN_USE, None)
             return UserResponse(UserStatus.EXCEPTION, None)
 
         return UserResponse(UserStatus.SUCCESS, token)
@@ -32,6 +32,19 @@ class WalletResponse:
     value: WalletInfo | None
 
 
+@dataclass
+class WalletsResponse:
+    status: WalletStatus
+    value: list[WalletInfo]
+
+
+def value_wallets(wallets: list[Wallet], rate: Decimal) -> list[WalletInfo]:
+    return [
+        WalletInfo(wallet.address, wallet.balance, wallet.balance * rate)
+        for wallet in wallets
+    ]
+
+
 class WalletInteractor(Protocol):
     def create_wallet(self, user_token: str) -> WalletResponse:
         pass
@@ -39,6 +52,9 @@ class WalletInteractor(Protocol):
     def get_wallet(self, wallet_address: str, user_token: str) -> WalletResponse:
         pass
 
+    def get_wallets(self, user_token: str) -> WalletsResponse:
+        pass
+
 
 class BitcoinServiceWalletInteractor:
     def __init__(
@@ -61,8 +77,7 @@ class BitcoinServiceWalletInteractor:
         rate = self._rate_provider.fetch()
         if rate is None:
             return None
-        wallet_info = WalletInfo(wallet.address, wallet.balance, wallet.balance * rate)
-        return wallet_info
+        return value_wallets([wallet], rate)[0]
 
     def create_wallet(self, user_token: str) -> WalletResponse:
         user = self._user_repo.get_user(user_token)
@@ -70,8 +85,7 @@ class BitcoinServiceWalletInteractor:
         if user is None:
             return WalletResponse(WalletStatus.UNAUTHORIZED, None)
 
-        wallets = self._wallet_repo.get_wallets_by_user(user_token)
-        if len(wallets) >= self._max_wallets:
+        if self._wallet_repo.count_wallets_by_user(user_token) >= self._max_wallets:
             return WalletResponse(WalletStatus.WALLET_LIMIT_EXCEEDED, None)
 
         new_wallet = Wallet(
@@ -103,3 +117,19 @@ class BitcoinServiceWalletInteractor:
         if wallet_info is None:
             return WalletResponse(WalletStatus.FAILED_TO_GET_RATE, None)
         return WalletResponse(WalletStatus.SUCCESS, wallet_info)
+
+    def get_wallets(self, user_token: str) -> WalletsResponse:
+        user = self._user_repo.get_user(user_token)
+
+        if user is None:
+            return WalletsResponse(WalletStatus.UNAUTHORIZED, [])
+
+        wallets = self._wallet_repo.get_wallets_by_user(user_token)
+        if not wallets:
+            return WalletsResponse(WalletStatus.SUCCESS, [])
+
+        # One rate for the whole portfolio, so every wallet is valued alike
+        rate = self._rate_provider.fetch()
+        if rate is None:
+            return WalletsResponse(WalletStatus.FAILED_TO_GET_RATE, [])
+        return WalletsResponse(WalletStatus.SUCCESS, value_wallets(wallets, rate))
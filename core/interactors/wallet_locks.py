@@ -0,0 +1,80 @@
+import threading
+import zlib
+from contextlib import ExitStack, contextmanager
+from decimal import Decimal
+from typing import Iterable, Iterator
+
+from core.interactors.transaction_interactor import (
+    TransactionInteractor,
+    TransactionResponse,
+    TransferRequest,
+)
+from core.models.transaction import Transaction
+
+
+class StripedLocks:
+    def __init__(self, stripes: int = 1024):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def stripe(self, address: str) -> int:
+        # crc32 rather than hash() so a wallet maps to the same stripe every run
+        return zlib.crc32(address.encode()) % len(self._locks)
+
+    @contextmanager
+    def hold(self, addresses: Iterable[str]) -> Iterator[None]:
+        # Ascending stripe order on every path rules out lock cycles
+        stripes = sorted({self.stripe(address) for address in addresses})
+        with ExitStack() as stack:
+            for stripe in stripes:
+                stack.enter_context(self._locks[stripe])
+            yield
+
+
+class LockingTransactionInteractor:
+    def __init__(self, interactor: TransactionInteractor, locks: StripedLocks):
+        self._interactor = interactor
+        self._locks = locks
+
+    def do_transaction(
+        self,
+        wallet_address_from: str,
+        wallet_address_to: str,
+        user_token: str,
+        amount: Decimal,
+        idempotency_key: str | None = None,
+    ) -> TransactionResponse[Transaction | None]:
+        with self._locks.hold([wallet_address_from, wallet_address_to]):
+            return self._interactor.do_transaction(
+                wallet_address_from,
+                wallet_address_to,
+                user_token,
+                amount,
+                idempotency_key,
+            )
+
+    def do_transactions(
+        self, transfers: list[TransferRequest], user_token: str, atomic: bool
+    ) -> list[TransactionResponse[Transaction | None]]:
+        addresses = [
+            address
+            for transfer in transfers
+            for address in (transfer.wallet_address_from, transfer.wallet_address_to)
+        ]
+        with self._locks.hold(addresses):
+            return self._interactor.do_transactions(transfers, user_token, atomic)
+
+    def get_transactions(
+        self, user_token: str, limit: int | None = None, after_id: int = 0
+    ) -> TransactionResponse[list[Transaction]]:
+        return self._interactor.get_transactions(user_token, limit, after_id)
+
+    def get_transactions_by_wallet(
+        self,
+        wallet_address: str,
+        user_token: str,
+        limit: int | None = None,
+        after_id: int = 0,
+    ) -> TransactionResponse[list[Transaction]]:
+        return self._interactor.get_transactions_by_wallet(
+            wallet_address, user_token, limit, after_id
+        )
@@ -0,0 +1,18 @@
+from decimal import Decimal
+
+SATOSHIS_PER_BITCOIN: int = 100_000_000
+SATOSHI: Decimal = Decimal(1) / SATOSHIS_PER_BITCOIN
+
+
+def is_whole_satoshis(value: Decimal) -> bool:
+    return value == value.quantize(SATOSHI)
+
+
+def to_satoshis(value: Decimal) -> int:
+    if not is_whole_satoshis(value):
+        raise ValueError(f"{value} is not a whole number of satoshis")
+    return int(value * SATOSHIS_PER_BITCOIN)
+
+
+def from_satoshis(value: int) -> Decimal:
+    return Decimal(value) / SATOSHIS_PER_BITCOIN
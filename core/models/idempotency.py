@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+
+from core.models.transaction import Transaction
+
+
+@dataclass
+class IdempotencyKey:
+    user_token: str
+    key: str
+    request_hash: str
+
+
+@dataclass
+class IdempotencyRecord:
+    request_hash: str
+    transaction: Transaction
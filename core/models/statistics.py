@@ -0,0 +1,42 @@
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+SIZE_BUCKETS_PER_DOUBLING = 4
+# The longest window served, older minutes are pruned from the rollup
+ROLLUP_RETENTION_MINUTES = 30 * 24 * 60
+
+
+@dataclass
+class Statistics:
+    profit: Decimal = Decimal("0")
+    transaction_count: int = 0
+
+
+@dataclass
+class MinuteStatistics:
+    minute: int
+    volume: Decimal = Decimal("0")
+    profit: Decimal = Decimal("0")
+    transaction_count: int = 0
+    # Transfer counts keyed by size_bucket of the amount in satoshis
+    sizes: Counter[int] = field(default_factory=Counter)
+
+
+@dataclass
+class WindowStatistics:
+    volume: Decimal = Decimal("0")
+    profit: Decimal = Decimal("0")
+    transaction_count: int = 0
+    p50_amount: Decimal | None = None
+    p99_amount: Decimal | None = None
+
+
+def size_bucket(satoshis: int) -> int:
+    # Log-scale buckets keep any percentile within 9% of the true amount
+    return int(math.log2(max(satoshis, 1)) * SIZE_BUCKETS_PER_DOUBLING)
+
+
+def bucket_size(bucket: int) -> int:
+    return round(2 ** ((bucket + 0.5) / SIZE_BUCKETS_PER_DOUBLING))
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from decimal import Decimal
 
 
@@ -8,3 +8,5 @@ class Transaction:
     to_wallet_address: str
     fee: Decimal
     amount: Decimal
+    id: int | None = field(default=None, compare=False)
+    created_at: int | None = field(default=None, compare=False)
@@ -7,3 +7,9 @@ class Wallet:
     address: str
     balance: Decimal
     owner_token: str
+
+
+@dataclass
+class WalletActivity:
+    transaction_count: int
+    last_activity_at: int | None
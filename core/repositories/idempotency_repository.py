@@ -0,0 +1,8 @@
+from typing import Protocol
+
+from core.models.idempotency import IdempotencyRecord
+
+
+class IdempotencyRepository(Protocol):
+    def get(self, user_token: str, key: str) -> IdempotencyRecord | None:
+        pass
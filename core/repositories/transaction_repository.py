@@ -1,5 +1,7 @@
-from typing import Protocol
+from typing import Iterator, Protocol
 
+from core.models.idempotency import IdempotencyKey
+from core.models.statistics import MinuteStatistics, Statistics
 from core.models.transaction import Transaction
 
 
@@ -7,11 +9,47 @@ class TransactionRepository(Protocol):
     def add_transaction(self, transaction: Transaction) -> None:
         pass
 
-    def get_transactions(self, wallet_address: str) -> list[Transaction]:
+    def transfer(
+        self, transaction: Transaction, idempotency_key: IdempotencyKey | None = None
+    ) -> bool:
         pass
 
-    def get_user_transactions(self, user_token: str) -> list[Transaction]:
+    def transfer_many(
+        self,
+        transactions: list[Transaction],
+        atomic: bool,
+        idempotency_keys: list[IdempotencyKey | None] | None = None,
+    ) -> list[bool]:
+        pass
+
+    def get_transactions(
+        self, wallet_address: str, limit: int | None = None, after_id: int = 0
+    ) -> list[Transaction]:
+        pass
+
+    def get_user_transactions(
+        self, user_token: str, limit: int | None = None, after_id: int = 0
+    ) -> list[Transaction]:
         pass
 
     def get_all_transactions(self) -> list[Transaction]:
         pass
+
+    def iter_transactions(
+        self,
+        wallet_address: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> Iterator[Transaction]:
+        pass
+
+    def get_statistics(self) -> Statistics:
+        pass
+
+    def get_daily_statistics(self) -> dict[str, Statistics]:
+        pass
+
+    def get_minute_statistics(
+        self, since_minute: int, until_minute: int
+    ) -> list[MinuteStatistics]:
+        pass
@@ -1,4 +1,4 @@
-from typing import Protocol
+from typing import Iterator, Protocol
 
 from core.models.user import User
 
@@ -12,3 +12,6 @@ class UserRepository(Protocol):
 
     def username_taken(self, username: str) -> bool:
         pass
+
+    def iter_usernames(self) -> Iterator[str]:
+        pass
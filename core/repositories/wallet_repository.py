@@ -1,7 +1,12 @@
 from decimal import Decimal
 from typing import Protocol
 
-from core.models.wallet import Wallet
+from core.models.wallet import Wallet, WalletActivity
+
+
+class BalanceListener(Protocol):
+    def balances_committed(self, balances: dict[str, Decimal]) -> None:
+        pass
 
 
 class WalletRepository(Protocol):
@@ -13,8 +18,20 @@ class WalletRepository(Protocol):
     ) -> None:
         pass
 
+    def update_wallet_balances(self, balances: dict[str, Decimal]) -> None:
+        pass
+
+    def get_wallets(self, addresses: list[str]) -> list[Wallet]:
+        pass
+
     def get_wallets_by_user(self, user_token: str) -> list[Wallet]:
         pass
 
+    def count_wallets_by_user(self, user_token: str) -> int:
+        pass
+
+    def get_wallet_activity(self, address: str) -> WalletActivity | None:
+        pass
+
     def create_wallet(self, wallet: Wallet) -> bool:
         pass
@@ -1,8 +1,14 @@
 from starlette.requests import Request
 
-from core.facade import BitcoinService
+from core.facade import AsyncBitcoinService
+from infra.metrics.registry import MetricsRegistry
 
 
-def get_core(request: Request) -> BitcoinService:
-    service: BitcoinService = request.app.state.core
+def get_core(request: Request) -> AsyncBitcoinService:
+    service: AsyncBitcoinService = request.app.state.core
     return service
+
+
+def get_metrics(request: Request) -> MetricsRegistry:
+    registry: MetricsRegistry = request.app.state.metrics
+    return registry
@@ -0,0 +1,58 @@
+import json
+from typing import Iterator
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from core.facade import AsyncBitcoinService
+from core.interactors.admin_interactor import AdminStatus
+from core.models.transaction import Transaction
+from infra.api.fastapi.dependables import get_core
+
+export_api = APIRouter()
+
+EXPORT_CHUNK_ROWS: int = 1000
+
+
+def to_ndjson(transactions: Iterator[Transaction]) -> Iterator[str]:
+    lines = []
+    for transaction in transactions:
+        lines.append(
+            json.dumps(
+                {
+                    "id": transaction.id,
+                    "from_wallet": transaction.from_wallet_address,
+                    "to_wallet": transaction.to_wallet_address,
+                    "fee": str(transaction.fee),
+                    "amount": str(transaction.amount),
+                    "created_at": transaction.created_at,
+                }
+            )
+        )
+        if len(lines) == EXPORT_CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+@export_api.get("/admin/transactions/export")
+async def export_transactions(
+    token: str,
+    wallet: str | None = None,
+    since: int | None = None,
+    until: int | None = None,
+    core: AsyncBitcoinService = Depends(get_core),
+) -> StreamingResponse:
+    response = await core.export_transactions(token, wallet, since, until)
+    match response.status:
+        case AdminStatus.UNAUTHORIZED:
+            raise HTTPException(
+                403, "You have to be an admin to export the platform transactions"
+            )
+        case AdminStatus.SUCCESS:
+            assert response.transactions is not None
+            return StreamingResponse(
+                to_ndjson(response.transactions), media_type="application/x-ndjson"
+            )
@@ -0,0 +1,66 @@
+import time
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from infra.api.fastapi.dependables import get_metrics
+from infra.metrics.registry import MetricsRegistry
+from infra.metrics.statements import StatementCounter
+
+metrics_api = APIRouter()
+
+STATEMENT_BUCKETS: tuple[float, ...] = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+@metrics_api.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics_text(
+    registry: MetricsRegistry = Depends(get_metrics),
+) -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+class RequestMetricsMiddleware:
+    def __init__(
+        self, app: ASGIApp, registry: MetricsRegistry, statements: StatementCounter
+    ):
+        self._app = app
+        self._statements = statements
+        self._durations = registry.histogram(
+            "bitcoin_http_request_duration_seconds",
+            "HTTP request latency by route",
+            ("method", "route", "status"),
+        )
+        self._statements_per_request = registry.histogram(
+            "bitcoin_http_request_db_statements",
+            "SQL statements executed while serving a request",
+            ("method", "route"),
+            STATEMENT_BUCKETS,
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self._app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        with self._statements.track() as counted:
+            try:
+                await self._app(scope, receive, send_with_status)
+            finally:
+                # The router stores the matched route in the scope, templated
+                # paths keep the label set bounded
+                route = scope.get("route")
+                path = getattr(route, "path", "unmatched")
+                self._durations.observe(
+                    time.perf_counter() - start, scope["method"], path, str(status)
+                )
+                self._statements_per_request.observe(counted[0], scope["method"], path)
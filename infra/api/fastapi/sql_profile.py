@@ -0,0 +1,65 @@
+import json
+import logging
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from infra.persistence.sqlite.profiler import SqlProfile, profiling
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-sql-profile"
+
+
+class SqlProfileMiddleware:
+    def __init__(self, app: ASGIApp, profile_all: bool = False):
+        self._app = app
+        self._profile_all = profile_all
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self._app(scope, receive, send)
+            return
+
+        with profiling() as profile:
+
+            async def send_with_profile(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        *profile_headers(profile),
+                    ]
+                await send(message)
+
+            try:
+                await self._app(scope, receive, send_with_profile)
+            finally:
+                log_profile(scope, profile)
+
+    def _wanted(self, scope: Scope) -> bool:
+        if self._profile_all:
+            return True
+        return any(
+            name == PROFILE_HEADER and value not in (b"", b"0")
+            for name, value in scope["headers"]
+        )
+
+
+def profile_headers(profile: SqlProfile) -> list[tuple[bytes, bytes]]:
+    return [
+        (b"x-sql-statements", str(len(profile.statements)).encode()),
+        (b"x-sql-duration-ms", f"{profile.duration_seconds * 1000:.3f}".encode()),
+        (b"x-sql-repeated", str(repeated_statements(profile)).encode()),
+    ]
+
+
+def repeated_statements(profile: SqlProfile) -> int:
+    return sum(count - 1 for count in profile.repeated().values())
+
+
+def log_profile(scope: Scope, profile: SqlProfile) -> None:
+    report = profile.report()
+    report["method"] = scope["method"]
+    report["path"] = scope["path"]
+    # Repeated identical statements in one request usually mean an N+1 loop
+    level = logging.WARNING if report["repeated"] else logging.INFO
+    logger.log(level, "sql profile %s", json.dumps(report))
@@ -1,9 +1,10 @@
 from decimal import Decimal
+from enum import Enum
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
-from core.facade import BitcoinService
+from core.facade import AsyncBitcoinService
 from core.interactors.admin_interactor import AdminStatus
 from infra.api.fastapi.dependables import get_core
 
@@ -13,19 +14,55 @@ class StatisticsSchema(BaseModel):
     transaction_count: int
 
 
+class WindowStatisticsSchema(BaseModel):
+    window: str
+    volume: Decimal
+    profit: Decimal
+    transaction_count: int
+    p50_amount: Decimal | None
+    p99_amount: Decimal | None
+
+
+class Window(str, Enum):
+    HOUR = "1h"
+    DAY = "24h"
+    MONTH = "30d"
+
+
+WINDOW_MINUTES = {Window.HOUR: 60, Window.DAY: 24 * 60, Window.MONTH: 30 * 24 * 60}
+
 admin_api = APIRouter()
 
 
-@admin_api.get("/statistics", response_model=StatisticsSchema)
+def forbidden() -> HTTPException:
+    return HTTPException(403, "You have to be an admin to view the platform statistics")
+
+
+# The windowed schema goes first, the lifetime one would match it as well
+@admin_api.get("/statistics", response_model=WindowStatisticsSchema | StatisticsSchema)
 async def get_statistics(
-    token: str, core: BitcoinService = Depends(get_core)
-) -> StatisticsSchema:
-    response = core.get_statistics(token)
+    token: str,
+    window: Window | None = None,
+    core: AsyncBitcoinService = Depends(get_core),
+) -> WindowStatisticsSchema | StatisticsSchema:
+    if window is not None:
+        windowed = await core.get_window_statistics(token, WINDOW_MINUTES[window])
+        if windowed.status == AdminStatus.UNAUTHORIZED:
+            raise forbidden()
+        assert windowed.statistics is not None
+        return WindowStatisticsSchema(
+            window=window.value,
+            volume=windowed.statistics.volume,
+            profit=windowed.statistics.profit,
+            transaction_count=windowed.statistics.transaction_count,
+            p50_amount=windowed.statistics.p50_amount,
+            p99_amount=windowed.statistics.p99_amount,
+        )
+
+    response = await core.get_statistics(token)
     match response.status:
         case AdminStatus.UNAUTHORIZED:
-            raise HTTPException(
-                403, "You have to be an admin to view the platform statistics"
-            )
+            raise forbidden()
         case AdminStatus.SUCCESS:
             assert response.statistics is not None
             return StatisticsSchema(
@@ -1,15 +1,34 @@
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel, validator
-
-from core.facade import BitcoinService
-from core.interactors.transaction_interactor import TransactionStatus
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from pydantic import BaseModel, Field, validator
+
+from core.facade import AsyncBitcoinService
+from core.interactors.transaction_interactor import (
+    TransactionResponse,
+    TransactionStatus,
+    TransferRequest,
+)
+from core.models.bitcoin import is_whole_satoshis
 from core.models.transaction import Transaction
 from infra.api.fastapi.dependables import get_core
 
 transaction_api = APIRouter()
 
+DEFAULT_PAGE_SIZE: int = 100
+MAX_PAGE_SIZE: int = 1000
+MAX_BATCH_SIZE: int = 1000
+MAX_IDEMPOTENCY_KEY_LENGTH: int = 255
+
+TRANSACTION_STATUS_CODES: dict[TransactionStatus, int] = {
+    TransactionStatus.SUCCESS: 200,
+    TransactionStatus.UNAUTHORIZED: 403,
+    TransactionStatus.WALLET_NOT_FOUND: 404,
+    TransactionStatus.BALANCE_INSUFFICIENT: 409,
+    TransactionStatus.ABORTED: 424,
+    TransactionStatus.IDEMPOTENCY_KEY_REUSED: 422,
+}
+
 
 class TransactionSchema(BaseModel):
     from_wallet: str
@@ -20,22 +39,41 @@ class TransactionSchema(BaseModel):
 
 class TransactionsViewSchema(BaseModel):
     transactions: list[TransactionSchema]
+    next_after_id: int | None
 
 
-class TransactionRequestSchema(BaseModel):
-    token: str
+class TransferSchema(BaseModel):
     from_wallet: str
     to_wallet: str
     amount: Decimal
 
     # noinspection PyMethodParameters
     @validator("amount")
-    def prevent_negative(_, v: Decimal) -> Decimal:
-        if v <= 0:
+    def prevent_negative(cls, v: Decimal) -> Decimal:
+        if v <= 0 or not is_whole_satoshis(v):
             raise HTTPException(422, "Illegal Transaction Amount")
         return v
 
 
+class TransactionRequestSchema(TransferSchema):
+    token: str
+
+
+class BatchTransactionRequestSchema(BaseModel):
+    token: str
+    transfers: list[TransferSchema] = Field(..., min_items=1, max_items=MAX_BATCH_SIZE)
+    atomic: bool = True
+
+
+class BatchItemSchema(BaseModel):
+    status: int
+    transaction: TransactionSchema | None
+
+
+class BatchTransactionResponseSchema(BaseModel):
+    results: list[BatchItemSchema]
+
+
 def handle_transaction_status(status: TransactionStatus) -> None:
     match status:
         case TransactionStatus.WALLET_NOT_FOUND:
@@ -46,6 +84,32 @@ def handle_transaction_status(status: TransactionStatus) -> None:
             raise HTTPException(
                 409, "Wallet balance insufficient to perform the transaction"
             )
+        case TransactionStatus.IDEMPOTENCY_KEY_REUSED:
+            raise HTTPException(
+                422, "Idempotency-Key was already used for a different request"
+            )
+
+
+def convert_batch_item(
+    response: TransactionResponse[Transaction | None],
+) -> BatchItemSchema:
+    return BatchItemSchema(
+        status=TRANSACTION_STATUS_CODES[response.status],
+        transaction=(
+            None if response.value is None else convert_transaction(response.value)
+        ),
+    )
+
+
+def convert_transactions(
+    transactions: list[Transaction], limit: int
+) -> TransactionsViewSchema:
+    # A full page means there may be more, the client continues after the last id
+    next_after_id = transactions[-1].id if len(transactions) == limit else None
+    return TransactionsViewSchema(
+        transactions=[convert_transaction(transaction) for transaction in transactions],
+        next_after_id=next_after_id,
+    )
 
 
 def convert_transaction(transaction: Transaction) -> TransactionSchema:
@@ -61,24 +125,31 @@ def convert_transaction(transaction: Transaction) -> TransactionSchema:
     "/wallets/{address}/transactions", response_model=TransactionsViewSchema
 )
 async def get_wallet_transactions(
-    token: str, address: str, core: BitcoinService = Depends(get_core)
+    token: str,
+    address: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int = Query(0, ge=0),
+    core: AsyncBitcoinService = Depends(get_core),
 ) -> TransactionsViewSchema:
-    response = core.get_wallet_transactions(token, address)
+    response = await core.get_wallet_transactions(token, address, limit, after_id)
     handle_transaction_status(response.status)
-    return TransactionsViewSchema(
-        transactions=[
-            convert_transaction(transaction) for transaction in response.value
-        ]
-    )
+    return convert_transactions(response.value, limit)
 
 
 @transaction_api.post("/transactions", response_model=TransactionSchema)
 async def perform_transaction(
     request: TransactionRequestSchema,
-    core: BitcoinService = Depends(get_core),
+    idempotency_key: str | None = Header(
+        None, min_length=1, max_length=MAX_IDEMPOTENCY_KEY_LENGTH
+    ),
+    core: AsyncBitcoinService = Depends(get_core),
 ) -> TransactionSchema:
-    response = core.perform_transaction(
-        request.token, request.from_wallet, request.to_wallet, request.amount
+    response = await core.perform_transaction(
+        request.token,
+        request.from_wallet,
+        request.to_wallet,
+        request.amount,
+        idempotency_key,
     )
     handle_transaction_status(response.status)
     if response.value is None:
@@ -86,14 +157,33 @@ async def perform_transaction(
     return convert_transaction(response.value)
 
 
+@transaction_api.post(
+    "/transactions/batch", response_model=BatchTransactionResponseSchema
+)
+async def perform_transactions(
+    request: BatchTransactionRequestSchema,
+    core: AsyncBitcoinService = Depends(get_core),
+) -> BatchTransactionResponseSchema:
+    responses = await core.perform_transactions(
+        request.token,
+        [
+            TransferRequest(transfer.from_wallet, transfer.to_wallet, transfer.amount)
+            for transfer in request.transfers
+        ],
+        request.atomic,
+    )
+    return BatchTransactionResponseSchema(
+        results=[convert_batch_item(response) for response in responses]
+    )
+
+
 @transaction_api.get("/transactions", response_model=TransactionsViewSchema)
 async def get_transactions(
-    token: str, core: BitcoinService = Depends(get_core)
+    token: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int = Query(0, ge=0),
+    core: AsyncBitcoinService = Depends(get_core),
 ) -> TransactionsViewSchema:
-    response = core.get_transactions(token)
+    response = await core.get_transactions(token, limit, after_id)
     handle_transaction_status(response.status)
-    return TransactionsViewSchema(
-        transactions=[
-            convert_transaction(transaction) for transaction in response.value
-        ]
-    )
+    return convert_transactions(response.value, limit)
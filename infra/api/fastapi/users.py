@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
-from core.facade import BitcoinService
+from core.facade import AsyncBitcoinService
 from core.interactors.user_interactor import UserStatus
 from infra.api.fastapi.dependables import get_core
 
@@ -19,9 +19,9 @@ user_api = APIRouter()
 
 @user_api.post("/users", response_model=UserSchema)
 async def register_user(
-    user_data: UserData, core: BitcoinService = Depends(get_core)
+    user_data: UserData, core: AsyncBitcoinService = Depends(get_core)
 ) -> UserSchema:
-    response = core.register_user(user_data.username)
+    response = await core.register_user(user_data.username)
     match response.status:
         case UserStatus.USERNAME_IN_USE:
             raise HTTPException(409, "Username already taken")
@@ -3,7 +3,7 @@ from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
-from core.facade import BitcoinService
+from core.facade import AsyncBitcoinService
 from core.interactors.wallet_interactor import WalletInfo, WalletResponse, WalletStatus
 from infra.api.fastapi.dependables import get_core
 
@@ -34,6 +34,10 @@ class WalletSchema(BaseModel):
     balance_usd: Decimal
 
 
+class WalletsSchema(BaseModel):
+    wallets: list[WalletSchema]
+
+
 def convert_wallet_info(wallet_info: WalletInfo) -> WalletSchema:
     return WalletSchema(
         address=wallet_info.wallet_address,
@@ -51,13 +55,24 @@ def handle_response(response: WalletResponse) -> WalletSchema:
 
 @wallet_api.post("/wallets", response_model=WalletSchema)
 async def create_wallet(
-    wallet_data: CreateWalletSchema, core: BitcoinService = Depends(get_core)
+    wallet_data: CreateWalletSchema, core: AsyncBitcoinService = Depends(get_core)
 ) -> WalletSchema:
-    return handle_response(core.create_wallet(wallet_data.token))
+    return handle_response(await core.create_wallet(wallet_data.token))
 
 
 @wallet_api.get("/wallets/{address}", response_model=WalletSchema)
 async def get_wallet(
-    token: str, address: str, core: BitcoinService = Depends(get_core)
+    token: str, address: str, core: AsyncBitcoinService = Depends(get_core)
 ) -> WalletSchema:
-    return handle_response(core.get_wallet(token, address))
+    return handle_response(await core.get_wallet(token, address))
+
+
+@wallet_api.get("/users/me/wallets", response_model=WalletsSchema)
+async def get_wallets(
+    token: str, core: AsyncBitcoinService = Depends(get_core)
+) -> WalletsSchema:
+    response = await core.get_wallets(token)
+    handle_wallet_status(response.status)
+    return WalletsSchema(
+        wallets=[convert_wallet_info(wallet_info) for wallet_info in response.value]
+    )
@@ -0,0 +1,71 @@
+import functools
+import time
+from typing import Any, Callable, TypeVar, cast
+
+from infra.metrics.registry import Counter, Histogram, MetricsRegistry
+
+T = TypeVar("T")
+
+LABELS = ("layer", "component", "method")
+
+
+class Instrumented:
+    def __init__(
+        self,
+        target: object,
+        layer: str,
+        component: str,
+        durations: Histogram,
+        errors: Counter,
+    ):
+        self._target = target
+        self._layer = layer
+        self._component = component
+        self._durations = durations
+        self._errors = errors
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._target, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+
+        wrapped = self._timed(attribute, (self._layer, self._component, name))
+        # Later lookups find the wrapper directly and skip __getattr__
+        setattr(self, name, wrapped)
+        return wrapped
+
+    def _timed(
+        self, method: Callable[..., Any], labels: tuple[str, str, str]
+    ) -> Callable[..., Any]:
+        durations = self._durations
+        errors = self._errors
+
+        @functools.wraps(method)
+        def call(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            except BaseException:
+                errors.inc(*labels)
+                raise
+            finally:
+                durations.observe(time.perf_counter() - start, *labels)
+
+        return call
+
+
+def instrument(
+    target: T, layer: str, registry: MetricsRegistry, component: str | None = None
+) -> T:
+    proxy = Instrumented(
+        target,
+        layer,
+        component or type(target).__name__,
+        registry.histogram(
+            "bitcoin_call_duration_seconds", "Time spent in a component call", LABELS
+        ),
+        registry.counter(
+            "bitcoin_call_errors_total", "Component calls that raised", LABELS
+        ),
+    )
+    return cast(T, proxy)
@@ -0,0 +1,58 @@
+from contextlib import contextmanager
+from contextvars import Context, ContextVar
+from sqlite3 import Connection
+from typing import Iterable, Iterator
+
+from infra.metrics.registry import MetricsRegistry
+
+# A mutable cell, so executor threads running a copy of the context still count
+_request_statements: ContextVar[list[int] | None] = ContextVar(
+    "request_statements", default=None
+)
+
+
+@contextmanager
+def counting_for(contexts: Iterable[Context]) -> Iterator[None]:
+    # Statements run once on behalf of several requests are charged to each
+    cells = [
+        counted
+        for counted in (context.run(_request_statements.get) for context in contexts)
+        if counted is not None
+    ]
+    if not cells:
+        yield
+        return
+
+    shared = [0]
+    token = _request_statements.set(shared)
+    try:
+        yield
+    finally:
+        _request_statements.reset(token)
+        for counted in cells:
+            counted[0] += shared[0]
+
+
+class StatementCounter:
+    def __init__(self, registry: MetricsRegistry):
+        self._total = registry.counter(
+            "bitcoin_db_statements_total", "SQL statements executed"
+        )
+
+    def attach(self, con: Connection) -> None:
+        con.set_trace_callback(self._record)
+
+    @contextmanager
+    def track(self) -> Iterator[list[int]]:
+        counted = [0]
+        token = _request_statements.set(counted)
+        try:
+            yield counted
+        finally:
+            _request_statements.reset(token)
+
+    def _record(self, _: str) -> None:
+        self._total.inc()
+        counted = _request_statements.get()
+        if counted is not None:
+            counted[0] += 1
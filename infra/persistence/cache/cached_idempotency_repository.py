@@ -0,0 +1,35 @@
+import threading
+import time
+from typing import Callable
+
+from core.models.idempotency import IdempotencyRecord
+from core.repositories.idempotency_repository import IdempotencyRepository
+from infra.persistence.cache.lru import LruCache
+
+
+class CachedIdempotencyRepository:
+    def __init__(
+        self,
+        repo: IdempotencyRepository,
+        capacity: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._repo = repo
+        # Stored keys never change until they expire, only misses reach the store
+        self._records: LruCache[tuple[str, str], IdempotencyRecord] = LruCache(
+            capacity, ttl_seconds, clock
+        )
+        self._lock = threading.Lock()
+
+    def get(self, user_token: str, key: str) -> IdempotencyRecord | None:
+        with self._lock:
+            record = self._records.get((user_token, key))
+        if record is not None:
+            return record
+
+        record = self._repo.get(user_token, key)
+        if record is not None:
+            with self._lock:
+                self._records.put((user_token, key), record)
+        return record
@@ -0,0 +1,112 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from core.models.user import User
+from core.repositories.user_repository import UserRepository
+from infra.persistence.cache.bloom import BloomFilter
+from infra.persistence.cache.lru import LruCache
+
+
+@dataclass
+class UserCacheStats:
+    hits: int = 0
+    misses: int = 0
+    negative_hits: int = 0
+    username_checks: int = 0
+    username_skips: int = 0
+
+
+class CachedUserRepository:
+    def __init__(
+        self,
+        repo: UserRepository,
+        capacity: int,
+        ttl_seconds: float,
+        negative_ttl_seconds: float,
+        expected_users: int = 1_000_000,
+        false_positive_rate: float = 0.01,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._repo = repo
+        self._users: LruCache[str, User] = LruCache(capacity, ttl_seconds, clock)
+        self._unknown: LruCache[str, bool] = LruCache(
+            capacity, negative_ttl_seconds, clock
+        )
+        self._usernames = BloomFilter(expected_users, false_positive_rate)
+        self._usernames_loaded = False
+        self._stats = UserCacheStats()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @property
+    def stats(self) -> UserCacheStats:
+        with self._lock:
+            return UserCacheStats(
+                self._stats.hits,
+                self._stats.misses,
+                self._stats.negative_hits,
+                self._stats.username_checks,
+                self._stats.username_skips,
+            )
+
+    def create_user(self, user: User) -> bool:
+        if not self._repo.create_user(user):
+            # Another process may have taken the name after the filter was loaded
+            if self._repo.username_taken(user.username):
+                with self._lock:
+                    self._usernames.add(user.username)
+            return False
+
+        with self._lock:
+            self._usernames.add(user.username)
+            self._unknown.pop(user.token)
+            self._users.put(user.token, User(user.username, user.token))
+        return True
+
+    def get_user(self, token: str) -> User | None:
+        with self._lock:
+            user = self._users.get(token)
+            if user is not None:
+                self._stats.hits += 1
+                return User(user.username, user.token)
+            if self._unknown.get(token) is not None:
+                self._stats.negative_hits += 1
+                return None
+            self._stats.misses += 1
+
+        user = self._repo.get_user(token)
+        with self._lock:
+            if user is None:
+                self._unknown.put(token, True)
+            else:
+                self._users.put(token, User(user.username, user.token))
+        return user
+
+    def username_taken(self, username: str) -> bool:
+        self._load_usernames()
+        with self._lock:
+            self._stats.username_checks += 1
+            # A Bloom filter has no false negatives, only false positives
+            if username not in self._usernames:
+                self._stats.username_skips += 1
+                return False
+
+        return self._repo.username_taken(username)
+
+    def iter_usernames(self) -> Iterator[str]:
+        return self._repo.iter_usernames()
+
+    def _load_usernames(self) -> None:
+        if self._usernames_loaded:
+            return
+
+        with self._load_lock:
+            if self._usernames_loaded:
+                return
+
+            for username in self._repo.iter_usernames():
+                with self._lock:
+                    self._usernames.add(username)
+            self._usernames_loaded = True
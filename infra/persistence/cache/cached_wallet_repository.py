@@ -0,0 +1,117 @@
+import threading
+from decimal import Decimal
+
+from core.models.wallet import Wallet, WalletActivity
+from core.repositories.wallet_repository import WalletRepository
+from infra.persistence.cache.lru import LruCache
+
+
+class CachedWalletRepository:
+    def __init__(
+        self,
+        repo: WalletRepository,
+        capacity: int,
+    ):
+        self._repo = repo
+        self._wallets: LruCache[str, tuple[Decimal, str]] = LruCache(capacity)
+        self._user_wallets: LruCache[str, tuple[str, ...]] = LruCache(capacity)
+        # Bumped on every change so a miss never caches a row read before it
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_wallet(self, address: str) -> Wallet | None:
+        with self._lock:
+            entry = self._wallets.get(address)
+            generation = self._generation
+        if entry is not None:
+            return Wallet(address, *entry)
+
+        loaded = self._repo.get_wallet(address)
+        if loaded is None:
+            return None
+
+        with self._lock:
+            if self._generation == generation:
+                self._wallets.put(address, (loaded.balance, loaded.owner_token))
+        return loaded
+
+    def get_wallets(self, addresses: list[str]) -> list[Wallet]:
+        wallet_list: list[Wallet] = []
+        missing: list[str] = []
+        with self._lock:
+            for address in addresses:
+                entry = self._wallets.get(address)
+                if entry is None:
+                    missing.append(address)
+                else:
+                    wallet_list.append(Wallet(address, *entry))
+            generation = self._generation
+        if not missing:
+            return wallet_list
+
+        loaded = self._repo.get_wallets(missing)
+        with self._lock:
+            for wallet in loaded:
+                if self._generation == generation:
+                    self._wallets.put(
+                        wallet.address, (wallet.balance, wallet.owner_token)
+                    )
+                wallet_list.append(wallet)
+
+        return wallet_list
+
+    def get_wallets_by_user(self, user_token: str) -> list[Wallet]:
+        with self._lock:
+            addresses = self._user_wallets.get(user_token)
+        if addresses is not None:
+            wallet_list = self.get_wallets(list(addresses))
+            if len(wallet_list) == len(addresses):
+                return wallet_list
+
+        with self._lock:
+            generation = self._generation
+        wallet_list = self._repo.get_wallets_by_user(user_token)
+        with self._lock:
+            if self._generation == generation:
+                self._user_wallets.put(
+                    user_token, tuple(wallet.address for wallet in wallet_list)
+                )
+        return wallet_list
+
+    def count_wallets_by_user(self, user_token: str) -> int:
+        with self._lock:
+            addresses = self._user_wallets.get(user_token)
+        if addresses is not None:
+            return len(addresses)
+        return self._repo.count_wallets_by_user(user_token)
+
+    def get_wallet_activity(self, address: str) -> WalletActivity | None:
+        return self._repo.get_wallet_activity(address)
+
+    def update_wallet_balance_if_exists(
+        self, wallet_address: str, new_balance: Decimal
+    ) -> None:
+        self.update_wallet_balances({wallet_address: new_balance})
+
+    def update_wallet_balances(self, balances: dict[str, Decimal]) -> None:
+        # Written through, transfers check balances against the database
+        self._repo.update_wallet_balances(balances)
+        self.balances_committed(balances)
+
+    def balances_committed(self, balances: dict[str, Decimal]) -> None:
+        with self._lock:
+            self._generation += 1
+            for address, balance in balances.items():
+                entry = self._wallets.get(address)
+                if entry is not None:
+                    self._wallets.put(address, (balance, entry[1]))
+
+    def create_wallet(self, wallet: Wallet) -> bool:
+        if not self._repo.create_wallet(wallet):
+            return False
+
+        with self._lock:
+            self._generation += 1
+            self._wallets.put(wallet.address, (wallet.balance, wallet.owner_token))
+            self._user_wallets.pop(wallet.owner_token)
+        return True
@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, ContextManager, Iterator, Protocol
+
+from psycopg import Connection
+from psycopg_pool import ConnectionPool
+
+from infra.persistence.postgres.migrations import migrate
+
+
+@dataclass(frozen=True)
+class PostgresSettings:
+    dsn: str
+    readers: int = 4
+    writers: int = 4
+    timeout_seconds: float = 30
+
+
+class ConnectionProvider(Protocol):
+    def reader(self) -> ContextManager[Connection[Any]]:
+        pass
+
+    def writer(self) -> ContextManager[Connection[Any]]:
+        pass
+
+
+def _read_only(con: Connection[Any]) -> None:
+    con.read_only = True
+
+
+class PostgresConnectionPool:
+    def __init__(self, settings: PostgresSettings):
+        self._readers: ConnectionPool[Connection[Any]] = ConnectionPool(
+            settings.dsn,
+            min_size=1,
+            max_size=settings.readers,
+            timeout=settings.timeout_seconds,
+            configure=_read_only,
+            open=True,
+        )
+        self._writers: ConnectionPool[Connection[Any]] = ConnectionPool(
+            settings.dsn,
+            min_size=1,
+            max_size=settings.writers,
+            timeout=settings.timeout_seconds,
+            open=True,
+        )
+
+    def reader(self) -> ContextManager[Connection[Any]]:
+        return self._checkout(self._readers)
+
+    def writer(self) -> ContextManager[Connection[Any]]:
+        return self._checkout(self._writers)
+
+    def close(self) -> None:
+        self._readers.close()
+        self._writers.close()
+
+    @contextmanager
+    def _checkout(
+        self, pool: ConnectionPool[Connection[Any]]
+    ) -> Iterator[Connection[Any]]:
+        with pool.connection() as con:
+            # The pool would commit on return, repositories commit explicitly
+            try:
+                yield con
+            finally:
+                con.rollback()
+
+
+def create_db(con: Connection[Any]) -> None:
+    migrate(con)
+
+
+def initialize_schema(db: ConnectionProvider) -> None:
+    # An advisory lock inside the migration serializes concurrent workers
+    with db.writer() as con:
+        create_db(con)
@@ -0,0 +1,193 @@
+from typing import Any, Callable
+
+from psycopg import Connection
+
+from core.models.statistics import ROLLUP_RETENTION_MINUTES
+from infra.persistence.rollup import rollup
+
+Migration = Callable[[Connection[Any]], None]
+
+# Serializes workers that start together, any constant shared by them works
+MIGRATION_LOCK_ID = 0x6269_7463
+# Aggregate rows each transfer adds to, so concurrent writers rarely share one
+STATISTICS_SHARDS = 16
+
+
+def schema_version(con: Connection[Any]) -> int:
+    row = con.execute("SELECT to_regclass('schema_version')").fetchone()
+    if row is None or row[0] is None:
+        return 0
+    version = con.execute("SELECT version FROM schema_version").fetchone()
+    return 0 if version is None else int(version[0])
+
+
+def create_tables(con: Connection[Any]) -> None:
+    statements = [
+        "CREATE TABLE users"
+        "(id BIGSERIAL PRIMARY KEY, username VARCHAR NOT NULL UNIQUE,"
+        " token VARCHAR NOT NULL UNIQUE)",
+        "CREATE TABLE wallets"
+        "(id BIGSERIAL PRIMARY KEY, address VARCHAR NOT NULL UNIQUE,"
+        " user_id BIGINT NOT NULL REFERENCES users (id),"
+        " balance BIGINT NOT NULL CHECK (balance >= 0))",
+        "CREATE TABLE transactions"
+        "(id BIGSERIAL PRIMARY KEY,"
+        " from_wallet_id BIGINT NOT NULL REFERENCES wallets (id),"
+        " to_wallet_id BIGINT NOT NULL REFERENCES wallets (id),"
+        " fee BIGINT NOT NULL, amount BIGINT NOT NULL, created_at BIGINT)",
+        "CREATE TABLE statistics"
+        "(id INTEGER PRIMARY KEY CHECK (id = 1), profit BIGINT NOT NULL,"
+        " transaction_count BIGINT NOT NULL)",
+        "CREATE TABLE daily_statistics"
+        "(day VARCHAR PRIMARY KEY, profit BIGINT NOT NULL,"
+        " transaction_count BIGINT NOT NULL)",
+        "CREATE INDEX transactions_from_wallet_id ON transactions (from_wallet_id)",
+        "CREATE INDEX transactions_to_wallet_id ON transactions (to_wallet_id)",
+        "CREATE INDEX wallets_user_id ON wallets (user_id)",
+        "INSERT INTO statistics (id, profit, transaction_count) VALUES (1, 0, 0)",
+    ]
+    for statement in statements:
+        con.execute(statement)
+
+
+def add_activity_counters(con: Connection[Any]) -> None:
+    statements = [
+        "ALTER TABLE users ADD COLUMN wallet_count INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE wallets ADD COLUMN transaction_count BIGINT NOT NULL DEFAULT 0",
+        "ALTER TABLE wallets ADD COLUMN last_activity_at BIGINT",
+        "UPDATE users SET wallet_count = "
+        "(SELECT COUNT(*) FROM wallets WHERE user_id = users.id)",
+        # Split by direction so each lookup uses an index, self-transfers once
+        "UPDATE wallets SET transaction_count = "
+        "(SELECT COUNT(*) FROM transactions WHERE from_wallet_id = wallets.id) + "
+        "(SELECT COUNT(*) FROM transactions "
+        "WHERE to_wallet_id = wallets.id AND from_wallet_id != wallets.id)",
+        "UPDATE wallets SET last_activity_at = (SELECT MAX(created_at) FROM ("
+        "SELECT created_at FROM transactions WHERE from_wallet_id = wallets.id "
+        "UNION ALL "
+        "SELECT created_at FROM transactions WHERE to_wallet_id = wallets.id"
+        ") AS activity)",
+    ]
+    for statement in statements:
+        con.execute(statement)
+
+
+def add_idempotency_keys(con: Connection[Any]) -> None:
+    statements = [
+        "CREATE TABLE idempotency_keys"
+        "(user_token VARCHAR NOT NULL, key VARCHAR NOT NULL,"
+        " request_hash VARCHAR NOT NULL, created_at BIGINT NOT NULL,"
+        " from_address VARCHAR, to_address VARCHAR, fee BIGINT, amount BIGINT,"
+        " PRIMARY KEY (user_token, key))",
+        "CREATE INDEX idempotency_keys_created_at ON idempotency_keys (created_at)",
+    ]
+    for statement in statements:
+        con.execute(statement)
+
+
+def add_minute_statistics(con: Connection[Any]) -> None:
+    statements = [
+        "CREATE TABLE minute_statistics"
+        "(minute BIGINT PRIMARY KEY, volume BIGINT NOT NULL,"
+        " profit BIGINT NOT NULL, transaction_count BIGINT NOT NULL)",
+        "CREATE TABLE minute_transfer_sizes"
+        "(minute BIGINT NOT NULL, bucket INTEGER NOT NULL,"
+        " transaction_count BIGINT NOT NULL, PRIMARY KEY (minute, bucket))",
+    ]
+    for statement in statements:
+        con.execute(statement)
+
+    # Counted back from the latest transfer, older minutes are never served
+    rows = con.execute(
+        "SELECT created_at / 60, amount, COUNT(*), SUM(fee)::BIGINT "
+        "FROM transactions WHERE created_at >= "
+        "(SELECT MAX(created_at) FROM transactions) - %s GROUP BY 1, 2",
+        [ROLLUP_RETENTION_MINUTES * 60],
+    ).fetchall()
+    minutes, sizes = rollup(rows)
+    with con.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO minute_statistics "
+            "(minute, volume, profit, transaction_count) VALUES (%s, %s, %s, %s)",
+            minutes,
+        )
+        cursor.executemany(
+            "INSERT INTO minute_transfer_sizes (minute, bucket, transaction_count) "
+            "VALUES (%s, %s, %s)",
+            sizes,
+        )
+
+
+def drop_unfinished_idempotency_keys(con: Connection[Any]) -> None:
+    # Keys are now written with their transfer, claims left in flight by the
+    # old protocol would block their keys until they expire
+    con.execute("DELETE FROM idempotency_keys WHERE from_address IS NULL")
+
+
+def shard_statistics(con: Connection[Any]) -> None:
+    statements = [
+        "ALTER TABLE statistics DROP CONSTRAINT statistics_id_check",
+        "ALTER TABLE statistics RENAME COLUMN id TO shard",
+    ]
+    for table, key in [
+        ("daily_statistics", "day"),
+        ("minute_statistics", "minute"),
+        ("minute_transfer_sizes", "minute, bucket"),
+    ]:
+        statements += [
+            f"ALTER TABLE {table} ADD COLUMN shard INTEGER NOT NULL DEFAULT 0",
+            f"ALTER TABLE {table} DROP CONSTRAINT {table}_pkey",
+            f"ALTER TABLE {table} ADD PRIMARY KEY ({key}, shard)",
+            f"ALTER TABLE {table} ALTER COLUMN shard DROP DEFAULT",
+        ]
+    for statement in statements:
+        con.execute(statement)
+
+    # The existing totals stay in their row, every other shard starts at zero.
+    # A missing aggregate stays missing, transfers then rebuild it
+    con.execute(
+        "INSERT INTO statistics (shard, profit, transaction_count) "
+        "SELECT shard, 0, 0 FROM generate_series(0, %s - 1) AS shard "
+        "WHERE EXISTS (SELECT 1 FROM statistics) ON CONFLICT (shard) DO NOTHING",
+        [STATISTICS_SHARDS],
+    )
+
+
+# Each entry upgrades the schema by one version, never edit a released one
+MIGRATIONS: list[Migration] = [
+    create_tables,
+    add_activity_counters,
+    add_idempotency_keys,
+    add_minute_statistics,
+    drop_unfinished_idempotency_keys,
+    shard_statistics,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(con: Connection[Any]) -> tuple[int, int]:
+    try:
+        con.execute("SELECT pg_advisory_xact_lock(%s)", [MIGRATION_LOCK_ID])
+        # Another connection may have migrated while we waited for the lock
+        start = schema_version(con)
+        if start > SCHEMA_VERSION:
+            raise RuntimeError(
+                f"Database schema version {start} is newer than {SCHEMA_VERSION}"
+            )
+
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"
+        )
+        for version in range(start, SCHEMA_VERSION):
+            MIGRATIONS[version](con)
+        con.execute("DELETE FROM schema_version")
+        con.execute(
+            "INSERT INTO schema_version (version) VALUES (%s)", [SCHEMA_VERSION]
+        )
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+
+    return start, SCHEMA_VERSION
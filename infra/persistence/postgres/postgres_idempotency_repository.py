@@ -0,0 +1,27 @@
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from core.models.idempotency import IdempotencyRecord
+from infra.persistence.postgres.db_setup import ConnectionProvider
+from infra.persistence.rows import row_to_record
+
+IDEMPOTENCY_SELECT = (
+    "SELECT request_hash, from_address, to_address, fee, amount "
+    "FROM idempotency_keys WHERE user_token = %s AND key = %s AND created_at > %s"
+)
+
+
+@dataclass
+class PostgresIdempotencyRepository:
+    db: ConnectionProvider
+    ttl_seconds: int
+    clock: Callable[[], float] = field(default=time.time)
+
+    def get(self, user_token: str, key: str) -> IdempotencyRecord | None:
+        with self.db.reader() as conn:
+            row = conn.execute(
+                IDEMPOTENCY_SELECT,
+                [user_token, key, int(self.clock()) - self.ttl_seconds],
+            ).fetchone()
+        return None if row is None else row_to_record(row)
@@ -0,0 +1,485 @@
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+from psycopg import Cursor
+
+from core.models.bitcoin import from_satoshis, to_satoshis
+from core.models.idempotency import IdempotencyKey
+from core.models.statistics import (
+    ROLLUP_RETENTION_MINUTES,
+    MinuteStatistics,
+    Statistics,
+)
+from core.models.transaction import Transaction
+from core.repositories.transaction_repository import TransactionRepository
+from core.repositories.wallet_repository import BalanceListener
+from infra.persistence.postgres.db_setup import ConnectionProvider
+from infra.persistence.postgres.migrations import STATISTICS_SHARDS
+from infra.persistence.rollup import (
+    AmountRow,
+    day_of,
+    minute_of,
+    rollup,
+    rows_to_minutes,
+)
+from infra.persistence.rows import row_to_transaction
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_SELECT = (
+    "SELECT wf.address, wt.address, t.fee, t.amount, t.id, t.created_at "
+    "FROM transactions t "
+    "JOIN wallets wf ON t.from_wallet_id = wf.id "
+    "JOIN wallets wt ON t.to_wallet_id = wt.id "
+)
+
+WALLET_TRANSACTIONS_QUERY = (
+    "WITH wallet AS (SELECT id FROM wallets WHERE address = %(key)s) "
+    f"{TRANSACTION_SELECT}"
+    "WHERE t.from_wallet_id = (SELECT id FROM wallet) AND t.id > %(after_id)s "
+    "UNION ALL "
+    f"{TRANSACTION_SELECT}"
+    "WHERE t.to_wallet_id = (SELECT id FROM wallet) AND t.id > %(after_id)s "
+    "AND t.from_wallet_id != t.to_wallet_id "
+    "ORDER BY 5 LIMIT %(limit)s"
+)
+
+USER_TRANSACTIONS_QUERY = (
+    "WITH user_wallets AS ("
+    "SELECT w.id FROM wallets w JOIN users u ON w.user_id = u.id "
+    "WHERE u.token = %(key)s"
+    ") "
+    f"{TRANSACTION_SELECT}"
+    "WHERE t.from_wallet_id IN (SELECT id FROM user_wallets) "
+    "AND t.id > %(after_id)s "
+    "UNION ALL "
+    f"{TRANSACTION_SELECT}"
+    "WHERE t.to_wallet_id IN (SELECT id FROM user_wallets) AND t.id > %(after_id)s "
+    "AND t.from_wallet_id NOT IN (SELECT id FROM user_wallets) "
+    "ORDER BY 5 LIMIT %(limit)s"
+)
+
+
+def page_arguments(key: str, limit: int | None, after_id: int) -> dict[str, Any]:
+    # Postgres treats LIMIT NULL as no limit at all
+    return {"key": key, "after_id": after_id, "limit": limit}
+
+
+def export_query(
+    wallet_address: str | None, since: int | None, until: int | None, limit: int
+) -> tuple[str, dict[str, Any]]:
+    conditions = ["t.id > %(after_id)s"]
+    arguments: dict[str, Any] = {"address": wallet_address, "limit": limit}
+    if since is not None:
+        conditions.append("t.created_at >= %(since)s")
+        arguments["since"] = since
+    if until is not None:
+        conditions.append("t.created_at < %(until)s")
+        arguments["until"] = until
+    where = " AND ".join(conditions)
+
+    if wallet_address is None:
+        return (
+            f"{TRANSACTION_SELECT}WHERE {where} ORDER BY t.id LIMIT %(limit)s",
+            arguments,
+        )
+
+    query = (
+        "WITH wallet AS (SELECT id FROM wallets WHERE address = %(address)s) "
+        f"{TRANSACTION_SELECT}"
+        f"WHERE t.from_wallet_id = (SELECT id FROM wallet) AND {where} "
+        "UNION ALL "
+        f"{TRANSACTION_SELECT}"
+        f"WHERE t.to_wallet_id = (SELECT id FROM wallet) AND {where} "
+        "AND t.from_wallet_id != t.to_wallet_id "
+        "ORDER BY 5 LIMIT %(limit)s"
+    )
+    return query, arguments
+
+
+@dataclass
+class PostgresTransactionRepository(TransactionRepository):
+    db: ConnectionProvider
+    clock: Callable[[], float] = field(default=time.time)
+    export_batch_size: int = 1000
+    balance_listeners: list[BalanceListener] = field(default_factory=list)
+    idempotency_ttl_seconds: int = 24 * 60 * 60
+    pruned_minute: int = field(default=0, init=False, repr=False)
+
+    def add_transaction(self, transaction: Transaction) -> None:
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+            id1 = self._get_wallet_id(cursor, transaction.from_wallet_address)
+            id2 = self._get_wallet_id(cursor, transaction.to_wallet_address)
+
+            created_at = int(self.clock())
+            cursor.executemany(
+                "UPDATE wallets SET transaction_count = transaction_count + 1, "
+                "last_activity_at = %s WHERE id = %s",
+                [(created_at, wallet_id) for wallet_id in {id1, id2}],
+            )
+            self._insert_transactions(
+                cursor,
+                [
+                    (
+                        id1,
+                        id2,
+                        to_satoshis(transaction.fee),
+                        to_satoshis(transaction.amount),
+                    )
+                ],
+                created_at,
+            )
+            conn.commit()
+
+    def transfer(
+        self, transaction: Transaction, idempotency_key: IdempotencyKey | None = None
+    ) -> bool:
+        return self.transfer_many([transaction], True, [idempotency_key])[0]
+
+    def transfer_many(
+        self,
+        transactions: list[Transaction],
+        atomic: bool,
+        idempotency_keys: list[IdempotencyKey | None] | None = None,
+    ) -> list[bool]:
+        amounts = [
+            (to_satoshis(transaction.fee), to_satoshis(transaction.amount))
+            for transaction in transactions
+        ]
+        keys = idempotency_keys or [None] * len(transactions)
+        addresses = {
+            address
+            for transaction in transactions
+            for address in (
+                transaction.from_wallet_address,
+                transaction.to_wallet_address,
+            )
+        }
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+            # Rows are locked in id order so overlapping transfers cannot deadlock,
+            # transfers between other wallets proceed in parallel
+            cursor.execute(
+                "SELECT id, address, balance FROM wallets WHERE address = ANY(%s) "
+                "ORDER BY id FOR UPDATE",
+                [list(addresses)],
+            )
+            wallets = {row[1]: (row[0], row[2]) for row in cursor.fetchall()}
+            balances = {address: balance for address, (_, balance) in wallets.items()}
+
+            results = []
+            rows = []
+            activity: Counter[str] = Counter()
+            for transaction, (fee, amount), key in zip(transactions, amounts, keys):
+                source = transaction.from_wallet_address
+                destination = transaction.to_wallet_address
+                if (
+                    source not in wallets
+                    or destination not in wallets
+                    or balances[source] < fee + amount
+                    or (
+                        key is not None
+                        and not self._store_key(cursor, key, transaction)
+                    )
+                ):
+                    results.append(False)
+                    continue
+
+                balances[source] -= fee + amount
+                balances[destination] += amount
+                rows.append((wallets[source][0], wallets[destination][0], fee, amount))
+                activity.update({source, destination})
+                results.append(True)
+
+            if not rows or (atomic and len(rows) != len(transactions)):
+                return results
+
+            created_at = int(self.clock())
+            deltas = {
+                address: balances[address] - wallets[address][1] for address in activity
+            }
+            # Touched wallets are updated even when their balance nets to zero
+            cursor.executemany(
+                "UPDATE wallets SET balance = balance + %s, "
+                "transaction_count = transaction_count + %s, last_activity_at = %s "
+                "WHERE id = %s AND balance + %s >= 0",
+                [
+                    (delta, activity[address], created_at, wallets[address][0], delta)
+                    for address, delta in deltas.items()
+                ],
+            )
+            if cursor.rowcount != len(deltas):
+                return [False] * len(transactions)
+
+            self._insert_transactions(cursor, rows, created_at)
+            conn.commit()
+
+        # Writers commit concurrently, so unlike SQLite listeners can receive
+        # a wallet's balances out of commit order
+        committed = {
+            address: from_satoshis(balances[address])
+            for address, delta in deltas.items()
+            if delta != 0
+        }
+        for listener in self.balance_listeners:
+            try:
+                listener.balances_committed(committed)
+            except Exception:
+                # The transfers are committed, raising would get them retried
+                logger.exception("Balance listener failed after commit")
+        return results
+
+    def get_transactions(
+        self, wallet_address: str, limit: int | None = None, after_id: int = 0
+    ) -> list[Transaction]:
+        with self.db.reader() as conn:
+            rows = conn.execute(
+                WALLET_TRANSACTIONS_QUERY,
+                page_arguments(wallet_address, limit, after_id),
+            ).fetchall()
+        return [row_to_transaction(row) for row in rows]
+
+    def get_user_transactions(
+        self, user_token: str, limit: int | None = None, after_id: int = 0
+    ) -> list[Transaction]:
+        with self.db.reader() as conn:
+            rows = conn.execute(
+                USER_TRANSACTIONS_QUERY, page_arguments(user_token, limit, after_id)
+            ).fetchall()
+        return [row_to_transaction(row) for row in rows]
+
+    def get_all_transactions(self) -> list[Transaction]:
+        with self.db.reader() as conn:
+            rows = conn.execute(f"{TRANSACTION_SELECT}ORDER BY t.id").fetchall()
+        return [row_to_transaction(row) for row in rows]
+
+    def iter_transactions(
+        self,
+        wallet_address: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> Iterator[Transaction]:
+        query, arguments = export_query(
+            wallet_address, since, until, self.export_batch_size
+        )
+        # Read a page at a time by id, the connection goes back to the pool
+        # between pages so a slow client never holds a reader
+        after_id = 0
+        while True:
+            with self.db.reader() as conn:
+                rows = conn.execute(
+                    query, {**arguments, "after_id": after_id}
+                ).fetchall()
+            for row in rows:
+                yield row_to_transaction(row)
+            if len(rows) < self.export_batch_size:
+                return
+            after_id = rows[-1][4]
+
+    def get_statistics(self) -> Statistics:
+        with self.db.reader() as conn:
+            row = conn.execute(
+                "SELECT SUM(profit)::BIGINT, SUM(transaction_count)::BIGINT, "
+                "COUNT(*) FROM statistics"
+            ).fetchone()
+        if row is None or row[2] == 0:
+            return self.rebuild_statistics()
+
+        return Statistics(from_satoshis(row[0]), row[1])
+
+    def get_daily_statistics(self) -> dict[str, Statistics]:
+        with self.db.reader() as conn:
+            rows = conn.execute(
+                "SELECT day, SUM(profit)::BIGINT, SUM(transaction_count)::BIGINT "
+                "FROM daily_statistics GROUP BY day ORDER BY day"
+            ).fetchall()
+        return {row[0]: Statistics(from_satoshis(row[1]), row[2]) for row in rows}
+
+    def get_minute_statistics(
+        self, since_minute: int, until_minute: int
+    ) -> list[MinuteStatistics]:
+        with self.db.reader() as conn:
+            minutes = conn.execute(
+                "SELECT minute, SUM(volume)::BIGINT, SUM(profit)::BIGINT, "
+                "SUM(transaction_count)::BIGINT FROM minute_statistics "
+                "WHERE minute BETWEEN %s AND %s GROUP BY minute",
+                [since_minute, until_minute],
+            ).fetchall()
+            sizes = conn.execute(
+                "SELECT minute, bucket, SUM(transaction_count)::BIGINT "
+                "FROM minute_transfer_sizes WHERE minute BETWEEN %s AND %s "
+                "GROUP BY minute, bucket",
+                [since_minute, until_minute],
+            ).fetchall()
+        return rows_to_minutes(minutes, sizes)
+
+    def rebuild_statistics(self) -> Statistics:
+        with self.db.writer() as conn:
+            total = self._rebuild_statistics(conn.cursor())
+            conn.commit()
+        return total
+
+    def _get_wallet_id(self, cursor: Cursor[Any], address: str) -> int:
+        data = cursor.execute(
+            "SELECT id FROM wallets WHERE address = %s", [address]
+        ).fetchone()
+        assert data is not None
+        return int(data[0])
+
+    def _insert_transactions(
+        self,
+        cursor: Cursor[Any],
+        rows: list[tuple[int, int, int, int]],
+        created_at: int,
+    ) -> None:
+        cursor.executemany(
+            "INSERT INTO transactions "
+            "(from_wallet_id, to_wallet_id, fee, amount, created_at) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [(*row, created_at) for row in rows],
+        )
+        # Aggregates are sharded by the paying wallet, so transfers between
+        # other wallets add to other rows and commit without waiting on this one
+        shard = rows[0][0] % STATISTICS_SHARDS
+        self._record_rollup(
+            cursor,
+            [(minute_of(created_at), amount, 1, fee) for _, _, fee, amount in rows],
+            shard,
+        )
+        self._record_statistics(
+            cursor, sum(fee for _, _, fee, _ in rows), len(rows), created_at, shard
+        )
+
+    def _rebuild_statistics(self, cursor: Cursor[Any]) -> Statistics:
+        # Blocks transfers until the rebuilt totals are committed
+        cursor.execute("LOCK TABLE transactions IN SHARE MODE")
+        row = cursor.execute(
+            "SELECT COALESCE(SUM(fee), 0), COUNT(*) FROM transactions"
+        ).fetchone()
+        assert row is not None
+        profit, count = row
+
+        cursor.execute("DELETE FROM statistics")
+        cursor.execute("DELETE FROM daily_statistics")
+        # The totals land in the first shard, the others start again from zero
+        cursor.executemany(
+            "INSERT INTO statistics (shard, profit, transaction_count) "
+            "VALUES (%s, %s, %s)",
+            [(0, profit, count)]
+            + [(shard, 0, 0) for shard in range(1, STATISTICS_SHARDS)],
+        )
+        # Rows written before timestamps were recorded belong to no period
+        cursor.execute(
+            "INSERT INTO daily_statistics (day, shard, profit, transaction_count) "
+            "SELECT to_char(to_timestamp(created_at) AT TIME ZONE 'UTC', "
+            "'YYYY-MM-DD'), 0, SUM(fee), COUNT(*) "
+            "FROM transactions WHERE created_at IS NOT NULL GROUP BY 1"
+        )
+        self._rebuild_rollup(cursor)
+
+        return Statistics(from_satoshis(profit), count)
+
+    def _rebuild_rollup(self, cursor: Cursor[Any]) -> None:
+        since = (minute_of(int(self.clock())) - ROLLUP_RETENTION_MINUTES + 1) * 60
+        rows = cursor.execute(
+            "SELECT created_at / 60, amount, COUNT(*), SUM(fee)::BIGINT "
+            "FROM transactions WHERE created_at >= %s GROUP BY 1, 2",
+            [since],
+        ).fetchall()
+        cursor.execute("DELETE FROM minute_statistics")
+        cursor.execute("DELETE FROM minute_transfer_sizes")
+        self._record_rollup(cursor, rows, 0)
+
+    def _store_key(
+        self,
+        cursor: Cursor[Any],
+        key: IdempotencyKey,
+        transaction: Transaction,
+    ) -> bool:
+        created_at = int(self.clock())
+        # A concurrent insert of the same key waits here until the first commits
+        cursor.execute(
+            "INSERT INTO idempotency_keys (user_token, key, request_hash, "
+            "created_at, from_address, to_address, fee, amount) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+            "ON CONFLICT (user_token, key) DO UPDATE SET "
+            "request_hash = excluded.request_hash, created_at = excluded.created_at, "
+            "from_address = excluded.from_address, to_address = excluded.to_address, "
+            "fee = excluded.fee, amount = excluded.amount "
+            "WHERE idempotency_keys.created_at <= %s",
+            [
+                key.user_token,
+                key.key,
+                key.request_hash,
+                created_at,
+                transaction.from_wallet_address,
+                transaction.to_wallet_address,
+                to_satoshis(transaction.fee),
+                to_satoshis(transaction.amount),
+                created_at - self.idempotency_ttl_seconds,
+            ],
+        )
+        return cursor.rowcount == 1
+
+    def _record_rollup(
+        self, cursor: Cursor[Any], rows: list[AmountRow], shard: int
+    ) -> None:
+        minutes, sizes = rollup(rows)
+        cursor.executemany(
+            "INSERT INTO minute_statistics "
+            "(minute, volume, profit, transaction_count, shard) "
+            "VALUES (%s, %s, %s, %s, %s) ON CONFLICT (minute, shard) DO UPDATE SET "
+            "volume = minute_statistics.volume + excluded.volume, "
+            "profit = minute_statistics.profit + excluded.profit, "
+            "transaction_count = minute_statistics.transaction_count "
+            "+ excluded.transaction_count",
+            [(*minute, shard) for minute in minutes],
+        )
+        cursor.executemany(
+            "INSERT INTO minute_transfer_sizes "
+            "(minute, bucket, transaction_count, shard) "
+            "VALUES (%s, %s, %s, %s) ON CONFLICT (minute, bucket, shard) DO UPDATE SET "
+            "transaction_count = minute_transfer_sizes.transaction_count "
+            "+ excluded.transaction_count",
+            [(*size, shard) for size in sizes],
+        )
+
+        # Minutes past the longest window are dropped once per new minute
+        latest = max((minute for minute, *_ in minutes), default=0)
+        if latest > self.pruned_minute:
+            self.pruned_minute = latest
+            for table in ("minute_statistics", "minute_transfer_sizes"):
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE minute <= %s",
+                    [latest - ROLLUP_RETENTION_MINUTES],
+                )
+            cursor.execute(
+                "DELETE FROM idempotency_keys WHERE created_at <= %s",
+                [latest * 60 - self.idempotency_ttl_seconds],
+            )
+
+    def _record_statistics(
+        self, cursor: Cursor[Any], fee: int, count: int, created_at: int, shard: int
+    ) -> None:
+        cursor.execute(
+            "UPDATE statistics SET profit = profit + %s, "
+            "transaction_count = transaction_count + %s WHERE shard = %s",
+            [fee, count, shard],
+        )
+        if cursor.rowcount == 0:
+            # The ledger predates the aggregate, the new rows are already included
+            self._rebuild_statistics(cursor)
+            return
+
+        cursor.execute(
+            "INSERT INTO daily_statistics (day, shard, profit, transaction_count) "
+            "VALUES (%s, %s, %s, %s) ON CONFLICT (day, shard) DO UPDATE SET "
+            "profit = daily_statistics.profit + excluded.profit, "
+            "transaction_count = daily_statistics.transaction_count "
+            "+ excluded.transaction_count",
+            [day_of(created_at), shard, fee, count],
+        )
@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+from typing import Iterator
+
+from psycopg import IntegrityError
+
+from core.models.user import User
+from infra.persistence.postgres.db_setup import ConnectionProvider
+
+
+@dataclass
+class PostgresUserRepository:
+    db: ConnectionProvider
+    batch_size: int = 1000
+
+    def create_user(self, user: User) -> bool:
+        with self.db.writer() as conn:
+            try:
+                conn.execute(
+                    "INSERT INTO users (username, token) VALUES (%s, %s)",
+                    [user.username, user.token],
+                )
+                conn.commit()
+                return True
+            # If unique constraint is violated
+            except IntegrityError:
+                conn.rollback()
+                return False
+
+    def get_user(self, token: str) -> User | None:
+        with self.db.reader() as conn:
+            row = conn.execute(
+                "SELECT username, token FROM users WHERE token = %s", [token]
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return User(row[0], row[1])
+
+    def username_taken(self, username: str) -> bool:
+        with self.db.reader() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM users WHERE username = %s", [username]
+            ).fetchone()
+        return row is not None
+
+    def iter_usernames(self) -> Iterator[str]:
+        with self.db.reader() as conn:
+            # A named cursor streams from the server instead of loading every row
+            with conn.cursor(name="usernames") as cursor:
+                cursor.execute("SELECT username FROM users")
+                while rows := cursor.fetchmany(self.batch_size):
+                    for row in rows:
+                        yield row[0]
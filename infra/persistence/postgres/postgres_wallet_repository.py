@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+from core.models.bitcoin import from_satoshis, to_satoshis
+from core.models.wallet import Wallet, WalletActivity
+from infra.persistence.postgres.db_setup import ConnectionProvider
+
+WALLET_SELECT = (
+    "SELECT w.address, w.balance, u.token "
+    "FROM wallets w JOIN users u ON w.user_id = u.id "
+)
+
+
+class PostgresWalletRepository:
+    def __init__(self, db: ConnectionProvider):
+        self._db = db
+
+    def get_wallet(self, address: str) -> Wallet | None:
+        with self._db.reader() as con:
+            row = con.execute(
+                f"{WALLET_SELECT}WHERE w.address = %s", [address]
+            ).fetchone()
+        if row is None:
+            return None
+
+        return Wallet(row[0], from_satoshis(row[1]), row[2])
+
+    def get_wallets(self, addresses: list[str]) -> list[Wallet]:
+        with self._db.reader() as con:
+            rows = con.execute(
+                f"{WALLET_SELECT}WHERE w.address = ANY(%s) ORDER BY w.id",
+                [addresses],
+            ).fetchall()
+
+        return [Wallet(row[0], from_satoshis(row[1]), row[2]) for row in rows]
+
+    def get_wallets_by_user(self, user_token: str) -> list[Wallet]:
+        with self._db.reader() as con:
+            rows = con.execute(
+                f"{WALLET_SELECT}WHERE u.token = %s ORDER BY w.id", [user_token]
+            ).fetchall()
+
+        return [Wallet(row[0], from_satoshis(row[1]), row[2]) for row in rows]
+
+    def count_wallets_by_user(self, user_token: str) -> int:
+        with self._db.reader() as con:
+            row = con.execute(
+                "SELECT wallet_count FROM users WHERE token = %s", [user_token]
+            ).fetchone()
+        return 0 if row is None else int(row[0])
+
+    def get_wallet_activity(self, address: str) -> WalletActivity | None:
+        with self._db.reader() as con:
+            row = con.execute(
+                "SELECT transaction_count, last_activity_at FROM wallets "
+                "WHERE address = %s",
+                [address],
+            ).fetchone()
+        if row is None:
+            return None
+
+        return WalletActivity(row[0], row[1])
+
+    def update_wallet_balance_if_exists(
+        self, wallet_address: str, new_balance: Decimal
+    ) -> None:
+        self.update_wallet_balances({wallet_address: new_balance})
+
+    def update_wallet_balances(self, balances: dict[str, Decimal]) -> None:
+        with self._db.writer() as con:
+            con.cursor().executemany(
+                "UPDATE wallets SET balance = %s WHERE address = %s",
+                [
+                    (to_satoshis(balance), address)
+                    for address, balance in balances.items()
+                ],
+            )
+
+            con.commit()
+
+    def create_wallet(self, wallet: Wallet) -> bool:
+        with self._db.writer() as con:
+            user = con.execute(
+                "UPDATE users SET wallet_count = wallet_count + 1 "
+                "WHERE token = %s RETURNING id",
+                [wallet.owner_token],
+            ).fetchone()
+            if user is None:
+                return False
+
+            con.execute(
+                "INSERT INTO wallets (address, user_id, balance) VALUES (%s, %s, %s)",
+                [wallet.address, user[0], to_satoshis(wallet.balance)],
+            )
+
+            con.commit()
+
+        return True
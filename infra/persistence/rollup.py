@@ -0,0 +1,54 @@
+import time
+from collections import Counter
+from typing import Iterable
+
+from core.models.bitcoin import from_satoshis
+from core.models.statistics import MinuteStatistics, size_bucket
+
+# minute, amount, transfer count, fees; several transfers may share an amount
+AmountRow = tuple[int, int, int, int]
+MinuteRow = tuple[int, int, int, int]
+SizeRow = tuple[int, int, int]
+
+
+def minute_of(timestamp: int) -> int:
+    return timestamp // 60
+
+
+def day_of(timestamp: int) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+
+
+def rollup(rows: Iterable[AmountRow]) -> tuple[list[MinuteRow], list[SizeRow]]:
+    totals: dict[int, list[int]] = {}
+    sizes: Counter[tuple[int, int]] = Counter()
+    for minute, amount, count, fee in rows:
+        minute_totals = totals.setdefault(minute, [0, 0, 0])
+        minute_totals[0] += amount * count
+        minute_totals[1] += fee
+        minute_totals[2] += count
+        sizes[minute, size_bucket(amount)] += count
+
+    # Sorted by key so concurrent upserts lock shared rows in the same order
+    return (
+        [
+            (minute, volume, profit, count)
+            for minute, (volume, profit, count) in sorted(totals.items())
+        ],
+        [(minute, bucket, count) for (minute, bucket), count in sorted(sizes.items())],
+    )
+
+
+def rows_to_minutes(
+    minute_rows: Iterable[MinuteRow], size_rows: Iterable[SizeRow]
+) -> list[MinuteStatistics]:
+    minutes = {
+        minute: MinuteStatistics(
+            minute, from_satoshis(volume), from_satoshis(profit), count
+        )
+        for minute, volume, profit, count in minute_rows
+    }
+    for minute, bucket, count in size_rows:
+        if minute in minutes:
+            minutes[minute].sizes[bucket] = count
+    return sorted(minutes.values(), key=lambda statistics: statistics.minute)
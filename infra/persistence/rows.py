@@ -0,0 +1,28 @@
+from typing import Any
+
+from core.models.bitcoin import from_satoshis
+from core.models.idempotency import IdempotencyRecord
+from core.models.transaction import Transaction
+
+Row = tuple[Any, ...]
+# request hash, from address, to address, fee, amount
+RecordRow = tuple[str, str, str, int, int]
+
+
+def row_to_transaction(row: Row) -> Transaction:
+    return Transaction(
+        row[0], row[1], from_satoshis(row[2]), from_satoshis(row[3]), row[4], row[5]
+    )
+
+
+def row_to_record(row: RecordRow) -> IdempotencyRecord:
+    request_hash, from_address, to_address, fee, amount = row
+    return IdempotencyRecord(
+        request_hash,
+        Transaction(
+            from_address,
+            to_address,
+            from_satoshis(fee),
+            from_satoshis(amount),
+        ),
+    )
@@ -1,27 +1,185 @@
+import fcntl
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
 from sqlite3 import Connection
+from typing import Callable, ContextManager, Iterator, Protocol
 
+from infra.persistence.sqlite.migrations import migrate
 
-def get_db_connection() -> Connection:
-    return sqlite3.connect("app.db", check_same_thread=False)
+# Stays below SQLITE_MAX_VARIABLE_NUMBER on every SQLite version
+MAX_QUERY_PARAMETERS = 500
+
+
+@dataclass(frozen=True)
+class SqliteSettings:
+    path: str = "app.db"
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    busy_timeout_ms: int = 5000
+    mmap_size_bytes: int = 256 * 1024 * 1024
+    cache_size_kib: int = 16 * 1024
+    readers: int = 4
+    writers: int = 1
+
+
+class ConnectionProvider(Protocol):
+    def reader(self) -> ContextManager[Connection]:
+        pass
+
+    def writer(self) -> ContextManager[Connection]:
+        pass
+
+
+def connect(
+    settings: SqliteSettings,
+    read_only: bool = False,
+    factory: type[Connection] = Connection,
+) -> Connection:
+    con = sqlite3.connect(
+        settings.path,
+        timeout=settings.busy_timeout_ms / 1000,
+        check_same_thread=False,
+        factory=factory,
+    )
+    con.execute(f"PRAGMA journal_mode = {settings.journal_mode}")
+    con.execute(f"PRAGMA synchronous = {settings.synchronous}")
+    con.execute(f"PRAGMA busy_timeout = {settings.busy_timeout_ms}")
+    con.execute(f"PRAGMA mmap_size = {settings.mmap_size_bytes}")
+    # A negative cache size is measured in KiB rather than pages
+    con.execute(f"PRAGMA cache_size = -{settings.cache_size_kib}")
+    if read_only:
+        con.execute("PRAGMA query_only = ON")
+    return con
+
+
+class SharedConnection:
+    def __init__(self, con: Connection):
+        self._con = con
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def reader(self) -> Iterator[Connection]:
+        with self._lock:
+            yield self._con
+
+    @contextmanager
+    def writer(self) -> Iterator[Connection]:
+        with self._lock:
+            try:
+                yield self._con
+            finally:
+                if self._con.in_transaction:
+                    self._con.rollback()
+
+
+class _Pool:
+    def __init__(self, factory: Callable[[], Connection], size: int):
+        self._factory = factory
+        self._size = size
+        self._created = 0
+        self._idle: queue.LifoQueue[Connection] = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @contextmanager
+    def checkout(self) -> Iterator[Connection]:
+        con = self._acquire()
+        try:
+            yield con
+        finally:
+            if con.in_transaction:
+                con.rollback()
+            self._release(con)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _acquire(self) -> Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            create = self._created < self._size
+            if create:
+                self._created += 1
+
+        if create:
+            try:
+                return self._factory()
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        return self._idle.get()
+
+    def _release(self, con: Connection) -> None:
+        with self._lock:
+            closed = self._closed
+        if closed:
+            con.close()
+        else:
+            self._idle.put(con)
+
+
+class SqliteConnectionPool:
+    def __init__(
+        self,
+        settings: SqliteSettings,
+        on_connect: Callable[[Connection], None] | None = None,
+        factory: type[Connection] = Connection,
+    ):
+        def open_connection(read_only: bool) -> Connection:
+            con = connect(settings, read_only, factory)
+            if on_connect is not None:
+                on_connect(con)
+            return con
+
+        self._readers = _Pool(lambda: open_connection(True), settings.readers)
+        self._writers = _Pool(lambda: open_connection(False), settings.writers)
+
+    def reader(self) -> ContextManager[Connection]:
+        return self._readers.checkout()
+
+    def writer(self) -> ContextManager[Connection]:
+        return self._writers.checkout()
+
+    def close(self) -> None:
+        self._readers.close()
+        self._writers.close()
 
 
 def create_db(con: Connection) -> None:
-    create_tables = [
-        "CREATE TABLE IF NOT EXISTS users"
-        "(id INTEGER PRIMARY KEY AUTOINCREMENT, username VARCHAR, token VARCHAR,"
-        "UNIQUE (username),"
-        "UNIQUE (token))",
-        "CREATE TABLE IF NOT EXISTS wallets"
-        "(id INTEGER PRIMARY KEY AUTOINCREMENT, address VARCHAR,"
-        " user_id INTEGER, balance VARCHAR,"
-        "FOREIGN KEY (user_id) REFERENCES users (id),"
-        "UNIQUE (address))",
-        "CREATE TABLE IF NOT EXISTS transactions"
-        "(id INTEGER PRIMARY KEY AUTOINCREMENT, from_wallet_id INTEGER, "
-        " to_wallet_id INTEGER, fee VARCHAR, amount VARCHAR, "
-        "FOREIGN KEY (from_wallet_id) REFERENCES wallets (id),"
-        "FOREIGN KEY (to_wallet_id) REFERENCES wallets (id))",
-    ]
-    for statement in create_tables:
-        con.cursor().execute(statement)
+    migrate(con)
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    with open(path, "a") as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def initialize_schema(db: ConnectionProvider, lock_path: str) -> None:
+    # Worker processes start together, one migrates while the rest wait for it
+    # instead of timing out on the database lock
+    with file_lock(lock_path):
+        with db.writer() as con:
+            create_db(con)
+            con.commit()
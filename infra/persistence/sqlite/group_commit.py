@@ -0,0 +1,170 @@
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from core.models.idempotency import IdempotencyKey
+from core.models.statistics import MinuteStatistics, Statistics
+from core.models.transaction import Transaction
+from core.repositories.transaction_repository import TransactionRepository
+from infra.metrics.statements import counting_for
+from infra.persistence.sqlite.profiler import profiling_for
+
+
+@dataclass
+class PendingTransfer:
+    transaction: Transaction
+    result: "Future[bool]"
+    idempotency_key: IdempotencyKey | None = None
+    # The caller's request context, where its statements are counted
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+
+
+class GroupCommitTransactionRepository:
+    def __init__(
+        self,
+        repo: TransactionRepository,
+        max_batch_size: int = 256,
+        max_wait_us: int = 200,
+    ):
+        self._repo = repo
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_us / 1_000_000
+
+        self._queue: queue.SimpleQueue[PendingTransfer | None] = queue.SimpleQueue()
+        # Held while enqueueing so nothing lands behind the stop marker
+        self._lock = threading.Lock()
+        self._writer: threading.Thread | None = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                return
+
+            self._writer = threading.Thread(
+                target=self._write_batches, name="group-commit", daemon=True
+            )
+            self._writer.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            writer, self._writer = self._writer, None
+            if writer is None:
+                return
+            self._queue.put(None)
+        writer.join()
+
+    def transfer(
+        self, transaction: Transaction, idempotency_key: IdempotencyKey | None = None
+    ) -> bool:
+        with self._lock:
+            if self._writer is None:
+                return self._repo.transfer(transaction, idempotency_key)
+
+            pending = PendingTransfer(transaction, Future(), idempotency_key)
+            self._queue.put(pending)
+        return pending.result.result()
+
+    def transfer_many(
+        self,
+        transactions: list[Transaction],
+        atomic: bool,
+        idempotency_keys: list[IdempotencyKey | None] | None = None,
+    ) -> list[bool]:
+        # Already one commit for the whole batch
+        return self._repo.transfer_many(transactions, atomic, idempotency_keys)
+
+    def add_transaction(self, transaction: Transaction) -> None:
+        self._repo.add_transaction(transaction)
+
+    def get_transactions(
+        self, wallet_address: str, limit: int | None = None, after_id: int = 0
+    ) -> list[Transaction]:
+        return self._repo.get_transactions(wallet_address, limit, after_id)
+
+    def get_user_transactions(
+        self, user_token: str, limit: int | None = None, after_id: int = 0
+    ) -> list[Transaction]:
+        return self._repo.get_user_transactions(user_token, limit, after_id)
+
+    def get_all_transactions(self) -> list[Transaction]:
+        return self._repo.get_all_transactions()
+
+    def iter_transactions(
+        self,
+        wallet_address: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> Iterator[Transaction]:
+        return self._repo.iter_transactions(wallet_address, since, until)
+
+    def get_statistics(self) -> Statistics:
+        return self._repo.get_statistics()
+
+    def get_daily_statistics(self) -> dict[str, Statistics]:
+        return self._repo.get_daily_statistics()
+
+    def get_minute_statistics(
+        self, since_minute: int, until_minute: int
+    ) -> list[MinuteStatistics]:
+        return self._repo.get_minute_statistics(since_minute, until_minute)
+
+    def _write_batches(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = [first]
+            deadline = time.monotonic() + self._max_wait
+            while len(batch) < self._max_batch_size:
+                try:
+                    pending = self._queue.get(
+                        timeout=max(deadline - time.monotonic(), 0)
+                    )
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+
+            self._commit(batch)
+
+    def _commit(self, batch: list[PendingTransfer]) -> None:
+        contexts = [pending.context for pending in batch]
+        try:
+            # Every caller is charged the whole batch's statements
+            with profiling_for(contexts), counting_for(contexts):
+                # Non-atomic keeps each transfer independent, as if run one by one
+                results = self._repo.transfer_many(
+                    [pending.transaction for pending in batch],
+                    atomic=False,
+                    idempotency_keys=[pending.idempotency_key for pending in batch],
+                )
+        except BaseException as error:
+            if len(batch) == 1:
+                batch[0].result.set_exception(error)
+                return
+            # One bad transfer must not fail the rest, retry them separately. The
+            # repository raises only before its commit, so none of them was applied
+            for pending in batch:
+                self._commit_one(pending)
+            return
+
+        for pending, success in zip(batch, results):
+            pending.result.set_result(success)
+
+    def _commit_one(self, pending: PendingTransfer) -> None:
+        try:
+            pending.result.set_result(
+                pending.context.run(
+                    self._repo.transfer, pending.transaction, pending.idempotency_key
+                )
+            )
+        except BaseException as error:
+            pending.result.set_exception(error)
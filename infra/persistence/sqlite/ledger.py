@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, replace
+from sqlite3 import Connection, Cursor
+from typing import Iterator
+from urllib.request import pathname2url
+
+# Rows written before timestamps were recorded belong to no period
+UNDATED_PERIOD = "0000-00"
+ARCHIVE_DIRECTORY = "ledger"
+
+
+@dataclass(frozen=True)
+class Partition:
+    period: str
+    table_name: str
+    first_id: int
+    last_id: int
+    archive_path: str | None = None
+
+
+def period_of(timestamp: int | None) -> str:
+    if timestamp is None:
+        return UNDATED_PERIOD
+    return time.strftime("%Y-%m", time.gmtime(timestamp))
+
+
+def shift_period(period: str, months: int) -> str:
+    year, month = map(int, period.split("-"))
+    index = year * 12 + month - 1 + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def partition_table(period: str) -> str:
+    return "transactions_" + period.replace("-", "_")
+
+
+def create_partition(cursor: Cursor, period: str) -> str:
+    table = partition_table(period)
+    statements = [
+        f"CREATE TABLE IF NOT EXISTS {table}"
+        "(id INTEGER PRIMARY KEY, from_wallet_id INTEGER, "
+        " to_wallet_id INTEGER, fee INTEGER NOT NULL, amount INTEGER NOT NULL,"
+        " created_at INTEGER, "
+        "FOREIGN KEY (from_wallet_id) REFERENCES wallets (id),"
+        "FOREIGN KEY (to_wallet_id) REFERENCES wallets (id))",
+        f"CREATE INDEX IF NOT EXISTS {table}_from_wallet_id "
+        f"ON {table} (from_wallet_id)",
+        f"CREATE INDEX IF NOT EXISTS {table}_to_wallet_id ON {table} (to_wallet_id)",
+    ]
+    for statement in statements:
+        cursor.execute(statement)
+    return table
+
+
+def load_partitions(cursor: Cursor) -> list[Partition]:
+    rows = cursor.execute(
+        "SELECT period, table_name, first_id, last_id, archive_path "
+        "FROM ledger_partitions ORDER BY first_id"
+    ).fetchall()
+    return [Partition(*row) for row in rows]
+
+
+def reserve_ids(cursor: Cursor, period: str, count: int) -> tuple[str, int]:
+    # Ids stay global and increasing, so pages keyed on them span partitions
+    first_id = cursor.execute(
+        "SELECT COALESCE(MAX(last_id), 0) + 1 FROM ledger_partitions"
+    ).fetchone()[0]
+    last_id = first_id + count - 1
+    row = cursor.execute(
+        "SELECT table_name, archive_path FROM ledger_partitions WHERE period = ?",
+        [period],
+    ).fetchone()
+    if row is None:
+        table = create_partition(cursor, period)
+        cursor.execute(
+            "INSERT INTO ledger_partitions (period, table_name, first_id, last_id) "
+            "VALUES (?, ?, ?, ?)",
+            [period, table, first_id, last_id],
+        )
+        return table, first_id
+
+    if row[1] is not None:
+        raise ValueError(f"Ledger period {period} is archived")
+    cursor.execute(
+        "UPDATE ledger_partitions SET last_id = ? WHERE period = ?", [last_id, period]
+    )
+    return row[0], first_id
+
+
+def resolve_archive(cursor: Cursor, archive_path: str) -> str:
+    # Archives are stored relative to the database so the files can move together
+    main = cursor.execute("PRAGMA database_list").fetchone()[2]
+    return os.path.join(os.path.dirname(main), archive_path)
+
+
+@contextmanager
+def open_archive(path: str) -> Iterator[Connection]:
+    # Archives never change, immutable skips locking and change detection
+    con = sqlite3.connect(
+        f"file:{pathname2url(path)}?mode=ro&immutable=1",
+        uri=True,
+        check_same_thread=False,
+    )
+    try:
+        yield con
+    finally:
+        con.close()
+
+
+def archive_partition(con: Connection, partition: Partition) -> Partition:
+    relative = os.path.join(ARCHIVE_DIRECTORY, f"{partition.table_name}.db")
+    path = resolve_archive(con.cursor(), relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        # Left behind by an interrupted run, the partition is still live
+        os.remove(path)
+
+    con.execute("ATTACH DATABASE ? AS archive", [path])
+    try:
+        statements = [
+            "CREATE TABLE archive.transactions"
+            "(id INTEGER PRIMARY KEY, from_wallet_id INTEGER, to_wallet_id INTEGER,"
+            " from_address VARCHAR NOT NULL, to_address VARCHAR NOT NULL,"
+            " fee INTEGER NOT NULL, amount INTEGER NOT NULL, created_at INTEGER)",
+            # Addresses are copied so reads never need the wallets table
+            "INSERT INTO archive.transactions "
+            "SELECT t.id, t.from_wallet_id, t.to_wallet_id, wf.address, wt.address,"
+            " t.fee, t.amount, t.created_at "
+            f"FROM main.{partition.table_name} t "
+            "JOIN main.wallets wf ON t.from_wallet_id = wf.id "
+            "JOIN main.wallets wt ON t.to_wallet_id = wt.id ORDER BY t.id",
+            "CREATE INDEX archive.transactions_from_wallet_id "
+            "ON transactions (from_wallet_id)",
+            "CREATE INDEX archive.transactions_to_wallet_id "
+            "ON transactions (to_wallet_id)",
+        ]
+        for statement in statements:
+            con.execute(statement)
+        con.commit()
+        copied = con.execute("SELECT COUNT(*) FROM archive.transactions").fetchone()
+    finally:
+        con.execute("DETACH DATABASE archive")
+
+    with closing(sqlite3.connect(path)) as archive:
+        archive.execute("VACUUM")
+    os.chmod(path, 0o444)
+
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        live = con.execute(f"SELECT COUNT(*) FROM {partition.table_name}").fetchone()
+        if live != copied:
+            raise RuntimeError(
+                f"Archive of {partition.period} holds {copied[0]} of {live[0]} rows"
+            )
+        con.execute(
+            "UPDATE ledger_partitions SET archive_path = ? WHERE period = ?",
+            [relative, partition.period],
+        )
+        con.execute(f"DROP TABLE {partition.table_name}")
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+
+    return replace(partition, archive_path=relative)
+
+
+def archive_partitions(con: Connection, before_period: str) -> list[Partition]:
+    cold = [
+        partition
+        for partition in load_partitions(con.cursor())
+        if partition.archive_path is None and partition.period < before_period
+    ]
+    return [archive_partition(con, partition) for partition in cold]
@@ -0,0 +1,322 @@
+from decimal import ROUND_HALF_EVEN, Decimal
+from sqlite3 import Connection
+from typing import Callable
+
+from core.models.bitcoin import SATOSHIS_PER_BITCOIN
+from core.models.statistics import ROLLUP_RETENTION_MINUTES
+from infra.persistence.rollup import rollup
+from infra.persistence.sqlite.ledger import (
+    UNDATED_PERIOD,
+    create_partition,
+    load_partitions,
+    period_of,
+)
+
+Migration = Callable[[Connection], None]
+
+COPY_BATCH_SIZE = 1000
+
+
+def schema_version(con: Connection) -> int:
+    return int(con.execute("PRAGMA user_version").fetchone()[0])
+
+
+def add_column_if_missing(
+    con: Connection, table: str, column: str, definition: str
+) -> None:
+    columns = [row[1] for row in con.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        con.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def decimal_to_satoshis(value: str) -> int:
+    satoshis = Decimal(value) * SATOSHIS_PER_BITCOIN
+    return int(satoshis.to_integral_value(rounding=ROUND_HALF_EVEN))
+
+
+def create_decimal_tables(con: Connection) -> None:
+    # Databases created before versioning already hold some of these tables
+    create_tables = [
+        "CREATE TABLE IF NOT EXISTS users"
+        "(id INTEGER PRIMARY KEY AUTOINCREMENT, username VARCHAR, token VARCHAR,"
+        "UNIQUE (username),"
+        "UNIQUE (token))",
+        "CREATE TABLE IF NOT EXISTS wallets"
+        "(id INTEGER PRIMARY KEY AUTOINCREMENT, address VARCHAR,"
+        " user_id INTEGER, balance VARCHAR,"
+        "FOREIGN KEY (user_id) REFERENCES users (id),"
+        "UNIQUE (address))",
+        "CREATE TABLE IF NOT EXISTS transactions"
+        "(id INTEGER PRIMARY KEY AUTOINCREMENT, from_wallet_id INTEGER, "
+        " to_wallet_id INTEGER, fee VARCHAR, amount VARCHAR, created_at INTEGER, "
+        "FOREIGN KEY (from_wallet_id) REFERENCES wallets (id),"
+        "FOREIGN KEY (to_wallet_id) REFERENCES wallets (id))",
+        "CREATE TABLE IF NOT EXISTS statistics"
+        "(id INTEGER PRIMARY KEY CHECK (id = 1), profit VARCHAR,"
+        " transaction_count INTEGER)",
+        "CREATE TABLE IF NOT EXISTS daily_statistics"
+        "(day VARCHAR PRIMARY KEY, profit VARCHAR, transaction_count INTEGER)",
+    ]
+    for statement in create_tables:
+        con.execute(statement)
+
+    add_column_if_missing(con, "transactions", "created_at", "INTEGER")
+
+    create_indexes = [
+        "CREATE INDEX IF NOT EXISTS transactions_from_wallet_id "
+        "ON transactions (from_wallet_id)",
+        "CREATE INDEX IF NOT EXISTS transactions_to_wallet_id "
+        "ON transactions (to_wallet_id)",
+        "CREATE INDEX IF NOT EXISTS wallets_user_id ON wallets (user_id)",
+    ]
+    for statement in create_indexes:
+        con.execute(statement)
+
+
+def store_satoshi_integers(con: Connection) -> None:
+    create_tables = [
+        "CREATE TABLE wallets_satoshis"
+        "(id INTEGER PRIMARY KEY AUTOINCREMENT, address VARCHAR,"
+        " user_id INTEGER, balance INTEGER NOT NULL,"
+        "FOREIGN KEY (user_id) REFERENCES users (id),"
+        "UNIQUE (address))",
+        "CREATE TABLE transactions_satoshis"
+        "(id INTEGER PRIMARY KEY AUTOINCREMENT, from_wallet_id INTEGER, "
+        " to_wallet_id INTEGER, fee INTEGER NOT NULL, amount INTEGER NOT NULL,"
+        " created_at INTEGER, "
+        "FOREIGN KEY (from_wallet_id) REFERENCES wallets (id),"
+        "FOREIGN KEY (to_wallet_id) REFERENCES wallets (id))",
+    ]
+    for statement in create_tables:
+        con.execute(statement)
+
+    wallets = con.execute("SELECT id, address, user_id, balance FROM wallets")
+    while rows := wallets.fetchmany(COPY_BATCH_SIZE):
+        con.executemany(
+            "INSERT INTO wallets_satoshis (id, address, user_id, balance) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                (id_, address, user_id, decimal_to_satoshis(balance))
+                for id_, address, user_id, balance in rows
+            ],
+        )
+
+    transactions = con.execute(
+        "SELECT id, from_wallet_id, to_wallet_id, fee, amount, created_at "
+        "FROM transactions"
+    )
+    while rows := transactions.fetchmany(COPY_BATCH_SIZE):
+        con.executemany(
+            "INSERT INTO transactions_satoshis "
+            "(id, from_wallet_id, to_wallet_id, fee, amount, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    id_,
+                    from_id,
+                    to_id,
+                    decimal_to_satoshis(fee),
+                    decimal_to_satoshis(amount),
+                    created_at,
+                )
+                for id_, from_id, to_id, fee, amount, created_at in rows
+            ],
+        )
+
+    replace_tables = [
+        "DROP TABLE wallets",
+        "DROP TABLE transactions",
+        "DROP TABLE statistics",
+        "DROP TABLE daily_statistics",
+        "ALTER TABLE wallets_satoshis RENAME TO wallets",
+        "ALTER TABLE transactions_satoshis RENAME TO transactions",
+        "CREATE TABLE statistics"
+        "(id INTEGER PRIMARY KEY CHECK (id = 1), profit INTEGER NOT NULL,"
+        " transaction_count INTEGER NOT NULL)",
+        "CREATE TABLE daily_statistics"
+        "(day VARCHAR PRIMARY KEY, profit INTEGER NOT NULL,"
+        " transaction_count INTEGER NOT NULL)",
+        "CREATE INDEX transactions_from_wallet_id ON transactions (from_wallet_id)",
+        "CREATE INDEX transactions_to_wallet_id ON transactions (to_wallet_id)",
+        "CREATE INDEX wallets_user_id ON wallets (user_id)",
+        # Rounded fees may no longer add up to the old aggregates
+        "INSERT INTO statistics (id, profit, transaction_count) "
+        "SELECT 1, COALESCE(SUM(fee), 0), COUNT(*) FROM transactions",
+        "INSERT INTO daily_statistics (day, profit, transaction_count) "
+        "SELECT strftime('%Y-%m-%d', created_at, 'unixepoch'), SUM(fee), COUNT(*) "
+        "FROM transactions WHERE created_at IS NOT NULL GROUP BY 1",
+    ]
+    for statement in replace_tables:
+        con.execute(statement)
+
+
+def add_activity_counters(con: Connection) -> None:
+    statements = [
+        "ALTER TABLE users ADD COLUMN wallet_count INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE wallets ADD COLUMN transaction_count INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE wallets ADD COLUMN last_activity_at INTEGER",
+        "UPDATE users SET wallet_count = "
+        "(SELECT COUNT(*) FROM wallets WHERE user_id = users.id)",
+        # Split by direction so each lookup uses an index, self-transfers once
+        "UPDATE wallets SET transaction_count = "
+        "(SELECT COUNT(*) FROM transactions WHERE from_wallet_id = wallets.id) + "
+        "(SELECT COUNT(*) FROM transactions "
+        "WHERE to_wallet_id = wallets.id AND from_wallet_id != wallets.id)",
+        "UPDATE wallets SET last_activity_at = (SELECT MAX(created_at) FROM ("
+        "SELECT created_at FROM transactions WHERE from_wallet_id = wallets.id "
+        "UNION ALL "
+        "SELECT created_at FROM transactions WHERE to_wallet_id = wallets.id))",
+    ]
+    for statement in statements:
+        con.execute(statement)
+
+
+def partition_ledger(con: Connection) -> None:
+    con.execute(
+        "CREATE TABLE ledger_partitions"
+        "(period VARCHAR PRIMARY KEY, table_name VARCHAR NOT NULL UNIQUE,"
+        " first_id INTEGER NOT NULL, last_id INTEGER NOT NULL,"
+        " archive_path VARCHAR)"
+    )
+
+    # One pass in id order, each batch is split across the months it covers
+    cursor = con.cursor()
+    tables: dict[str, str] = {}
+    transactions = con.execute(
+        "SELECT COALESCE(strftime('%Y-%m', created_at, 'unixepoch'), ?), "
+        "id, from_wallet_id, to_wallet_id, fee, amount, created_at "
+        "FROM transactions ORDER BY id",
+        [UNDATED_PERIOD],
+    )
+    while rows := transactions.fetchmany(COPY_BATCH_SIZE):
+        periods: dict[str, list[tuple[int, ...]]] = {}
+        for period, *row in rows:
+            periods.setdefault(period, []).append(tuple(row))
+        for period, period_rows in periods.items():
+            if period not in tables:
+                tables[period] = create_partition(cursor, period)
+            con.executemany(
+                f"INSERT INTO {tables[period]} "
+                "(id, from_wallet_id, to_wallet_id, fee, amount, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                period_rows,
+            )
+
+    for period, table in tables.items():
+        con.execute(
+            "INSERT INTO ledger_partitions (period, table_name, first_id, last_id) "
+            f"SELECT ?, ?, MIN(id), MAX(id) FROM {table}",
+            [period, table],
+        )
+    con.execute("DROP TABLE transactions")
+
+
+def add_idempotency_keys(con: Connection) -> None:
+    statements = [
+        "CREATE TABLE idempotency_keys"
+        "(user_token VARCHAR NOT NULL, key VARCHAR NOT NULL,"
+        " request_hash VARCHAR NOT NULL, created_at INTEGER NOT NULL,"
+        " from_address VARCHAR, to_address VARCHAR, fee INTEGER, amount INTEGER,"
+        " PRIMARY KEY (user_token, key))",
+        "CREATE INDEX idempotency_keys_created_at ON idempotency_keys (created_at)",
+    ]
+    for statement in statements:
+        con.execute(statement)
+
+
+def add_minute_statistics(con: Connection) -> None:
+    statements = [
+        "CREATE TABLE minute_statistics"
+        "(minute INTEGER PRIMARY KEY, volume INTEGER NOT NULL,"
+        " profit INTEGER NOT NULL, transaction_count INTEGER NOT NULL)",
+        "CREATE TABLE minute_transfer_sizes"
+        "(minute INTEGER NOT NULL, bucket INTEGER NOT NULL,"
+        " transaction_count INTEGER NOT NULL, PRIMARY KEY (minute, bucket))",
+    ]
+    for statement in statements:
+        con.execute(statement)
+
+    # Counted back from the latest transfer, archived months are older still
+    partitions = [
+        partition
+        for partition in load_partitions(con.cursor())
+        if partition.archive_path is None and partition.period != UNDATED_PERIOD
+    ]
+    latest = max(
+        (
+            con.execute(
+                f"SELECT MAX(created_at) FROM {partition.table_name}"
+            ).fetchone()[0]
+            for partition in partitions
+        ),
+        default=None,
+    )
+    if latest is None:
+        return
+
+    since = latest - ROLLUP_RETENTION_MINUTES * 60
+    rows = [
+        row
+        for partition in partitions
+        if partition.period >= period_of(since)
+        for row in con.execute(
+            "SELECT created_at / 60, amount, COUNT(*), SUM(fee) "
+            f"FROM {partition.table_name} WHERE created_at >= ? GROUP BY 1, 2",
+            [since],
+        )
+    ]
+    minutes, sizes = rollup(rows)
+    con.executemany(
+        "INSERT INTO minute_statistics (minute, volume, profit, transaction_count) "
+        "VALUES (?, ?, ?, ?)",
+        minutes,
+    )
+    con.executemany(
+        "INSERT INTO minute_transfer_sizes (minute, bucket, transaction_count) "
+        "VALUES (?, ?, ?)",
+        sizes,
+    )
+
+
+def drop_unfinished_idempotency_keys(con: Connection) -> None:
+    # Keys are now written with their transfer, claims left in flight by the
+    # old protocol would block their keys until they expire
+    con.execute("DELETE FROM idempotency_keys WHERE from_address IS NULL")
+
+
+# Each entry upgrades the schema by one version, never edit a released one
+MIGRATIONS: list[Migration] = [
+    create_decimal_tables,
+    store_satoshi_integers,
+    add_activity_counters,
+    partition_ledger,
+    add_idempotency_keys,
+    add_minute_statistics,
+    drop_unfinished_idempotency_keys,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(con: Connection) -> tuple[int, int]:
+    if schema_version(con) == SCHEMA_VERSION:
+        return SCHEMA_VERSION, SCHEMA_VERSION
+
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        # Another connection may have migrated while we waited for the lock
+        start = schema_version(con)
+        if start > SCHEMA_VERSION:
+            raise RuntimeError(
+                f"Database schema version {start} is newer than {SCHEMA_VERSION}"
+            )
+
+        for version in range(start, SCHEMA_VERSION):
+            MIGRATIONS[version](con)
+            con.execute(f"PRAGMA user_version = {version + 1}")
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+
+    return start, SCHEMA_VERSION
@@ -0,0 +1,164 @@
+import functools
+import sqlite3
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import Context, ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Iterator
+
+
+@dataclass
+class StatementProfile:
+    sql: str
+    duration_seconds: float = 0.0
+    rows: int = 0
+
+
+@dataclass
+class SqlProfile:
+    statements: list[StatementProfile] = field(default_factory=list)
+
+    @property
+    def duration_seconds(self) -> float:
+        return sum(statement.duration_seconds for statement in self.statements)
+
+    def repeated(self, threshold: int = 2) -> dict[str, int]:
+        counts = Counter(statement.sql for statement in self.statements)
+        return {sql: count for sql, count in counts.items() if count >= threshold}
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "statements": len(self.statements),
+            "duration_ms": round(self.duration_seconds * 1000, 3),
+            "repeated": self.repeated(),
+            "log": [
+                {
+                    "sql": statement.sql,
+                    "duration_ms": round(statement.duration_seconds * 1000, 3),
+                    "rows": statement.rows,
+                }
+                for statement in self.statements
+            ],
+        }
+
+
+_active_profile: ContextVar[SqlProfile | None] = ContextVar(
+    "active_sql_profile", default=None
+)
+
+
+@contextmanager
+def profiling() -> Iterator[SqlProfile]:
+    profile = SqlProfile()
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+
+
+@contextmanager
+def profiling_for(contexts: Iterable[Context]) -> Iterator[None]:
+    # Statements run once on behalf of several requests are charged to each
+    profiles = [
+        profile
+        for profile in (context.run(_active_profile.get) for context in contexts)
+        if profile is not None
+    ]
+    if not profiles:
+        yield
+        return
+
+    with profiling() as shared:
+        try:
+            yield
+        finally:
+            for profile in profiles:
+                profile.statements.extend(shared.statements)
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    _statement: StatementProfile | None = None
+
+    def execute(self, sql: str, parameters: Any = ()) -> "ProfilingCursor":
+        profile = _active_profile.get()
+        if profile is None:
+            self._statement = None
+            super().execute(sql, parameters)
+            return self
+
+        statement = StatementProfile(sql)
+        profile.statements.append(statement)
+        self._statement = statement
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            statement.duration_seconds += time.perf_counter() - start
+        statement.rows = max(self.rowcount, 0)
+        return self
+
+    def executemany(
+        self, sql: str, seq_of_parameters: Iterable[Any]
+    ) -> "ProfilingCursor":
+        profile = _active_profile.get()
+        if profile is None:
+            self._statement = None
+            super().executemany(sql, seq_of_parameters)
+            return self
+
+        statement = StatementProfile(sql)
+        profile.statements.append(statement)
+        self._statement = None
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            statement.duration_seconds += time.perf_counter() - start
+        statement.rows = max(self.rowcount, 0)
+        return self
+
+    def fetchone(self) -> Any:
+        return self._fetched(super().fetchone, single=True)
+
+    def fetchmany(self, size: int | None = None) -> list[Any]:
+        if size is None:
+            size = self.arraysize
+        rows: list[Any] = self._fetched(functools.partial(super().fetchmany, size))
+        return rows
+
+    def fetchall(self) -> list[Any]:
+        rows: list[Any] = self._fetched(super().fetchall)
+        return rows
+
+    def __next__(self) -> Any:
+        return self._fetched(super().__next__, single=True)
+
+    def _fetched(self, fetch: Callable[[], Any], single: bool = False) -> Any:
+        statement = self._statement
+        if statement is None:
+            return fetch()
+
+        # Rows are produced lazily, stepping the statement is part of its cost
+        start = time.perf_counter()
+        try:
+            result = fetch()
+        finally:
+            statement.duration_seconds += time.perf_counter() - start
+        if single:
+            statement.rows += result is not None
+        else:
+            statement.rows += len(result)
+        return result
+
+
+class ProfilingConnection(sqlite3.Connection):
+    def cursor(self, factory: Any = ProfilingCursor) -> Any:
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = ()) -> Any:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any]) -> Any:
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,28 @@
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from core.models.idempotency import IdempotencyRecord
+from infra.persistence.rows import row_to_record
+from infra.persistence.sqlite.db_setup import ConnectionProvider
+
+IDEMPOTENCY_SELECT = (
+    "SELECT request_hash, from_address, to_address, fee, amount "
+    "FROM idempotency_keys WHERE user_token = ? AND key = ? AND created_at > ?"
+)
+
+
+@dataclass
+class SqliteIdempotencyRepository:
+    db: ConnectionProvider
+    ttl_seconds: int
+    clock: Callable[[], float] = field(default=time.time)
+
+    def get(self, user_token: str, key: str) -> IdempotencyRecord | None:
+        # Keys are written by the transfer they belong to, see transfer_many
+        with self.db.reader() as conn:
+            row = conn.execute(
+                IDEMPOTENCY_SELECT,
+                [user_token, key, int(self.clock()) - self.ttl_seconds],
+            ).fetchone()
+        return None if row is None else row_to_record(row)
@@ -1,78 +1,682 @@
-from dataclasses import dataclass
-from decimal import Decimal
+import heapq
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from itertools import islice
 from sqlite3 import Connection, Cursor
+from typing import Any, Callable, Iterator
 
+from core.models.bitcoin import from_satoshis, to_satoshis
+from core.models.idempotency import IdempotencyKey
+from core.models.statistics import (
+    ROLLUP_RETENTION_MINUTES,
+    MinuteStatistics,
+    Statistics,
+)
 from core.models.transaction import Transaction
 from core.repositories.transaction_repository import TransactionRepository
+from core.repositories.wallet_repository import BalanceListener
+from infra.persistence.rollup import (
+    AmountRow,
+    day_of,
+    minute_of,
+    rollup,
+    rows_to_minutes,
+)
+from infra.persistence.rows import Row, row_to_transaction
+from infra.persistence.sqlite.db_setup import MAX_QUERY_PARAMETERS, ConnectionProvider
+from infra.persistence.sqlite.ledger import (
+    UNDATED_PERIOD,
+    Partition,
+    load_partitions,
+    open_archive,
+    period_of,
+    reserve_ids,
+    resolve_archive,
+)
 
+logger = logging.getLogger(__name__)
 
-def result_to_list(result: Cursor) -> list[Transaction]:
-    data = result.fetchall()
-    transaction_list = []
-    for row in data:
-        transaction_list.append(
-            Transaction(row[0], row[1], Decimal(row[2]), Decimal(row[3]))
+
+def transaction_select(table: str) -> str:
+    return (
+        "SELECT wf.address, wt.address, t.fee, t.amount, t.id, t.created_at "
+        f"FROM {table} t "
+        "JOIN wallets wf ON t.from_wallet_id = wf.id "
+        "JOIN wallets wt ON t.to_wallet_id = wt.id "
+    )
+
+
+# Archived partitions carry their addresses, the wallets table is not attached
+ARCHIVE_SELECT = (
+    "SELECT t.from_address, t.to_address, t.fee, t.amount, t.id, t.created_at "
+    "FROM transactions t "
+)
+
+
+def partition_select(partition: Partition) -> str:
+    if partition.archive_path is not None:
+        return ARCHIVE_SELECT
+    return transaction_select(partition.table_name)
+
+
+def partition_source(partition: Partition) -> str:
+    if partition.archive_path is not None:
+        return "transactions"
+    return partition.table_name
+
+
+# Each branch is an index lookup, OR-ing the two wallet columns forces a scan
+def wallet_transactions_query(select: str) -> str:
+    return (
+        f"{select}WHERE t.from_wallet_id = ? AND t.id > ? "
+        "UNION ALL "
+        f"{select}WHERE t.to_wallet_id = ? AND t.id > ? "
+        "AND t.from_wallet_id != t.to_wallet_id "
+        "ORDER BY 5 LIMIT ?"
+    )
+
+
+def user_transactions_query(select: str, wallet_count: int) -> str:
+    wallets = ",".join("?" * wallet_count)
+    return (
+        f"{select}WHERE t.from_wallet_id IN ({wallets}) AND t.id > ? "
+        "UNION ALL "
+        f"{select}WHERE t.to_wallet_id IN ({wallets}) AND t.id > ? "
+        f"AND t.from_wallet_id NOT IN ({wallets}) "
+        "ORDER BY 5 LIMIT ?"
+    )
+
+
+def export_query(
+    select: str,
+    wallet_id: int | None,
+    since: int | None,
+    until: int | None,
+    after_id: int,
+    limit: int,
+) -> tuple[str, list[int]]:
+    conditions = ["t.id > ?"]
+    arguments = [after_id]
+    if since is not None:
+        conditions.append("t.created_at >= ?")
+        arguments.append(since)
+    if until is not None:
+        conditions.append("t.created_at < ?")
+        arguments.append(until)
+    where = " AND ".join(conditions)
+
+    if wallet_id is None:
+        return f"{select}WHERE {where} ORDER BY t.id LIMIT ?", [*arguments, limit]
+
+    query = (
+        f"{select}"
+        f"WHERE t.from_wallet_id = ? AND {where} "
+        "UNION ALL "
+        f"{select}"
+        f"WHERE t.to_wallet_id = ? AND {where} "
+        "AND t.from_wallet_id != t.to_wallet_id "
+        "ORDER BY 5 LIMIT ?"
+    )
+    return query, [wallet_id, *arguments, wallet_id, *arguments, limit]
+
+
+def page_limit(limit: int | None) -> int:
+    # SQLite treats a negative LIMIT as no limit at all
+    return -1 if limit is None else limit
+
+
+def history_partitions(
+    partitions: list[Partition], after_id: int, last_activity_at: int | None
+) -> list[Partition]:
+    # Wallets record their latest transfer, later periods cannot list them
+    latest = None if last_activity_at is None else period_of(last_activity_at)
+    return [
+        partition
+        for partition in partitions
+        if partition.last_id > after_id
+        and (
+            partition.period == UNDATED_PERIOD
+            or (latest is not None and partition.period <= latest)
         )
-    return transaction_list
+    ]
+
+
+def period_partitions(
+    partitions: list[Partition], since: int | None, until: int | None
+) -> list[Partition]:
+    first = None if since is None else period_of(since)
+    last = None if until is None else period_of(until - 1)
+    return [
+        partition
+        for partition in partitions
+        if (first is None or partition.period >= first)
+        and (last is None or partition.period <= last)
+    ]
 
 
 @dataclass
 class SqliteTransactionRepository(TransactionRepository):
-    conn: Connection
+    db: ConnectionProvider
+    clock: Callable[[], float] = field(default=time.time)
+    export_batch_size: int = 1000
+    balance_listeners: list[BalanceListener] = field(default_factory=list)
+    idempotency_ttl_seconds: int = 24 * 60 * 60
+    pruned_minute: int = field(default=0, init=False, repr=False)
 
     def add_transaction(self, transaction: Transaction) -> None:
-        cursor = self.conn.cursor()
-        id1 = self.get_wallet_id(transaction.from_wallet_address)
-        id2 = self.get_wallet_id(transaction.to_wallet_address)
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+            id1 = self._get_wallet_id(cursor, transaction.from_wallet_address)
+            id2 = self._get_wallet_id(cursor, transaction.to_wallet_address)
 
-        cursor.execute(
-            "INSERT INTO transactions (from_wallet_id, to_wallet_id, fee, amount) "
-            "VALUES (?,?,?,?)",
+            created_at = int(self.clock())
+            cursor.executemany(
+                "UPDATE wallets SET transaction_count = transaction_count + 1, "
+                "last_activity_at = ? WHERE id = ?",
+                [(created_at, wallet_id) for wallet_id in {id1, id2}],
+            )
+            self._insert_transaction(cursor, id1, id2, transaction, created_at)
+            conn.commit()
+
+    def transfer(
+        self, transaction: Transaction, idempotency_key: IdempotencyKey | None = None
+    ) -> bool:
+        return self.transfer_many([transaction], True, [idempotency_key])[0]
+
+    def transfer_many(
+        self,
+        transactions: list[Transaction],
+        atomic: bool,
+        idempotency_keys: list[IdempotencyKey | None] | None = None,
+    ) -> list[bool]:
+        amounts = [
+            (to_satoshis(transaction.fee), to_satoshis(transaction.amount))
+            for transaction in transactions
+        ]
+        keys = idempotency_keys or [None] * len(transactions)
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+            # Take the write lock up front so the balances read below stay current
+            cursor.execute("BEGIN IMMEDIATE")
+            addresses = {
+                address
+                for transaction in transactions
+                for address in (
+                    transaction.from_wallet_address,
+                    transaction.to_wallet_address,
+                )
+            }
+            wallets = self._get_wallet_balances(cursor, list(addresses))
+            balances = {address: balance for address, (_, balance) in wallets.items()}
+
+            results = []
+            rows = []
+            activity: Counter[str] = Counter()
+            for transaction, (fee, amount), key in zip(transactions, amounts, keys):
+                source = transaction.from_wallet_address
+                destination = transaction.to_wallet_address
+                if (
+                    source not in wallets
+                    or destination not in wallets
+                    or balances[source] < fee + amount
+                    or (
+                        key is not None
+                        and not self._store_key(cursor, key, transaction)
+                    )
+                ):
+                    results.append(False)
+                    continue
+
+                balances[source] -= fee + amount
+                balances[destination] += amount
+                rows.append((wallets[source][0], wallets[destination][0], fee, amount))
+                activity.update({source, destination})
+                results.append(True)
+
+            if not rows or (atomic and len(rows) != len(transactions)):
+                return results
+
+            created_at = int(self.clock())
+            deltas = {
+                address: balances[address] - wallets[address][1] for address in activity
+            }
+            # Touched wallets are updated even when their balance nets to zero
+            cursor.executemany(
+                "UPDATE wallets SET balance = balance + ?, "
+                "transaction_count = transaction_count + ?, last_activity_at = ? "
+                "WHERE id = ? AND balance + ? >= 0",
+                [
+                    (delta, activity[address], created_at, wallets[address][0], delta)
+                    for address, delta in deltas.items()
+                ],
+            )
+            if cursor.rowcount != len(deltas):
+                return [False] * len(transactions)
+
+            self._insert_transactions(cursor, rows, created_at)
+            conn.commit()
+
+            # Notified before the writer is released, so a single writer keeps
+            # listeners in commit order
+            committed = {
+                address: from_satoshis(balances[address])
+                for address, delta in deltas.items()
+                if delta != 0
+            }
+            for listener in self.balance_listeners:
+                try:
+                    listener.balances_committed(committed)
+                except Exception:
+                    # The transfers are committed, raising would get them retried
+                    logger.exception("Balance listener failed after commit")
+            return results
+
+    def get_transactions(
+        self, wallet_address: str, limit: int | None = None, after_id: int = 0
+    ) -> list[Transaction]:
+        with self._snapshot() as conn:
+            wallet = conn.execute(
+                "SELECT id, last_activity_at FROM wallets WHERE address = ?",
+                [wallet_address],
+            ).fetchone()
+            if wallet is None:
+                return []
+
+            return self._page(
+                conn,
+                history_partitions(load_partitions(conn.cursor()), after_id, wallet[1]),
+                wallet_transactions_query,
+                [wallet[0], after_id, wallet[0], after_id, page_limit(limit)],
+                limit,
+            )
+
+    def get_user_transactions(
+        self, user_token: str, limit: int | None = None, after_id: int = 0
+    ) -> list[Transaction]:
+        with self._snapshot() as conn:
+            wallets = conn.execute(
+                "SELECT w.id, w.last_activity_at "
+                "FROM wallets w JOIN users u ON w.user_id = u.id WHERE u.token = ?",
+                [user_token],
+            ).fetchall()
+            ids = [wallet[0] for wallet in wallets]
+            if not ids:
+                return []
+
+            activity = [wallet[1] for wallet in wallets if wallet[1] is not None]
+            return self._page(
+                conn,
+                history_partitions(
+                    load_partitions(conn.cursor()),
+                    after_id,
+                    max(activity, default=None),
+                ),
+                lambda select: user_transactions_query(select, len(ids)),
+                [*ids, after_id, *ids, after_id, *ids, page_limit(limit)],
+                limit,
+            )
+
+    def get_all_transactions(self) -> list[Transaction]:
+        return list(self.iter_transactions())
+
+    def iter_transactions(
+        self,
+        wallet_address: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> Iterator[Transaction]:
+        wallet_id = None
+        if wallet_address is not None:
+            with self.db.reader() as conn:
+                wallet = conn.execute(
+                    "SELECT id FROM wallets WHERE address = ?", [wallet_address]
+                ).fetchone()
+            if wallet is None:
+                return
+            wallet_id = wallet[0]
+
+        # Read a page at a time by id, the connection goes back to the pool
+        # between pages so a slow client never holds a reader
+        after_id = 0
+        while True:
+            rows = self._export_page(wallet_id, since, until, after_id)
+            for row in rows:
+                yield row_to_transaction(row)
+            if len(rows) < self.export_batch_size:
+                return
+            after_id = rows[-1][4]
+
+    def get_wallet_id(self, address: str) -> int:
+        with self.db.reader() as conn:
+            return self._get_wallet_id(conn.cursor(), address)
+
+    def get_statistics(self) -> Statistics:
+        with self.db.reader() as conn:
+            row = (
+                conn.cursor()
+                .execute(
+                    "SELECT profit, transaction_count FROM statistics WHERE id = 1"
+                )
+                .fetchone()
+            )
+        if row is None:
+            return self.rebuild_statistics()
+
+        return Statistics(from_satoshis(row[0]), row[1])
+
+    def get_daily_statistics(self) -> dict[str, Statistics]:
+        with self.db.reader() as conn:
+            rows = (
+                conn.cursor()
+                .execute(
+                    "SELECT day, profit, transaction_count FROM daily_statistics "
+                    "ORDER BY day"
+                )
+                .fetchall()
+            )
+        return {row[0]: Statistics(from_satoshis(row[1]), row[2]) for row in rows}
+
+    def get_minute_statistics(
+        self, since_minute: int, until_minute: int
+    ) -> list[MinuteStatistics]:
+        with self._snapshot() as conn:
+            minutes = conn.execute(
+                "SELECT minute, volume, profit, transaction_count "
+                "FROM minute_statistics WHERE minute BETWEEN ? AND ?",
+                [since_minute, until_minute],
+            ).fetchall()
+            sizes = conn.execute(
+                "SELECT minute, bucket, transaction_count "
+                "FROM minute_transfer_sizes WHERE minute BETWEEN ? AND ?",
+                [since_minute, until_minute],
+            ).fetchall()
+        return rows_to_minutes(minutes, sizes)
+
+    def rebuild_statistics(self) -> Statistics:
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            total = self._rebuild_statistics(cursor)
+            conn.commit()
+        return total
+
+    def _get_wallet_id(self, cursor: Cursor, address: str) -> int:
+        result = cursor.execute("SELECT * FROM wallets WHERE address = ?", [address])
+        data = result.fetchone()
+        assert data is not None
+        return int(data[0])
+
+    def _get_wallet_balances(
+        self, cursor: Cursor, addresses: list[str]
+    ) -> dict[str, tuple[int, int]]:
+        wallets = {}
+        for start in range(0, len(addresses), MAX_QUERY_PARAMETERS):
+            stop = start + MAX_QUERY_PARAMETERS
+            chunk = addresses[start:stop]
+            placeholders = ",".join("?" * len(chunk))
+            for row in cursor.execute(
+                "SELECT id, address, balance FROM wallets "
+                f"WHERE address IN ({placeholders})",
+                chunk,
+            ):
+                wallets[row[1]] = (row[0], row[2])
+        return wallets
+
+    def _insert_transaction(
+        self,
+        cursor: Cursor,
+        from_id: int,
+        to_id: int,
+        transaction: Transaction,
+        created_at: int,
+    ) -> None:
+        self._insert_transactions(
+            cursor,
             [
-                id1,
-                id2,
-                transaction.fee.__str__(),
-                transaction.amount.__str__(),
+                (
+                    from_id,
+                    to_id,
+                    to_satoshis(transaction.fee),
+                    to_satoshis(transaction.amount),
+                )
             ],
+            created_at,
+        )
+
+    def _insert_transactions(
+        self,
+        cursor: Cursor,
+        rows: list[tuple[int, int, int, int]],
+        created_at: int,
+    ) -> None:
+        table, first_id = reserve_ids(cursor, period_of(created_at), len(rows))
+        cursor.executemany(
+            f"INSERT INTO {table} "
+            "(id, from_wallet_id, to_wallet_id, fee, amount, created_at) "
+            "VALUES (?,?,?,?,?,?)",
+            [(first_id + index, *row, created_at) for index, row in enumerate(rows)],
+        )
+        self._record_rollup(
+            cursor,
+            [(minute_of(created_at), amount, 1, fee) for _, _, fee, amount in rows],
         )
-        self.conn.commit()
+        self._record_statistics(
+            cursor, sum(fee for _, _, fee, _ in rows), len(rows), created_at
+        )
+
+    def _rebuild_statistics(self, cursor: Cursor) -> Statistics:
+        profit = count = 0
+        daily: dict[str, list[int]] = {}
+        for partition in load_partitions(cursor):
+            for day, day_profit, day_count in self._query(
+                cursor,
+                partition,
+                "SELECT strftime('%Y-%m-%d', created_at, 'unixepoch'), "
+                "COALESCE(SUM(fee), 0), COUNT(*) "
+                f"FROM {partition_source(partition)} GROUP BY 1",
+                [],
+            ):
+                profit += day_profit
+                count += day_count
+                # Rows written before timestamps were recorded belong to no period
+                if day is not None:
+                    totals = daily.setdefault(day, [0, 0])
+                    totals[0] += day_profit
+                    totals[1] += day_count
 
-    def get_transactions(self, wallet_address: str) -> list[Transaction]:
-        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM statistics")
+        cursor.execute("DELETE FROM daily_statistics")
         cursor.execute(
-            "SELECT wf.address,wt.address,t.fee,t.amount FROM transactions t "
-            "JOIN wallets wf ON t.from_wallet_id = wf.id "
-            "JOIN wallets wt ON t.to_wallet_id = wt.id "
-            "WHERE wf.address = ? OR wt.address = ?",
-            [wallet_address, wallet_address],
+            "INSERT INTO statistics (id, profit, transaction_count) VALUES (1, ?, ?)",
+            [profit, count],
+        )
+        cursor.executemany(
+            "INSERT INTO daily_statistics (day, profit, transaction_count) "
+            "VALUES (?, ?, ?)",
+            [(day, *totals) for day, totals in daily.items()],
         )
-        return result_to_list(cursor)
+        self._rebuild_rollup(cursor)
+
+        return Statistics(from_satoshis(profit), count)
+
+    def _rebuild_rollup(self, cursor: Cursor) -> None:
+        since = (minute_of(int(self.clock())) - ROLLUP_RETENTION_MINUTES + 1) * 60
+        rows = [
+            row
+            for partition in period_partitions(load_partitions(cursor), since, None)
+            if partition.period != UNDATED_PERIOD
+            for row in self._query(
+                cursor,
+                partition,
+                "SELECT created_at / 60, amount, COUNT(*), SUM(fee) "
+                f"FROM {partition_source(partition)} "
+                "WHERE created_at >= ? GROUP BY 1, 2",
+                [since],
+            )
+        ]
+        cursor.execute("DELETE FROM minute_statistics")
+        cursor.execute("DELETE FROM minute_transfer_sizes")
+        self._record_rollup(cursor, rows)
 
-    def get_user_transactions(self, user_token: str) -> list[Transaction]:
-        cursor = self.conn.cursor()
+    @contextmanager
+    def _snapshot(self) -> Iterator[Connection]:
+        # One read transaction, so the catalog agrees with the partitions it names
+        with self.db.reader() as conn:
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            finally:
+                conn.rollback()
+
+    def _export_page(
+        self, wallet_id: int | None, since: int | None, until: int | None, after_id: int
+    ) -> list[Row]:
+        with self._snapshot() as conn:
+            cursor = conn.cursor()
+            pages = [
+                self._query(
+                    cursor,
+                    partition,
+                    *export_query(
+                        partition_select(partition),
+                        wallet_id,
+                        since,
+                        until,
+                        after_id,
+                        self.export_batch_size,
+                    ),
+                )
+                for partition in period_partitions(
+                    load_partitions(cursor), since, until
+                )
+                if partition.last_id > after_id
+            ]
+        # Each partition pages in id order, merging keeps the export sorted
+        merged = heapq.merge(*pages, key=lambda row: row[4])
+        return list(islice(merged, self.export_batch_size))
+
+    def _query(
+        self, cursor: Cursor, partition: Partition, query: str, arguments: list[Any]
+    ) -> list[Row]:
+        if partition.archive_path is None:
+            return cursor.execute(query, arguments).fetchall()
+
+        path = resolve_archive(cursor, partition.archive_path)
+        with open_archive(path) as archive:
+            return archive.execute(query, arguments).fetchall()
+
+    def _page(
+        self,
+        conn: Connection,
+        partitions: list[Partition],
+        query: Callable[[str], str],
+        arguments: list[Any],
+        limit: int | None,
+    ) -> list[Transaction]:
+        rows: list[Row] = []
+        for partition in partitions:
+            # Ids grow with each partition, once a page is full later ones only
+            # matter if a late write overlapped the ids already collected
+            if (
+                limit is not None
+                and len(rows) >= limit
+                and partition.first_id > max(row[4] for row in rows)
+            ):
+                break
+            rows.extend(
+                self._query(
+                    conn.cursor(),
+                    partition,
+                    query(partition_select(partition)),
+                    arguments,
+                )
+            )
+
+        rows.sort(key=lambda row: row[4])
+        return [row_to_transaction(row) for row in rows[:limit]]
+
+    def _record_statistics(
+        self, cursor: Cursor, fee: int, count: int, created_at: int
+    ) -> None:
         cursor.execute(
-            "SELECT wf.address, wt.address, t.fee, t.amount FROM transactions t "
-            "JOIN wallets wf ON wf.id = t.from_wallet_id "
-            "JOIN wallets wt ON wt.id = t.to_wallet_id "
-            "JOIN users u ON wt.user_id = u.id OR wf.user_id = u.id "
-            "WHERE u.token = (?)",
-            (user_token,),
+            "UPDATE statistics SET profit = profit + ?, "
+            "transaction_count = transaction_count + ? WHERE id = 1",
+            [fee, count],
         )
+        if cursor.rowcount == 0:
+            # The ledger predates the aggregate, the new rows are already included
+            self._rebuild_statistics(cursor)
+            return
 
-        return result_to_list(cursor)
+        cursor.execute(
+            "INSERT INTO daily_statistics (day, profit, transaction_count) "
+            "VALUES (?, ?, ?) ON CONFLICT (day) DO UPDATE SET "
+            "profit = profit + excluded.profit, "
+            "transaction_count = transaction_count + excluded.transaction_count",
+            [day_of(created_at), fee, count],
+        )
 
-    def get_all_transactions(self) -> list[Transaction]:
-        cursor = self.conn.cursor()
+    def _store_key(
+        self,
+        cursor: Cursor,
+        key: IdempotencyKey,
+        transaction: Transaction,
+    ) -> bool:
+        created_at = int(self.clock())
+        # Committed with the transfer, a retry either finds both or neither. A
+        # live key taken by a concurrent request fails this transfer instead
         cursor.execute(
-            "SELECT wf.address,wt.address,t.fee,t.amount FROM transactions t "
-            "JOIN wallets wf ON t.from_wallet_id = wf.id "
-            "JOIN wallets wt ON t.to_wallet_id = wt.id "
+            "INSERT INTO idempotency_keys (user_token, key, request_hash, "
+            "created_at, from_address, to_address, fee, amount) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (user_token, key) DO UPDATE SET "
+            "request_hash = excluded.request_hash, created_at = excluded.created_at, "
+            "from_address = excluded.from_address, to_address = excluded.to_address, "
+            "fee = excluded.fee, amount = excluded.amount "
+            "WHERE idempotency_keys.created_at <= ?",
+            [
+                key.user_token,
+                key.key,
+                key.request_hash,
+                created_at,
+                transaction.from_wallet_address,
+                transaction.to_wallet_address,
+                to_satoshis(transaction.fee),
+                to_satoshis(transaction.amount),
+                created_at - self.idempotency_ttl_seconds,
+            ],
         )
-        return result_to_list(cursor)
+        return cursor.rowcount == 1
 
-    def get_wallet_id(self, address: str) -> int:
-        cursor = self.conn.cursor()
-        result = cursor.execute("SELECT * FROM wallets WHERE address = ?", [address])
-        data = result.fetchone()
-        assert data is not None
-        return int(data[0])
+    def _record_rollup(self, cursor: Cursor, rows: list[AmountRow]) -> None:
+        minutes, sizes = rollup(rows)
+        cursor.executemany(
+            "INSERT INTO minute_statistics (minute, volume, profit, transaction_count) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (minute) DO UPDATE SET "
+            "volume = volume + excluded.volume, profit = profit + excluded.profit, "
+            "transaction_count = transaction_count + excluded.transaction_count",
+            minutes,
+        )
+        cursor.executemany(
+            "INSERT INTO minute_transfer_sizes (minute, bucket, transaction_count) "
+            "VALUES (?, ?, ?) ON CONFLICT (minute, bucket) DO UPDATE SET "
+            "transaction_count = transaction_count + excluded.transaction_count",
+            sizes,
+        )
+
+        # Minutes past the longest window are dropped once per new minute
+        latest = max((minute for minute, *_ in minutes), default=0)
+        if latest > self.pruned_minute:
+            self.pruned_minute = latest
+            for table in ("minute_statistics", "minute_transfer_sizes"):
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE minute <= ?",
+                    [latest - ROLLUP_RETENTION_MINUTES],
+                )
+            cursor.execute(
+                "DELETE FROM idempotency_keys WHERE created_at <= ?",
+                [latest * 60 - self.idempotency_ttl_seconds],
+            )
@@ -1,37 +1,41 @@
 import sqlite3
 from dataclasses import dataclass
-from sqlite3 import Connection
+from typing import Iterator
 
 from core.models.user import User
+from infra.persistence.sqlite.db_setup import ConnectionProvider
 
 
 @dataclass
 class SqliteUserRepository:
-    conn: Connection
+    db: ConnectionProvider
+    batch_size: int = 1000
 
     def create_user(self, user: User) -> bool:
-        cursor = self.conn.cursor()
-
-        try:
-            cursor.execute(
-                "INSERT INTO users (username, token) VALUES (?, ?)",
-                (
-                    user.username,
-                    user.token,
-                ),
-            )
-            self.conn.commit()
-            return True
-        # If unique constraint is violated
-        except sqlite3.IntegrityError:
-            self.conn.rollback()
-            return False
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+
+            try:
+                cursor.execute(
+                    "INSERT INTO users (username, token) VALUES (?, ?)",
+                    (
+                        user.username,
+                        user.token,
+                    ),
+                )
+                conn.commit()
+                return True
+            # If unique constraint is violated
+            except sqlite3.IntegrityError:
+                conn.rollback()
+                return False
 
     def get_user(self, token: str) -> User | None:
-        cursor = self.conn.cursor()
+        with self.db.reader() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute("SELECT * FROM users WHERE users.token = (?)", (token,))
-        row = cursor.fetchone()
+            cursor.execute("SELECT * FROM users WHERE users.token = (?)", (token,))
+            row = cursor.fetchone()
 
         if row is None:
             return None
@@ -39,10 +43,21 @@ class SqliteUserRepository:
         return User(row[1], row[2])
 
     def username_taken(self, username: str) -> bool:
-        cursor = self.conn.cursor()
+        with self.db.reader() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute("SELECT * FROM users WHERE users.username = (?)", (username,))
-        row = cursor.fetchall()
+            cursor.execute(
+                "SELECT * FROM users WHERE users.username = (?)", (username,)
+            )
+            row = cursor.fetchall()
         if len(row) == 0:
             return False
         return True
+
+    def iter_usernames(self) -> Iterator[str]:
+        with self.db.reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT username FROM users")
+            while rows := cursor.fetchmany(self.batch_size):
+                for row in rows:
+                    yield row[0]
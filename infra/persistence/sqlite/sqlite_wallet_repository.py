@@ -1,75 +1,145 @@
 from decimal import Decimal
-from sqlite3 import Connection
 
-from core.models.wallet import Wallet
+from core.models.bitcoin import from_satoshis, to_satoshis
+from core.models.wallet import Wallet, WalletActivity
+from infra.persistence.sqlite.db_setup import MAX_QUERY_PARAMETERS, ConnectionProvider
 
 
 class SqliteWalletRepository:
-    def __init__(self, con: Connection):
-        self._con = con
+    def __init__(self, db: ConnectionProvider):
+        self._db = db
 
     def get_wallet(self, address: str) -> Wallet | None:
-        row = (
-            self._con.cursor()
-            .execute(
-                "SELECT w.balance, u.token  "
-                "FROM wallets w join users u on w.user_id = u.id WHERE w.address = ?",
-                [address],
+        with self._db.reader() as con:
+            row = (
+                con.cursor()
+                .execute(
+                    "SELECT w.balance, u.token  "
+                    "FROM wallets w join users u on w.user_id = u.id "
+                    "WHERE w.address = ?",
+                    [address],
+                )
+                .fetchone()
             )
-            .fetchone()
-        )
         if row is None:
             return None
 
-        wallet = Wallet(address, Decimal(row[0]), row[1])
+        wallet = Wallet(address, from_satoshis(row[0]), row[1])
 
         return wallet
 
+    def get_wallets(self, addresses: list[str]) -> list[Wallet]:
+        wallet_list: list[Wallet] = []
+        with self._db.reader() as con:
+            for start in range(0, len(addresses), MAX_QUERY_PARAMETERS):
+                stop = start + MAX_QUERY_PARAMETERS
+                chunk = addresses[start:stop]
+                placeholders = ",".join("?" * len(chunk))
+                rows = (
+                    con.cursor()
+                    .execute(
+                        "SELECT w.address, w.balance, u.token  "
+                        "FROM wallets w join users u on w.user_id = u.id "
+                        f"WHERE w.address IN ({placeholders})",
+                        chunk,
+                    )
+                    .fetchall()
+                )
+                for row in rows:
+                    wallet_list.append(Wallet(row[0], from_satoshis(row[1]), row[2]))
+
+        return wallet_list
+
     def get_wallets_by_user(self, user_token: str) -> list[Wallet]:
         wallet_list: list[Wallet] = []
-        rows = (
-            self._con.cursor()
-            .execute(
-                "SELECT w.address, w.balance, u.token  "
-                "FROM wallets w join users u on w.user_id = u.id WHERE u.token = ?",
-                [user_token],
+        with self._db.reader() as con:
+            rows = (
+                con.cursor()
+                .execute(
+                    "SELECT w.address, w.balance, u.token  "
+                    "FROM wallets w join users u on w.user_id = u.id "
+                    "WHERE u.token = ?",
+                    [user_token],
+                )
+                .fetchall()
             )
-            .fetchall()
-        )
 
         for row in rows:
-            wallet_list.append(Wallet(row[0], Decimal(row[1]), row[2]))
+            wallet_list.append(Wallet(row[0], from_satoshis(row[1]), row[2]))
 
         return wallet_list
 
+    def count_wallets_by_user(self, user_token: str) -> int:
+        with self._db.reader() as con:
+            row = (
+                con.cursor()
+                .execute("SELECT wallet_count FROM users WHERE token = ?", [user_token])
+                .fetchone()
+            )
+        return 0 if row is None else int(row[0])
+
+    def get_wallet_activity(self, address: str) -> WalletActivity | None:
+        with self._db.reader() as con:
+            row = (
+                con.cursor()
+                .execute(
+                    "SELECT transaction_count, last_activity_at FROM wallets "
+                    "WHERE address = ?",
+                    [address],
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+
+        return WalletActivity(row[0], row[1])
+
     def update_wallet_balance_if_exists(
         self, wallet_address: str, new_balance: Decimal
     ) -> None:
-        cursor = self._con.cursor()
-        cursor.execute(
-            "UPDATE wallets set balance = ? where address = ?",
-            [str(new_balance), wallet_address],
-        )
+        with self._db.writer() as con:
+            cursor = con.cursor()
+            cursor.execute(
+                "UPDATE wallets set balance = ? where address = ?",
+                [to_satoshis(new_balance), wallet_address],
+            )
+
+            con.commit()
 
-        self._con.commit()
+    def update_wallet_balances(self, balances: dict[str, Decimal]) -> None:
+        with self._db.writer() as con:
+            con.cursor().executemany(
+                "UPDATE wallets set balance = ? where address = ?",
+                [
+                    (to_satoshis(balance), address)
+                    for address, balance in balances.items()
+                ],
+            )
+
+            con.commit()
 
     def create_wallet(self, wallet: Wallet) -> bool:
-        user = (
-            self._con.cursor()
-            .execute(
-                "SELECT id FROM users where token = ?",
-                [wallet.owner_token],
+        with self._db.writer() as con:
+            user = (
+                con.cursor()
+                .execute(
+                    "SELECT id FROM users where token = ?",
+                    [wallet.owner_token],
+                )
+                .fetchone()
             )
-            .fetchone()
-        )
-        if user is None:
-            return False
+            if user is None:
+                return False
 
-        self._con.cursor().execute(
-            "INSERT INTO wallets (address, user_id, balance) VALUES (?, ?, ?)",
-            [wallet.address, user[0], str(wallet.balance)],
-        )
+            con.cursor().execute(
+                "INSERT INTO wallets (address, user_id, balance) VALUES (?, ?, ?)",
+                [wallet.address, user[0], to_satoshis(wallet.balance)],
+            )
+            con.cursor().execute(
+                "UPDATE users SET wallet_count = wallet_count + 1 WHERE id = ?",
+                [user[0]],
+            )
 
-        self._con.commit()
+            con.commit()
 
         return True
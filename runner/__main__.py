@@ -1,6 +1,41 @@
+import argparse
+import os
+
 import uvicorn
 
-from runner.setup import setup
+from runner.setup import WORKERS_ENV
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the bitcoin wallet API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="worker processes, more than one disables the SQLite wallet cache "
+        "and each worker runs its own group commit",
+    )
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--keep-alive", type=int, default=5)
+    parser.add_argument("--loop", choices=("auto", "uvloop", "asyncio"), default="auto")
+    parser.add_argument("--http", choices=("auto", "httptools", "h11"), default="auto")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
-    uvicorn.run(setup(), host="0.0.0.0", port=8000)
+    args = parse_args()
+    # Workers are spawned processes, each builds its own app, pools and caches
+    os.environ[WORKERS_ENV] = str(args.workers)
+    uvicorn.run(
+        "runner.setup:setup",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        loop=args.loop,
+        http=args.http,
+    )
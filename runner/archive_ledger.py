@@ -0,0 +1,38 @@
+import argparse
+import sys
+import time
+
+from infra.persistence.sqlite.db_setup import SqliteSettings, connect, create_db
+from infra.persistence.sqlite.ledger import archive_partitions, period_of, shift_period
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Move old ledger months into read-only archive files"
+    )
+    parser.add_argument("--keep-months", type=int, default=3)
+    args = parser.parse_args()
+    if args.keep_months < 1:
+        # The current month still takes writes
+        parser.error("--keep-months must be at least 1")
+    return args
+
+
+def archive_ledger(keep_months: int) -> int:
+    before = shift_period(period_of(int(time.time())), 1 - keep_months)
+    con = connect(SqliteSettings())
+    try:
+        create_db(con)
+        archived = archive_partitions(con, before)
+    finally:
+        con.close()
+
+    for partition in archived:
+        print(f"archived {partition.period} to {partition.archive_path}")
+    if not archived:
+        print(f"no live partitions before {before}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(archive_ledger(parse_args().keep_months))
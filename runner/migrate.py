@@ -0,0 +1,22 @@
+import sys
+
+from infra.persistence.sqlite.db_setup import SqliteSettings, connect
+from infra.persistence.sqlite.migrations import migrate
+
+
+def migrate_database() -> int:
+    con = connect(SqliteSettings())
+    try:
+        start, end = migrate(con)
+    finally:
+        con.close()
+
+    if start == end:
+        print(f"schema is up to date at version {end}")
+    else:
+        print(f"migrated schema from version {start} to {end}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(migrate_database())
@@ -0,0 +1,31 @@
+import sys
+
+from infra.persistence.sqlite.db_setup import (
+    SharedConnection,
+    SqliteSettings,
+    connect,
+    create_db,
+)
+from infra.persistence.sqlite.sqlite_transaction_repository import (
+    SqliteTransactionRepository,
+)
+
+
+def rebuild_statistics() -> int:
+    con = connect(SqliteSettings())
+    create_db(con)
+    repo = SqliteTransactionRepository(SharedConnection(con))
+
+    stored = repo.get_statistics()
+    rebuilt = repo.rebuild_statistics()
+
+    print(f"stored:  profit={stored.profit} count={stored.transaction_count}")
+    print(f"rebuilt: profit={rebuilt.profit} count={rebuilt.transaction_count}")
+    if stored != rebuilt:
+        print("statistics drifted from the ledger and were rebuilt")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(rebuild_statistics())
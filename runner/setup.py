@@ -1,69 +1,319 @@
+import logging
+import os
 from decimal import Decimal
+from sqlite3 import Connection
+from typing import Callable, TypeVar
 
 from fastapi import FastAPI
 
-from core.facade import AwesomeBitcoinService
+from core.facade import AwesomeBitcoinService, ExecutorBitcoinService
 from core.interactors.admin_interactor import BitcoinServiceAdminInteractor
-from core.interactors.fee_provider import PercentageFeeProvider
-from core.interactors.rate_provider import GeckoRateProvider
+from core.interactors.fee_provider import (
+    FeeProvider,
+    PercentageFeeProvider,
+    ScheduleFeeProvider,
+)
+from core.interactors.rate_provider import (
+    CachingRateProvider,
+    GeckoRateProvider,
+    RateProvider,
+)
 from core.interactors.tokens import HardCodedTokenValidator, RandomHexTokenProvider
 from core.interactors.transaction_interactor import BitcoinServiceTransactionInteractor
 from core.interactors.user_interactor import BitcoinServiceUserInteractor
 from core.interactors.wallet_interactor import BitcoinServiceWalletInteractor
+from core.interactors.wallet_locks import LockingTransactionInteractor, StripedLocks
+from core.repositories.idempotency_repository import IdempotencyRepository
+from core.repositories.transaction_repository import TransactionRepository
+from core.repositories.user_repository import UserRepository
+from core.repositories.wallet_repository import WalletRepository
+from infra.api.fastapi.exports import export_api
+from infra.api.fastapi.metrics import RequestMetricsMiddleware, metrics_api
+from infra.api.fastapi.sql_profile import SqlProfileMiddleware
 from infra.api.fastapi.statistics import admin_api
 from infra.api.fastapi.transactions import transaction_api
 from infra.api.fastapi.users import user_api
 from infra.api.fastapi.wallets import wallet_api
-from infra.persistence.sqlite.db_setup import create_db, get_db_connection
+from infra.metrics.instrumented import instrument
+from infra.metrics.registry import MetricsRegistry
+from infra.metrics.statements import StatementCounter
+from infra.persistence.cache.cached_idempotency_repository import (
+    CachedIdempotencyRepository,
+)
+from infra.persistence.cache.cached_user_repository import CachedUserRepository
+from infra.persistence.cache.cached_wallet_repository import CachedWalletRepository
+from infra.persistence.postgres.db_setup import (
+    PostgresConnectionPool,
+    PostgresSettings,
+    initialize_schema as initialize_postgres_schema,
+)
+from infra.persistence.postgres.postgres_idempotency_repository import (
+    PostgresIdempotencyRepository,
+)
+from infra.persistence.postgres.postgres_transaction_repository import (
+    PostgresTransactionRepository,
+)
+from infra.persistence.postgres.postgres_user_repository import PostgresUserRepository
+from infra.persistence.postgres.postgres_wallet_repository import (
+    PostgresWalletRepository,
+)
+from infra.persistence.sqlite.db_setup import (
+    SqliteConnectionPool,
+    SqliteSettings,
+    initialize_schema,
+)
+from infra.persistence.sqlite.group_commit import GroupCommitTransactionRepository
+from infra.persistence.sqlite.profiler import ProfilingConnection
+from infra.persistence.sqlite.sqlite_idempotency_repository import (
+    SqliteIdempotencyRepository,
+)
 from infra.persistence.sqlite.sqlite_transaction_repository import (
     SqliteTransactionRepository,
 )
 from infra.persistence.sqlite.sqlite_user_repository import SqliteUserRepository
 from infra.persistence.sqlite.sqlite_wallet_repository import SqliteWalletRepository
 
+logger = logging.getLogger(__name__)
+
+DB_PATH: str = "app.db"
+# Group commit amortizes the fsync, so every commit can afford to be durable
+DB_SYNCHRONOUS: str = os.environ.get("DB_SYNCHRONOUS", "FULL")
+DB_BUSY_TIMEOUT_MS: int = 5000
+DB_MMAP_SIZE_BYTES: int = 256 * 1024 * 1024
+DB_CACHE_SIZE_KIB: int = 16 * 1024
+DB_READERS: int = 8
+DB_WRITERS: int = 1
+USER_CACHE_SIZE: int = 100_000
+USER_CACHE_TTL_SECONDS: float = 300
+USER_NEGATIVE_TTL_SECONDS: float = 30
+EXPECTED_USERS: int = 1_000_000
+WALLET_CACHE_SIZE: int = 10_000
+IDEMPOTENCY_TTL_SECONDS: int = 24 * 60 * 60
+IDEMPOTENCY_CACHE_SIZE: int = 100_000
+WALLET_LOCK_STRIPES: int = 1024
+GROUP_COMMIT_MAX_BATCH_SIZE: int = 256
+GROUP_COMMIT_MAX_WAIT_US: int = 200
 RATE_PROVIDER_URL: str = (
     "https://api.coingecko.com"
     "/api/v3/simple/price?ids=bitcoin&vs_currencies=usd&precision=full"
 )
+RATE_TTL_SECONDS: float = 30
+RATE_MAX_STALENESS_SECONDS: float = 300
 TOKEN_LENGTH_BYTES: int = 32
 MAX_WALLETS: int = 3
 INITIAL_DEPOSIT: Decimal = Decimal(1)
 FEE_PERCENTAGE: Decimal = Decimal("0.015")
+# A JSON fee schedule replaces the flat percentage, edits apply without a restart
+FEE_SCHEDULE_PATH: str | None = os.environ.get("FEE_SCHEDULE")
+FEE_SCHEDULE_RELOAD_SECONDS: float = 5
 ADMIN_TOKEN: str = "12345678"
+SERVICE_WORKERS: int = DB_READERS + DB_WRITERS
+# Enough transfers in flight to fill a group commit batch
+TRANSFER_WORKERS: int = GROUP_COMMIT_MAX_BATCH_SIZE
+METRICS_ENABLED: bool = True
+SQL_PROFILING_ENABLED: bool = True
+SQL_PROFILE_ALL: bool = os.environ.get("SQL_PROFILE", "0") not in ("", "0")
+# Unset keeps the SQLite file at db_path
+POSTGRES_DSN: str | None = os.environ.get("POSTGRES_DSN")
+POSTGRES_READERS: int = 8
+POSTGRES_WRITERS: int = 8
+SCHEMA_LOCK_SUFFIX: str = ".lock"
+WORKERS_ENV: str = "BITCOIN_WORKERS"
+
+T = TypeVar("T")
+
+
+def worker_count() -> int:
+    return int(os.environ.get(WORKERS_ENV, "1"))
+
 
+def register_cache_metrics(
+    registry: MetricsRegistry,
+    rate_provider: CachingRateProvider,
+    user_repo: CachedUserRepository,
+) -> None:
+    def read(stats: Callable[[], object], field: str) -> Callable[[], float]:
+        return lambda: float(getattr(stats(), field))
 
-def setup() -> FastAPI:
+    for field in ("hits", "misses", "stale", "failures"):
+        registry.callback(
+            f"bitcoin_rate_cache_{field}_total",
+            f"Rate lookups counted as {field}",
+            "counter",
+            read(lambda: rate_provider.stats, field),
+        )
+    for field in ("hits", "misses", "negative_hits", "username_skips"):
+        registry.callback(
+            f"bitcoin_user_cache_{field}_total",
+            f"User lookups counted as {field}",
+            "counter",
+            read(lambda: user_repo.stats, field),
+        )
+
+
+def setup(db_path: str = DB_PATH, rate_provider: RateProvider | None = None) -> FastAPI:
     app = FastAPI()
     app.include_router(user_api)
     app.include_router(admin_api)
+    app.include_router(export_api)
     app.include_router(wallet_api)
     app.include_router(transaction_api)
+    app.include_router(metrics_api)
+
+    registry = MetricsRegistry()
+    statements = StatementCounter(registry)
+    app.add_middleware(
+        RequestMetricsMiddleware, registry=registry, statements=statements
+    )
+    app.state.metrics = registry
+    if SQL_PROFILING_ENABLED:
+        app.add_middleware(SqlProfileMiddleware, profile_all=SQL_PROFILE_ALL)
 
-    con = get_db_connection()
-    # THIS IS OUT OF SCOPE, LEFT HERE FOR CONVENIENCE, DO NOT PUNISH
-    create_db(con)
+    def measured(target: T, layer: str) -> T:
+        return instrument(target, layer, registry) if METRICS_ENABLED else target
 
-    user_repo = SqliteUserRepository(con)
-    wallet_repo = SqliteWalletRepository(con)
-    transaction_repo = SqliteTransactionRepository(con)
+    users: UserRepository
+    wallets: WalletRepository
+    idempotency: IdempotencyRepository
+    transactions: SqliteTransactionRepository | PostgresTransactionRepository
+    db: SqliteConnectionPool | PostgresConnectionPool
+    if POSTGRES_DSN is None:
+        sqlite = SqliteConnectionPool(
+            SqliteSettings(
+                db_path,
+                synchronous=DB_SYNCHRONOUS,
+                busy_timeout_ms=DB_BUSY_TIMEOUT_MS,
+                mmap_size_bytes=DB_MMAP_SIZE_BYTES,
+                cache_size_kib=DB_CACHE_SIZE_KIB,
+                readers=DB_READERS,
+                writers=DB_WRITERS,
+            ),
+            on_connect=statements.attach if METRICS_ENABLED else None,
+            factory=ProfilingConnection if SQL_PROFILING_ENABLED else Connection,
+        )
+        app.add_event_handler(
+            "startup",
+            lambda: initialize_schema(sqlite, f"{db_path}{SCHEMA_LOCK_SUFFIX}"),
+        )
+        users = SqliteUserRepository(sqlite)
+        wallets = SqliteWalletRepository(sqlite)
+        idempotency = SqliteIdempotencyRepository(sqlite, IDEMPOTENCY_TTL_SECONDS)
+        transactions = SqliteTransactionRepository(
+            sqlite, idempotency_ttl_seconds=IDEMPOTENCY_TTL_SECONDS
+        )
+        db = sqlite
+    else:
+        postgres = PostgresConnectionPool(
+            PostgresSettings(
+                POSTGRES_DSN, readers=POSTGRES_READERS, writers=POSTGRES_WRITERS
+            )
+        )
+        app.add_event_handler("startup", lambda: initialize_postgres_schema(postgres))
+        users = PostgresUserRepository(postgres)
+        wallets = PostgresWalletRepository(postgres)
+        idempotency = PostgresIdempotencyRepository(postgres, IDEMPOTENCY_TTL_SECONDS)
+        transactions = PostgresTransactionRepository(
+            postgres, idempotency_ttl_seconds=IDEMPOTENCY_TTL_SECONDS
+        )
+        db = postgres
+
+    user_cache = CachedUserRepository(
+        measured(users, "repository"),
+        USER_CACHE_SIZE,
+        USER_CACHE_TTL_SECONDS,
+        USER_NEGATIVE_TTL_SECONDS,
+        EXPECTED_USERS,
+    )
+    user_repo = measured(user_cache, "cache")
+    wallet_repo: WalletRepository = measured(wallets, "repository")
+    # The wallet cache only sees this process's commits, other workers would
+    # leave it serving stale balances and wallet lists. Postgres commits
+    # transfers concurrently and may be shared by several deployments.
+    if worker_count() == 1 and POSTGRES_DSN is None:
+        wallet_cache = CachedWalletRepository(wallet_repo, WALLET_CACHE_SIZE)
+        wallet_repo = measured(wallet_cache, "cache")
+        transactions.balance_listeners.append(wallet_repo)
+    elif POSTGRES_DSN is None:
+        logger.warning(
+            "Wallet cache disabled, it is only correct with a single worker "
+            "(running %d)",
+            worker_count(),
+        )
+    transaction_repo: TransactionRepository = measured(transactions, "repository")
+    if POSTGRES_DSN is None:
+        # Concurrent single transfers share one SQLite transaction and fsync
+        group_commit = GroupCommitTransactionRepository(
+            transaction_repo, GROUP_COMMIT_MAX_BATCH_SIZE, GROUP_COMMIT_MAX_WAIT_US
+        )
+        app.add_event_handler("startup", group_commit.start)
+        app.add_event_handler("shutdown", group_commit.stop)
+        transaction_repo = group_commit
+    # Stored keys never change, so the cache is safe with several workers
+    idempotency_repo = measured(
+        CachedIdempotencyRepository(
+            measured(idempotency, "repository"),
+            IDEMPOTENCY_CACHE_SIZE,
+            IDEMPOTENCY_TTL_SECONDS,
+        ),
+        "cache",
+    )
     token_provider = RandomHexTokenProvider(TOKEN_LENGTH_BYTES)
-    rate_provider = GeckoRateProvider(RATE_PROVIDER_URL)
-    fee_provider = PercentageFeeProvider(FEE_PERCENTAGE)
+    cached_rate_provider = CachingRateProvider(
+        measured(rate_provider or GeckoRateProvider(RATE_PROVIDER_URL), "provider"),
+        RATE_TTL_SECONDS,
+        RATE_MAX_STALENESS_SECONDS,
+    )
+    register_cache_metrics(registry, cached_rate_provider, user_cache)
+    app.add_event_handler("startup", cached_rate_provider.start)
+    app.add_event_handler("shutdown", cached_rate_provider.stop)
+    fees: FeeProvider = (
+        PercentageFeeProvider(FEE_PERCENTAGE)
+        if FEE_SCHEDULE_PATH is None
+        else ScheduleFeeProvider(FEE_SCHEDULE_PATH, FEE_SCHEDULE_RELOAD_SECONDS)
+    )
+    fee_provider = measured(fees, "provider")
     admin_token_validator = HardCodedTokenValidator(ADMIN_TOKEN)
-    app.state.core = AwesomeBitcoinService(
-        BitcoinServiceUserInteractor(user_repo, token_provider),
-        BitcoinServiceWalletInteractor(
-            token_provider,
-            user_repo,
-            wallet_repo,
-            rate_provider,
-            INITIAL_DEPOSIT,
-            MAX_WALLETS,
+    service = AwesomeBitcoinService(
+        measured(BitcoinServiceUserInteractor(user_repo, token_provider), "interactor"),
+        measured(
+            BitcoinServiceWalletInteractor(
+                token_provider,
+                user_repo,
+                wallet_repo,
+                measured(cached_rate_provider, "cache"),
+                INITIAL_DEPOSIT,
+                MAX_WALLETS,
+            ),
+            "interactor",
         ),
-        BitcoinServiceTransactionInteractor(
-            user_repo, wallet_repo, transaction_repo, fee_provider
+        measured(
+            LockingTransactionInteractor(
+                BitcoinServiceTransactionInteractor(
+                    user_repo,
+                    wallet_repo,
+                    transaction_repo,
+                    fee_provider,
+                    idempotency_repo,
+                ),
+                StripedLocks(WALLET_LOCK_STRIPES),
+            ),
+            "interactor",
         ),
-        BitcoinServiceAdminInteractor(admin_token_validator, transaction_repo),
+        measured(
+            BitcoinServiceAdminInteractor(admin_token_validator, transaction_repo),
+            "interactor",
+        ),
+    )
+    service_workers = (
+        SERVICE_WORKERS if POSTGRES_DSN is None else POSTGRES_READERS + POSTGRES_WRITERS
+    )
+    core = ExecutorBitcoinService(
+        measured(service, "facade"),
+        service_workers,
+        TRANSFER_WORKERS if POSTGRES_DSN is None else None,
     )
+    app.add_event_handler("shutdown", core.shutdown)
+    app.add_event_handler("shutdown", db.close)
+    app.state.core = core
 
     return app
@@ -1,6 +1,7 @@
 import unittest.mock
 from decimal import Decimal
 
+from core.models.statistics import Statistics
 from core.models.transaction import Transaction
 from core.models.user import User
 from core.models.wallet import Wallet
@@ -14,6 +15,10 @@ def get_transaction_repo(transactions: list[Transaction]) -> TransactionReposito
     repo.get_transactions.return_value = transactions
     repo.get_user_transactions.return_value = transactions
     repo.get_all_transactions.return_value = transactions
+    repo.get_statistics.return_value = Statistics(
+        sum((transaction.fee for transaction in transactions), Decimal(0)),
+        len(transactions),
+    )
     return repo
 
 
@@ -34,4 +39,8 @@ def get_wallet_repo(
     wallet_repo.create_wallet.return_value = create_wallet
     wallet_repo.get_wallet.return_value = get_wallet_return
     wallet_repo.get_wallets_by_user.return_value = get_wallets_by_user_return
+    wallet_repo.count_wallets_by_user.return_value = len(get_wallets_by_user_return)
+    wallet_repo.get_wallets.return_value = (
+        [] if get_wallet_return is None else [get_wallet_return]
+    )
     return wallet_repo
@@ -0,0 +1,29 @@
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+import pytest
+
+from infra.persistence.postgres.db_setup import (
+    PostgresConnectionPool,
+    PostgresSettings,
+    create_db,
+)
+
+POSTGRES_DSN = os.environ.get("POSTGRES_DSN")
+
+
+@contextmanager
+def postgres_pool() -> Iterator[PostgresConnectionPool]:
+    if POSTGRES_DSN is None:
+        pytest.skip("POSTGRES_DSN is not set")
+
+    pool = PostgresConnectionPool(PostgresSettings(POSTGRES_DSN, readers=2, writers=4))
+    # Every test starts from an empty schema in the database it is pointed at
+    with pool.writer() as conn:
+        conn.execute("DROP SCHEMA public CASCADE")
+        conn.execute("CREATE SCHEMA public")
+        conn.commit()
+        create_db(conn)
+    yield pool
+    pool.close()
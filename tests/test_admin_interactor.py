@@ -1,12 +1,9 @@
 import unittest.mock
 from decimal import Decimal
 
-from core.interactors.admin_interactor import (
-    AdminStatus,
-    BitcoinServiceAdminInteractor,
-    Statistics,
-)
+from core.interactors.admin_interactor import AdminStatus, BitcoinServiceAdminInteractor
 from core.interactors.tokens import TokenValidator
+from core.models.statistics import Statistics, WindowStatistics
 from core.models.transaction import Transaction
 from core.repositories.transaction_repository import TransactionRepository
 
@@ -17,29 +14,74 @@ def get_validator(return_val: bool) -> TokenValidator:
     return validator_mock
 
 
-def get_transaction_repo(transactions: list[Transaction]) -> TransactionRepository:
+def get_transaction_repo(statistics: Statistics) -> TransactionRepository:
     mock = unittest.mock.Mock()
-    mock.get_all_transactions.return_value = transactions
+    mock.get_statistics.return_value = statistics
     return mock
 
 
 def test_transaction_service_unauthorized() -> None:
     interactor = BitcoinServiceAdminInteractor(
-        get_validator(False), get_transaction_repo([])
+        get_validator(False), get_transaction_repo(Statistics())
     )
 
     assert interactor.get_statistics("some token").status == AdminStatus.UNAUTHORIZED
 
 
 def test_transaction_service_authorized_correct_transactions() -> None:
-    transactions = [
-        Transaction("1", "2", Decimal(2), Decimal(1)),
-        Transaction("2", "1", Decimal(3), Decimal(1)),
-    ]
     interactor = BitcoinServiceAdminInteractor(
-        get_validator(True), get_transaction_repo(transactions)
+        get_validator(True), get_transaction_repo(Statistics(Decimal(5), 2))
     )
 
     ret = interactor.get_statistics("asdasda")
     assert ret.status == AdminStatus.SUCCESS
     assert ret.statistics == Statistics(Decimal(5), 2)
+
+
+def test_export_transactions_unauthorized() -> None:
+    repo = get_transaction_repo(Statistics())
+    interactor = BitcoinServiceAdminInteractor(get_validator(False), repo)
+
+    response = interactor.export_transactions("some token")
+    assert response.status == AdminStatus.UNAUTHORIZED
+    assert response.transactions is None
+    repo.iter_transactions.assert_not_called()  # type: ignore
+
+
+def test_export_transactions_authorized() -> None:
+    transactions = [Transaction("1", "2", Decimal(2), Decimal(1))]
+    repo = get_transaction_repo(Statistics())
+    repo.iter_transactions.return_value = iter(transactions)  # type: ignore
+    interactor = BitcoinServiceAdminInteractor(get_validator(True), repo)
+
+    response = interactor.export_transactions("token", "1", 10, 20)
+    assert response.status == AdminStatus.SUCCESS
+    assert response.transactions is not None
+    assert list(response.transactions) == transactions
+    repo.iter_transactions.assert_called_once_with("1", 10, 20)  # type: ignore
+
+
+def test_window_statistics_unauthorized() -> None:
+    rolling = unittest.mock.Mock()
+    interactor = BitcoinServiceAdminInteractor(
+        get_validator(False), get_transaction_repo(Statistics()), rolling
+    )
+
+    response = interactor.get_window_statistics("some token", 60)
+    assert response.status == AdminStatus.UNAUTHORIZED
+    assert response.statistics is None
+    rolling.window.assert_not_called()
+
+
+def test_window_statistics_authorized() -> None:
+    statistics = WindowStatistics(Decimal(3), Decimal("0.1"), 2, Decimal(1), Decimal(2))
+    rolling = unittest.mock.Mock()
+    rolling.window.return_value = statistics
+    interactor = BitcoinServiceAdminInteractor(
+        get_validator(True), get_transaction_repo(Statistics()), rolling
+    )
+
+    response = interactor.get_window_statistics("token", 1440)
+    assert response.status == AdminStatus.SUCCESS
+    assert response.statistics == statistics
+    rolling.window.assert_called_once_with(1440)
@@ -0,0 +1,127 @@
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+from benchmarks.data import DatasetSize, generate_dataset
+from benchmarks.harness import measure, percentile
+from benchmarks.scenarios import (
+    FixedRateProvider,
+    interactor_scenarios,
+    repository_scenarios,
+)
+from core.facade import AwesomeBitcoinService
+from core.interactors.admin_interactor import BitcoinServiceAdminInteractor
+from core.interactors.fee_provider import PercentageFeeProvider
+from core.interactors.tokens import HardCodedTokenValidator, RandomHexTokenProvider
+from core.interactors.transaction_interactor import BitcoinServiceTransactionInteractor
+from core.interactors.user_interactor import BitcoinServiceUserInteractor
+from core.interactors.wallet_interactor import BitcoinServiceWalletInteractor
+from infra.persistence.sqlite.db_setup import SharedConnection, create_db
+from infra.persistence.sqlite.group_commit import GroupCommitTransactionRepository
+from infra.persistence.sqlite.sqlite_transaction_repository import (
+    SqliteTransactionRepository,
+)
+from infra.persistence.sqlite.sqlite_user_repository import SqliteUserRepository
+from infra.persistence.sqlite.sqlite_wallet_repository import SqliteWalletRepository
+
+
+@pytest.fixture
+def db() -> SharedConnection:
+    con = sqlite3.connect(":memory:", check_same_thread=False)
+    create_db(con)
+    return SharedConnection(con)
+
+
+def test_percentile() -> None:
+    samples = [float(value) for value in range(1, 101)]
+
+    assert percentile(samples, 0.5) == 50
+    assert percentile(samples, 0.99) == 99
+    assert percentile([3.0], 0.99) == 3
+    assert percentile([], 0.5) == 0
+
+
+def test_measure() -> None:
+    seen: list[int] = []
+    ticks = iter(range(100))
+
+    result = measure(
+        "op", "unit", seen.append, 3, warmup=2, clock=lambda: float(next(ticks))
+    )
+
+    assert seen == [0, 1, 2, 3, 4]
+    assert result.operations == 3
+    assert result.seconds == 7
+    assert result.throughput == 3 / 7
+    assert result.p50_ms == 1000
+
+
+def test_generate_dataset(db: SharedConnection) -> None:
+    transaction_repo = SqliteTransactionRepository(db)
+    dataset = generate_dataset(
+        SqliteUserRepository(db),
+        SqliteWalletRepository(db),
+        transaction_repo,
+        PercentageFeeProvider(Decimal("0.015")),
+        DatasetSize(users=5, wallets_per_user=2, transactions=25),
+        batch_size=10,
+    )
+
+    assert len(dataset.user_tokens) == 5
+    assert len(dataset.wallet_addresses) == 10
+    assert len(transaction_repo.get_all_transactions()) == 25
+    assert transaction_repo.get_statistics() == transaction_repo.rebuild_statistics()
+
+
+def test_interactor_scenarios(db: SharedConnection) -> None:
+    user_repo = SqliteUserRepository(db)
+    wallet_repo = SqliteWalletRepository(db)
+    transaction_repo = SqliteTransactionRepository(db)
+    fee_provider = PercentageFeeProvider(Decimal("0.015"))
+    dataset = generate_dataset(
+        user_repo,
+        wallet_repo,
+        transaction_repo,
+        fee_provider,
+        DatasetSize(users=3, wallets_per_user=2, transactions=10),
+    )
+    token_provider = RandomHexTokenProvider(8)
+    service = AwesomeBitcoinService(
+        BitcoinServiceUserInteractor(user_repo, token_provider),
+        BitcoinServiceWalletInteractor(
+            token_provider, user_repo, wallet_repo, FixedRateProvider(), Decimal(1), 3
+        ),
+        BitcoinServiceTransactionInteractor(
+            user_repo, wallet_repo, transaction_repo, fee_provider
+        ),
+        BitcoinServiceAdminInteractor(
+            HardCodedTokenValidator("admin"), transaction_repo
+        ),
+    )
+
+    scenarios = interactor_scenarios(service, dataset, "admin")
+    for operation in scenarios.values():
+        measure("scenario", "interactor", operation, 5)
+
+    assert transaction_repo.get_statistics().transaction_count == 15
+
+
+def test_repository_scenarios(db: SharedConnection) -> None:
+    transaction_repo = SqliteTransactionRepository(db)
+    dataset = generate_dataset(
+        SqliteUserRepository(db),
+        SqliteWalletRepository(db),
+        transaction_repo,
+        PercentageFeeProvider(Decimal("0.015")),
+        DatasetSize(users=3, wallets_per_user=2, transactions=10),
+    )
+    grouped = GroupCommitTransactionRepository(transaction_repo, 4, 1000)
+    grouped.start()
+
+    scenarios = repository_scenarios(transaction_repo, grouped, dataset)
+    for operation in scenarios.values():
+        measure("scenario", "repository", operation, 5)
+    grouped.stop()
+
+    assert transaction_repo.get_statistics().transaction_count == 20
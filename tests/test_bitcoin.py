@@ -0,0 +1,17 @@
+from decimal import Decimal
+
+import pytest
+
+from core.models.bitcoin import from_satoshis, is_whole_satoshis, to_satoshis
+
+
+def test_round_trip() -> None:
+    for value in ["0", "0.00000001", "1.5", "20999999.99999999"]:
+        assert from_satoshis(to_satoshis(Decimal(value))) == Decimal(value)
+
+
+def test_sub_satoshi_amount_rejected() -> None:
+    assert not is_whole_satoshis(Decimal("0.000000001"))
+
+    with pytest.raises(ValueError):
+        to_satoshis(Decimal("0.000000001"))
@@ -0,0 +1,19 @@
+from infra.persistence.cache.bloom import BloomFilter
+
+
+def test_no_false_negatives() -> None:
+    bloom = BloomFilter(1000, 0.01)
+    for index in range(1000):
+        bloom.add(f"user-{index}")
+
+    assert all(f"user-{index}" in bloom for index in range(1000))
+
+
+def test_false_positive_rate() -> None:
+    bloom = BloomFilter(1000, 0.01)
+    for index in range(1000):
+        bloom.add(f"user-{index}")
+
+    false_positives = sum(f"other-{index}" in bloom for index in range(10_000))
+
+    assert false_positives < 300
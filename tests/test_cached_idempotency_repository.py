@@ -0,0 +1,58 @@
+from decimal import Decimal
+from unittest.mock import Mock
+
+import pytest
+
+from core.models.idempotency import IdempotencyRecord
+from core.models.transaction import Transaction
+from infra.persistence.cache.cached_idempotency_repository import (
+    CachedIdempotencyRepository,
+)
+
+RECORD = IdempotencyRecord(
+    "hash", Transaction("address1", "address2", Decimal("0.015"), Decimal(1))
+)
+
+
+@pytest.fixture
+def inner() -> Mock:
+    inner = Mock()
+    inner.get.return_value = RECORD
+    return inner
+
+
+@pytest.fixture
+def now() -> list[float]:
+    return [0.0]
+
+
+@pytest.fixture
+def repo(inner: Mock, now: list[float]) -> CachedIdempotencyRepository:
+    return CachedIdempotencyRepository(inner, 10, 60, clock=lambda: now[0])
+
+
+def test_stored_key_served_from_cache(
+    repo: CachedIdempotencyRepository, inner: Mock
+) -> None:
+    assert repo.get("token1", "key") == RECORD
+    assert repo.get("token1", "key") == RECORD
+    inner.get.assert_called_once_with("token1", "key")
+
+
+def test_missing_key_not_cached(repo: CachedIdempotencyRepository, inner: Mock) -> None:
+    inner.get.return_value = None
+
+    assert repo.get("token1", "key") is None
+    assert repo.get("token1", "key") is None
+    assert inner.get.call_count == 2
+
+
+def test_cached_key_expires(
+    repo: CachedIdempotencyRepository, inner: Mock, now: list[float]
+) -> None:
+    repo.get("token1", "key")
+    now[0] = 60
+    inner.get.return_value = None
+
+    assert repo.get("token1", "key") is None
+    assert inner.get.call_count == 2
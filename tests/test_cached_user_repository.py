@@ -0,0 +1,97 @@
+import sqlite3
+from unittest.mock import Mock
+
+import pytest
+
+from core.models.user import User
+from infra.persistence.cache.cached_user_repository import (
+    CachedUserRepository,
+    UserCacheStats,
+)
+from infra.persistence.sqlite.db_setup import SharedConnection, create_db
+from infra.persistence.sqlite.sqlite_user_repository import SqliteUserRepository
+
+
+@pytest.fixture
+def inner() -> Mock:
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    create_db(conn)
+    repo = SqliteUserRepository(SharedConnection(conn))
+    repo.create_user(User("test1", "token1"))
+    return Mock(wraps=repo)
+
+
+@pytest.fixture
+def now() -> list[float]:
+    return [0.0]
+
+
+@pytest.fixture
+def repo(inner: Mock, now: list[float]) -> CachedUserRepository:
+    return CachedUserRepository(inner, 10, 60, 5, 100, clock=lambda: now[0])
+
+
+def test_get_user_cached(repo: CachedUserRepository, inner: Mock) -> None:
+    assert repo.get_user("token1") == User("test1", "token1")
+    assert repo.get_user("token1") == User("test1", "token1")
+
+    assert inner.get_user.call_count == 1
+    assert repo.stats == UserCacheStats(hits=1, misses=1)
+
+
+def test_get_user_expires(
+    repo: CachedUserRepository, inner: Mock, now: list[float]
+) -> None:
+    repo.get_user("token1")
+    now[0] = 60
+    repo.get_user("token1")
+
+    assert inner.get_user.call_count == 2
+
+
+def test_unknown_token_cached(
+    repo: CachedUserRepository, inner: Mock, now: list[float]
+) -> None:
+    assert repo.get_user("wrong") is None
+    assert repo.get_user("wrong") is None
+    assert inner.get_user.call_count == 1
+    assert repo.stats.negative_hits == 1
+
+    now[0] = 5
+    assert repo.get_user("wrong") is None
+    assert inner.get_user.call_count == 2
+
+
+def test_created_user_replaces_unknown_token(
+    repo: CachedUserRepository, inner: Mock
+) -> None:
+    assert repo.get_user("token2") is None
+
+    assert repo.create_user(User("test2", "token2"))
+    assert not repo.create_user(User("test2", "token3"))
+
+    assert repo.get_user("token2") == User("test2", "token2")
+    assert inner.get_user.call_count == 1
+
+
+def test_username_taken(repo: CachedUserRepository, inner: Mock) -> None:
+    assert repo.username_taken("test1")
+    assert not repo.username_taken("test2")
+    repo.create_user(User("test2", "token2"))
+    assert repo.username_taken("test2")
+
+    inner.iter_usernames.assert_called_once()
+    assert repo.stats.username_checks == 3
+    assert repo.stats.username_skips == 1
+    assert inner.username_taken.call_count == 2
+
+
+def test_username_taken_by_another_process(
+    repo: CachedUserRepository, inner: Mock
+) -> None:
+    assert not repo.username_taken("test2")
+    inner.create_user(User("test2", "token2"))
+    assert not repo.username_taken("test2")
+
+    assert not repo.create_user(User("test2", "token3"))
+    assert repo.username_taken("test2")
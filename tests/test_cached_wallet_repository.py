@@ -0,0 +1,159 @@
+import sqlite3
+from decimal import Decimal
+from unittest.mock import Mock
+
+import pytest
+
+from core.models.transaction import Transaction
+from core.models.wallet import Wallet
+from infra.persistence.cache.cached_wallet_repository import CachedWalletRepository
+from infra.persistence.sqlite.db_setup import SharedConnection, create_db
+from infra.persistence.sqlite.sqlite_transaction_repository import (
+    SqliteTransactionRepository,
+)
+from infra.persistence.sqlite.sqlite_wallet_repository import SqliteWalletRepository
+
+
+@pytest.fixture
+def db() -> SharedConnection:
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    create_db(conn)
+    conn.execute("INSERT INTO users(token, username) VALUES ('test1', 'test1')")
+    conn.execute("INSERT INTO users(token, username) VALUES ('test2', 'test2')")
+    conn.commit()
+    return SharedConnection(conn)
+
+
+@pytest.fixture
+def inner(db: SharedConnection) -> Mock:
+    repo = SqliteWalletRepository(db)
+    repo.create_wallet(Wallet("wallet1", Decimal("10"), "test1"))
+    repo.create_wallet(Wallet("wallet2", Decimal("20"), "test2"))
+    return Mock(wraps=repo)
+
+
+def test_get_wallet_served_from_memory(inner: Mock) -> None:
+    repo = CachedWalletRepository(inner, 10)
+
+    assert repo.get_wallet("wallet1") == Wallet("wallet1", Decimal("10"), "test1")
+    assert repo.get_wallet("wallet1") == Wallet("wallet1", Decimal("10"), "test1")
+    assert repo.get_wallet("wrong") is None
+    assert repo.get_wallet("wrong") is None
+
+    assert inner.get_wallet.call_count == 3
+
+
+def test_get_wallets_loads_only_misses(inner: Mock) -> None:
+    repo = CachedWalletRepository(inner, 10)
+    repo.get_wallet("wallet1")
+
+    wallets = repo.get_wallets(["wallet1", "wallet2", "wrong"])
+
+    assert wallets == [
+        Wallet("wallet1", Decimal("10"), "test1"),
+        Wallet("wallet2", Decimal("20"), "test2"),
+    ]
+    inner.get_wallets.assert_called_once_with(["wallet2", "wrong"])
+
+
+def test_get_wallets_by_user_sees_created_wallet(inner: Mock) -> None:
+    repo = CachedWalletRepository(inner, 10)
+    assert len(repo.get_wallets_by_user("test1")) == 1
+    assert len(repo.get_wallets_by_user("test1")) == 1
+    assert inner.get_wallets_by_user.call_count == 1
+
+    assert repo.create_wallet(Wallet("wallet3", Decimal("1"), "test1"))
+    assert not repo.create_wallet(Wallet("wallet4", Decimal("1"), "wrong"))
+
+    assert repo.get_wallets_by_user("test1") == [
+        Wallet("wallet1", Decimal("10"), "test1"),
+        Wallet("wallet3", Decimal("1"), "test1"),
+    ]
+
+
+def test_count_wallets_by_user(inner: Mock) -> None:
+    repo = CachedWalletRepository(inner, 10)
+    assert repo.count_wallets_by_user("test1") == 1
+    assert inner.count_wallets_by_user.call_count == 1
+
+    repo.get_wallets_by_user("test1")
+    assert repo.create_wallet(Wallet("wallet3", Decimal("1"), "test1"))
+    assert repo.count_wallets_by_user("test1") == 2
+    repo.get_wallets_by_user("test1")
+    assert repo.count_wallets_by_user("test1") == 2
+
+    assert inner.count_wallets_by_user.call_count == 2
+
+
+def test_committed_transfer_updates_cache(db: SharedConnection, inner: Mock) -> None:
+    repo = CachedWalletRepository(inner, 10)
+    transactions = SqliteTransactionRepository(db, balance_listeners=[repo])
+    repo.get_wallets(["wallet1", "wallet2"])
+
+    assert transactions.transfer(
+        Transaction("wallet1", "wallet2", Decimal("1"), Decimal("4"))
+    )
+
+    assert repo.get_wallet("wallet1") == Wallet("wallet1", Decimal("5"), "test1")
+    assert repo.get_wallet("wallet2") == Wallet("wallet2", Decimal("24"), "test2")
+    assert inner.get_wallet.call_count == 0
+
+
+def test_read_racing_a_commit_is_not_cached(inner: Mock) -> None:
+    repo = CachedWalletRepository(inner, 10)
+    stale = Wallet("wallet1", Decimal("10"), "test1")
+
+    def read_then_commit(_: str) -> Wallet:
+        repo.balances_committed({"wallet1": Decimal("3")})
+        return stale
+
+    inner.get_wallet.side_effect = read_then_commit
+    assert repo.get_wallet("wallet1") == stale
+
+    inner.get_wallet.side_effect = None
+    assert repo.get_wallet("wallet1") == Wallet("wallet1", Decimal("10"), "test1")
+    assert inner.get_wallet.call_count == 2
+
+
+def test_write_through(inner: Mock) -> None:
+    repo = CachedWalletRepository(inner, 10)
+    repo.get_wallet("wallet1")
+
+    repo.update_wallet_balance_if_exists("wallet1", Decimal("7"))
+
+    inner.update_wallet_balances.assert_called_once_with({"wallet1": Decimal("7")})
+    assert repo.get_wallet("wallet1") == Wallet("wallet1", Decimal("7"), "test1")
+
+
+def test_balance_updates_mixed_with_transfers(
+    db: SharedConnection, inner: Mock
+) -> None:
+    repo = CachedWalletRepository(inner, 10)
+    transactions = SqliteTransactionRepository(db, balance_listeners=[repo])
+
+    repo.update_wallet_balance_if_exists("wallet1", Decimal("100"))
+    assert repo.get_wallet("wallet1") == Wallet("wallet1", Decimal("100"), "test1")
+    assert transactions.transfer(
+        Transaction("wallet1", "wallet2", Decimal("0"), Decimal("50"))
+    )
+    repo.update_wallet_balance_if_exists("wallet2", Decimal("1"))
+    assert transactions.transfer(
+        Transaction("wallet2", "wallet1", Decimal("0"), Decimal("0.5"))
+    )
+
+    assert repo.get_wallet("wallet1") == Wallet("wallet1", Decimal("50.5"), "test1")
+    assert repo.get_wallet("wallet2") == Wallet("wallet2", Decimal("0.5"), "test2")
+    fresh = SqliteWalletRepository(db)
+    assert fresh.get_wallets(["wallet1", "wallet2"]) == [
+        Wallet("wallet1", Decimal("50.5"), "test1"),
+        Wallet("wallet2", Decimal("0.5"), "test2"),
+    ]
+
+
+def test_eviction(inner: Mock) -> None:
+    repo = CachedWalletRepository(inner, 1)
+    repo.get_wallet("wallet1")
+    repo.get_wallet("wallet2")
+    repo.get_wallet("wallet1")
+
+    assert inner.get_wallet.call_count == 3
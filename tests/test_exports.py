@@ -0,0 +1,101 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.scenarios import FixedRateProvider
+from core.facade import AwesomeBitcoinService, ExecutorBitcoinService
+from core.interactors.admin_interactor import BitcoinServiceAdminInteractor
+from core.interactors.fee_provider import PercentageFeeProvider
+from core.interactors.tokens import HardCodedTokenValidator, RandomHexTokenProvider
+from core.interactors.transaction_interactor import BitcoinServiceTransactionInteractor
+from core.interactors.user_interactor import BitcoinServiceUserInteractor
+from core.interactors.wallet_interactor import BitcoinServiceWalletInteractor
+from core.models.transaction import Transaction
+from core.models.user import User
+from core.models.wallet import Wallet
+from infra.api.fastapi.exports import export_api
+from infra.persistence.sqlite.db_setup import (
+    SqliteConnectionPool,
+    SqliteSettings,
+    create_db,
+)
+from infra.persistence.sqlite.sqlite_transaction_repository import (
+    SqliteTransactionRepository,
+)
+from infra.persistence.sqlite.sqlite_user_repository import SqliteUserRepository
+from infra.persistence.sqlite.sqlite_wallet_repository import SqliteWalletRepository
+
+TRANSFERS = 7
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> Iterator[TestClient]:
+    # One reader shared by every export, each page borrows it only briefly
+    pool = SqliteConnectionPool(SqliteSettings(str(tmp_path / "test.db"), readers=1))
+    with pool.writer() as conn:
+        create_db(conn)
+    users = SqliteUserRepository(pool)
+    wallets = SqliteWalletRepository(pool)
+    transactions = SqliteTransactionRepository(pool, export_batch_size=2)
+    users.create_user(User("user1", "token1"))
+    for address in ["address1", "address2"]:
+        wallets.create_wallet(Wallet(address, Decimal(0), "token1"))
+    for amount in range(1, TRANSFERS + 1):
+        transactions.add_transaction(
+            Transaction("address1", "address2", Decimal(0), Decimal(amount))
+        )
+
+    fee_provider = PercentageFeeProvider(Decimal(0))
+    token_provider = RandomHexTokenProvider(8)
+    service = AwesomeBitcoinService(
+        BitcoinServiceUserInteractor(users, token_provider),
+        BitcoinServiceWalletInteractor(
+            token_provider, users, wallets, FixedRateProvider(), Decimal(1), 3
+        ),
+        BitcoinServiceTransactionInteractor(users, wallets, transactions, fee_provider),
+        BitcoinServiceAdminInteractor(HardCodedTokenValidator("admin"), transactions),
+    )
+    app = FastAPI()
+    app.include_router(export_api)
+    core = ExecutorBitcoinService(service, max_workers=4)
+    app.state.core = core
+
+    yield TestClient(app)
+    core.shutdown()
+    pool.close()
+
+
+def export(client: TestClient, **params: str) -> list[dict[str, Any]]:
+    response = client.get(
+        "/admin/transactions/export", params={"token": "admin", **params}
+    )
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_streams_every_page(client: TestClient) -> None:
+    exported = export(client)
+
+    assert [row["amount"] for row in exported] == [
+        str(Decimal(amount)) for amount in range(1, TRANSFERS + 1)
+    ]
+    assert [row["id"] for row in exported] == sorted(row["id"] for row in exported)
+
+
+def test_concurrent_exports_share_one_reader(client: TestClient) -> None:
+    with ThreadPoolExecutor(4) as executor:
+        exports = list(executor.map(lambda _: export(client), range(4)))
+
+    assert all(len(rows) == TRANSFERS for rows in exports)
+
+
+def test_export_rejects_non_admin(client: TestClient) -> None:
+    response = client.get("/admin/transactions/export", params={"token": "token1"})
+
+    assert response.status_code == 403
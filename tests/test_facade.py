@@ -0,0 +1,85 @@
+import asyncio
+import contextvars
+import threading
+import time
+import unittest.mock
+from decimal import Decimal
+
+from core.facade import BitcoinService, ExecutorBitcoinService
+from core.interactors.admin_interactor import AdminResponse, AdminStatus
+from core.interactors.user_interactor import UserResponse, UserStatus
+
+request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id")
+
+
+def get_service() -> BitcoinService:
+    service = unittest.mock.Mock()
+    service.register_user.return_value = UserResponse(UserStatus.SUCCESS, "token")
+    return service
+
+
+def test_executor_service_delegates() -> None:
+    service = get_service()
+    core = ExecutorBitcoinService(service, max_workers=2)
+
+    response = asyncio.run(core.register_user("user"))
+
+    assert response == UserResponse(UserStatus.SUCCESS, "token")
+    service.register_user.assert_called_once_with("user")  # type: ignore
+    core.shutdown()
+
+
+def test_executor_service_runs_off_the_event_loop() -> None:
+    service = get_service()
+    threads: list[str | None] = []
+
+    def get_statistics(_: str) -> AdminResponse:
+        threads.append(request_id.get(None))
+        time.sleep(0.2)
+        assert threading.current_thread() is not threading.main_thread()
+        return AdminResponse(AdminStatus.UNAUTHORIZED, None)
+
+    service.__setattr__("get_statistics", get_statistics)
+    core = ExecutorBitcoinService(service, max_workers=4)
+
+    async def run() -> float:
+        request_id.set("request")
+        start = time.monotonic()
+        await asyncio.gather(*(core.get_statistics("token") for _ in range(4)))
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+
+    assert elapsed < 0.6
+    assert threads == ["request"] * 4
+    core.shutdown()
+
+
+def test_transfers_run_on_their_own_executor() -> None:
+    service = get_service()
+    release = threading.Event()
+
+    def perform_transaction(*_: object) -> None:
+        release.wait(5)
+
+    service.__setattr__("perform_transaction", perform_transaction)
+    service.__setattr__(
+        "get_statistics", lambda _: AdminResponse(AdminStatus.UNAUTHORIZED, None)
+    )
+    core = ExecutorBitcoinService(service, max_workers=1, transfer_workers=4)
+
+    async def run() -> AdminResponse:
+        transfers = [
+            asyncio.ensure_future(
+                core.perform_transaction("token", "a", "b", Decimal(1))
+            )
+            for _ in range(4)
+        ]
+        # Blocked transfers must leave the service pool free for reads
+        response = await asyncio.wait_for(core.get_statistics("token"), 2)
+        release.set()
+        await asyncio.gather(*transfers)
+        return response
+
+    assert asyncio.run(run()) == AdminResponse(AdminStatus.UNAUTHORIZED, None)
+    core.shutdown()
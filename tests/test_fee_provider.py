@@ -1,8 +1,17 @@
+import json
+import os
 from decimal import Decimal
+from pathlib import Path
+from typing import Any
 
 import pytest
 
-from core.interactors.fee_provider import PercentageFeeProvider
+from core.interactors.fee_provider import (
+    PercentageFeeProvider,
+    ScheduleFeeProvider,
+    compile_fee_schedule,
+)
+from core.models.bitcoin import to_satoshis
 
 
 @pytest.fixture
@@ -20,3 +29,119 @@ def test_provide_fee_zero(fee_provider: PercentageFeeProvider) -> None:
     amount = Decimal("0")
 
     assert fee_provider.provide(amount) == Decimal("0")
+
+
+def test_provide_fee_rounds_to_satoshis() -> None:
+    fee_provider = PercentageFeeProvider(Decimal("0.015"))
+
+    assert fee_provider.provide(Decimal("0.00000033")) == Decimal("0.00000000")
+    assert fee_provider.provide(Decimal("0.00000034")) == Decimal("0.00000001")
+
+
+SCHEDULE = {
+    "tiers": [
+        {"from": "0", "rate": "0.02"},
+        {"from": "1", "rate": "0.01", "fixed": "0.001"},
+        {"from": "10", "rate": "0.005"},
+    ],
+    "minimum": "0.00001",
+    "maximum": "0.5",
+    "users": {
+        "vip": {"tiers": [{"from": "0", "rate": "0"}], "minimum": "0"},
+        "capped": {"maximum": "0.01"},
+    },
+}
+
+
+@pytest.fixture
+def schedule_path(tmp_path: Path) -> Path:
+    path = tmp_path / "fees.json"
+    path.write_text(json.dumps(SCHEDULE))
+    return path
+
+
+@pytest.mark.parametrize(
+    "amount, fee",
+    [
+        ("0.5", "0.01"),
+        ("0.99999999", "0.02"),
+        ("1", "0.011"),
+        ("9", "0.091"),
+        ("10", "0.05"),
+        ("0.0001", "0.00001"),
+        ("200", "0.5"),
+    ],
+)
+def test_schedule_tiers_minimum_and_maximum(amount: str, fee: str) -> None:
+    schedule = compile_fee_schedule(SCHEDULE)
+
+    assert schedule.default.fee(to_satoshis(Decimal(amount))) == to_satoshis(
+        Decimal(fee)
+    )
+
+
+def test_user_overrides_inherit_default() -> None:
+    schedule = compile_fee_schedule(SCHEDULE)
+
+    assert schedule.table("vip").fee(to_satoshis(Decimal(5))) == 0
+    assert schedule.table("capped").fee(to_satoshis(Decimal(5))) == to_satoshis(
+        Decimal("0.01")
+    )
+    assert schedule.table("capped").fee(to_satoshis(Decimal("0.0001"))) == 1000
+    assert schedule.table("unknown") is schedule.default
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        {},
+        {"tiers": []},
+        {"tiers": [{"from": "1", "rate": "0.01"}]},
+        {"tiers": [{"from": "0", "rate": "0.01"}, {"from": "0", "rate": "0.02"}]},
+        {"tiers": [{"from": "0", "rate": "0.01"}], "minimum": "2", "maximum": "1"},
+    ],
+)
+def test_invalid_schedule_rejected(document: dict[str, Any]) -> None:
+    with pytest.raises(ValueError):
+        compile_fee_schedule(document)
+
+
+def test_schedule_provider_matches_percentage_rounding(tmp_path: Path) -> None:
+    path = tmp_path / "fees.json"
+    path.write_text(json.dumps({"tiers": [{"from": "0", "rate": 0.015}]}))
+    schedule = ScheduleFeeProvider(str(path))
+    percentage = PercentageFeeProvider(Decimal("0.015"))
+    amounts = [Decimal(f"0.000000{value}") for value in range(10, 100)]
+
+    assert schedule.provide_many(amounts) == percentage.provide_many(amounts)
+
+
+def test_schedule_provider_per_user(schedule_path: Path) -> None:
+    provider = ScheduleFeeProvider(str(schedule_path))
+
+    assert provider.provide(Decimal(5), "vip") == Decimal(0)
+    assert provider.provide_many([Decimal(5), Decimal(20)], "user") == [
+        Decimal("0.051"),
+        Decimal("0.1"),
+    ]
+
+
+def test_schedule_reloaded_after_change(schedule_path: Path) -> None:
+    now = [0.0]
+    provider = ScheduleFeeProvider(str(schedule_path), 1, clock=lambda: now[0])
+    schedule_path.write_text(json.dumps({"tiers": [{"from": "0", "rate": "0.1"}]}))
+    os.utime(schedule_path, ns=(0, 1))
+
+    assert provider.provide(Decimal(20)) == Decimal("0.1")
+    now[0] = 1
+    assert provider.provide(Decimal(20)) == Decimal(2)
+
+
+def test_broken_schedule_keeps_previous(schedule_path: Path) -> None:
+    now = [0.0]
+    provider = ScheduleFeeProvider(str(schedule_path), 1, clock=lambda: now[0])
+    schedule_path.write_text("{")
+    os.utime(schedule_path, ns=(0, 1))
+    now[0] = 1
+
+    assert provider.provide(Decimal(20)) == Decimal("0.1")
@@ -0,0 +1,260 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Iterator
+from unittest.mock import Mock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.models.idempotency import IdempotencyKey
+from core.models.transaction import Transaction
+from core.models.user import User
+from core.models.wallet import Wallet
+from infra.api.fastapi.metrics import RequestMetricsMiddleware, metrics_api
+from infra.api.fastapi.sql_profile import SqlProfileMiddleware
+from infra.metrics.registry import MetricsRegistry
+from infra.metrics.statements import StatementCounter
+from infra.persistence.sqlite.db_setup import (
+    SqliteConnectionPool,
+    SqliteSettings,
+    create_db,
+)
+from infra.persistence.sqlite.group_commit import (
+    GroupCommitTransactionRepository,
+    PendingTransfer,
+)
+from infra.persistence.sqlite.profiler import ProfilingConnection
+from infra.persistence.sqlite.sqlite_transaction_repository import (
+    SqliteTransactionRepository,
+)
+from infra.persistence.sqlite.sqlite_user_repository import SqliteUserRepository
+from infra.persistence.sqlite.sqlite_wallet_repository import SqliteWalletRepository
+
+AMOUNT = Decimal("0.01")
+
+
+def transaction(amount: int) -> Transaction:
+    return Transaction("address1", "address2", Decimal(0), Decimal(amount))
+
+
+@pytest.fixture
+def inner() -> Mock:
+    inner = Mock()
+    inner.transfer_many.side_effect = lambda transactions, atomic, idempotency_keys: [
+        transaction.amount > 0 for transaction in transactions
+    ]
+    return inner
+
+
+@pytest.fixture
+def repo(inner: Mock) -> Iterator[GroupCommitTransactionRepository]:
+    repo = GroupCommitTransactionRepository(inner, max_batch_size=4, max_wait_us=0)
+    repo.start()
+    yield repo
+    repo.stop()
+
+
+def test_transfer_without_writer_runs_directly(inner: Mock) -> None:
+    inner.transfer.return_value = True
+    repo = GroupCommitTransactionRepository(inner)
+
+    assert repo.transfer(transaction(1))
+    inner.transfer_many.assert_not_called()
+
+
+def test_queued_transfers_share_a_commit(
+    repo: GroupCommitTransactionRepository, inner: Mock
+) -> None:
+    release = threading.Event()
+    committing = threading.Event()
+    first_batch: Callable[..., list[bool]] = inner.transfer_many.side_effect
+
+    def blocking(*args: Any, **kwargs: Any) -> list[bool]:
+        committing.set()
+        release.wait(5)
+        return first_batch(*args, **kwargs)
+
+    inner.transfer_many.side_effect = blocking
+    with ThreadPoolExecutor(8) as executor:
+        first = executor.submit(repo.transfer, transaction(1))
+        committing.wait(5)
+        inner.transfer_many.side_effect = first_batch
+        # Queued behind the first commit, then taken in batches of four
+        rest = [executor.submit(repo.transfer, transaction(1)) for _ in range(6)]
+        while repo._queue.qsize() < 6:
+            time.sleep(0.001)
+        release.set()
+
+        assert first.result() and all(future.result() for future in rest)
+
+    sizes = [len(call.args[0]) for call in inner.transfer_many.call_args_list]
+    assert sizes == [1, 4, 2]
+    assert all(
+        call.kwargs["atomic"] is False for call in inner.transfer_many.call_args_list
+    )
+
+
+def test_each_caller_gets_its_own_result(
+    repo: GroupCommitTransactionRepository,
+) -> None:
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(repo.transfer, map(transaction, [1, 0, 2, 0])))
+
+    assert results == [True, False, True, False]
+
+
+def test_idempotency_keys_follow_their_transfers(
+    repo: GroupCommitTransactionRepository, inner: Mock
+) -> None:
+    key = IdempotencyKey("token1", "key", "hash")
+    batch = [
+        PendingTransfer(transaction(1), Future(), key),
+        PendingTransfer(transaction(1), Future()),
+    ]
+
+    repo._commit(batch)
+
+    assert inner.transfer_many.call_args.kwargs["idempotency_keys"] == [key, None]
+
+
+def test_failed_batch_retried_one_by_one(
+    repo: GroupCommitTransactionRepository, inner: Mock
+) -> None:
+    inner.transfer_many.side_effect = ValueError
+    inner.transfer.side_effect = [ValueError, True]
+    batch = [PendingTransfer(transaction(1), Future()) for _ in range(2)]
+
+    repo._commit(batch)
+
+    assert isinstance(batch[0].result.exception(), ValueError)
+    assert batch[1].result.result()
+
+
+def test_single_transfer_failure_reaches_caller(
+    repo: GroupCommitTransactionRepository, inner: Mock
+) -> None:
+    inner.transfer_many.side_effect = ValueError
+
+    with pytest.raises(ValueError):
+        repo.transfer(transaction(1))
+
+
+def test_stop_falls_back_to_direct_transfer(
+    repo: GroupCommitTransactionRepository, inner: Mock
+) -> None:
+    repo.stop()
+    inner.transfer.return_value = True
+
+    assert repo.transfer(transaction(1))
+    inner.transfer_many.assert_not_called()
+
+
+def seeded_pool(tmp_path: Path, **options: Any) -> SqliteConnectionPool:
+    pool = SqliteConnectionPool(
+        SqliteSettings(str(tmp_path / "test.db"), synchronous="FULL", writers=1),
+        **options,
+    )
+    with pool.writer() as conn:
+        create_db(conn)
+        conn.commit()
+    SqliteUserRepository(pool).create_user(User("user1", "token1"))
+    wallets = SqliteWalletRepository(pool)
+    wallets.create_wallet(Wallet("address1", Decimal(1), "token1"))
+    wallets.create_wallet(Wallet("address2", Decimal(0), "token1"))
+    return pool
+
+
+def test_concurrent_transfers_committed_in_batches(tmp_path: Path) -> None:
+    pool = seeded_pool(tmp_path)
+    wallets = SqliteWalletRepository(pool)
+    sqlite = SqliteTransactionRepository(pool)
+    inner = Mock(wraps=sqlite)
+    repo = GroupCommitTransactionRepository(inner, max_wait_us=1000)
+    repo.start()
+    try:
+        with ThreadPoolExecutor(16) as executor:
+            results = list(
+                executor.map(
+                    repo.transfer,
+                    [
+                        Transaction("address1", "address2", Decimal(0), AMOUNT)
+                        for _ in range(150)
+                    ],
+                )
+            )
+    finally:
+        repo.stop()
+
+    assert results.count(True) == 100
+    assert inner.transfer_many.call_count < 150
+    wallet = wallets.get_wallet("address2")
+    assert wallet is not None and wallet.balance == Decimal(1)
+    assert sqlite.get_statistics().transaction_count == 100
+
+
+def test_listener_failure_after_commit_not_retried(tmp_path: Path) -> None:
+    pool = seeded_pool(tmp_path)
+    sqlite = SqliteTransactionRepository(pool)
+    listener = Mock()
+    listener.balances_committed.side_effect = RuntimeError
+    sqlite.balance_listeners.append(listener)
+    inner = Mock(wraps=sqlite)
+    repo = GroupCommitTransactionRepository(inner)
+    batch = [
+        PendingTransfer(
+            Transaction("address1", "address2", Decimal(0), AMOUNT), Future()
+        )
+        for _ in range(2)
+    ]
+
+    repo._commit(batch)
+
+    assert [pending.result.result() for pending in batch] == [True, True]
+    inner.transfer.assert_not_called()
+    listener.balances_committed.assert_called_once()
+    wallet = SqliteWalletRepository(pool).get_wallet("address2")
+    assert wallet is not None and wallet.balance == 2 * AMOUNT
+
+
+def test_batched_statements_charged_to_each_request(tmp_path: Path) -> None:
+    registry = MetricsRegistry()
+    statements = StatementCounter(registry)
+    pool = seeded_pool(
+        tmp_path, on_connect=statements.attach, factory=ProfilingConnection
+    )
+    repo = GroupCommitTransactionRepository(SqliteTransactionRepository(pool))
+
+    app = FastAPI()
+    app.include_router(metrics_api)
+    app.add_middleware(SqlProfileMiddleware)
+    app.add_middleware(
+        RequestMetricsMiddleware, registry=registry, statements=statements
+    )
+    app.state.metrics = registry
+
+    @app.post("/transfers")
+    def transfer() -> bool:
+        return repo.transfer(Transaction("address1", "address2", Decimal(0), AMOUNT))
+
+    repo.start()
+    try:
+        client = TestClient(app)
+        response = client.post("/transfers", headers={"X-SQL-Profile": "1"})
+    finally:
+        repo.stop()
+
+    assert response.json() is True
+    assert int(response.headers["x-sql-statements"]) > 0
+    charged = [
+        line
+        for line in client.get("/metrics").text.splitlines()
+        if line.startswith(
+            'bitcoin_http_request_db_statements_sum{method="POST",route="/transfers"}'
+        )
+    ]
+    # The trace callback also sees the transaction control the profiler skips
+    assert len(charged) == 1 and float(charged[0].split()[-1]) > 0
@@ -0,0 +1,39 @@
+from dataclasses import dataclass
+
+import pytest
+
+from infra.metrics.instrumented import instrument
+from infra.metrics.registry import MetricsRegistry
+
+
+@dataclass
+class Adder:
+    offset: int
+
+    def add(self, value: int) -> int:
+        if value < 0:
+            raise ValueError("negative")
+        return value + self.offset
+
+
+def test_calls_are_timed() -> None:
+    registry = MetricsRegistry()
+    adder = instrument(Adder(1), "repository", registry)
+
+    assert adder.add(1) == 2
+    assert adder.add(2) == 3
+    assert adder.offset == 1
+
+    durations = registry.histogram("bitcoin_call_duration_seconds", "")
+    assert durations.count("repository", "Adder", "add") == 2
+
+
+def test_errors_are_counted() -> None:
+    registry = MetricsRegistry()
+    adder = instrument(Adder(1), "repository", registry, "adder")
+
+    with pytest.raises(ValueError):
+        adder.add(-1)
+
+    errors = registry.counter("bitcoin_call_errors_total", "")
+    assert errors.value("repository", "adder", "add") == 1
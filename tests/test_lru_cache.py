@@ -0,0 +1,38 @@
+from infra.persistence.cache.lru import LruCache
+
+
+def test_evicts_least_recently_used() -> None:
+    cache: LruCache[str, int] = LruCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    cache.put("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_pop_and_clear() -> None:
+    cache: LruCache[str, int] = LruCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    assert cache.pop("a") == 1
+    assert cache.pop("a") is None
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_entries_expire() -> None:
+    now = [0.0]
+    cache: LruCache[str, int] = LruCache(2, ttl_seconds=10, clock=lambda: now[0])
+    cache.put("a", 1)
+
+    now[0] = 9.9
+    assert cache.get("a") == 1
+    now[0] = 10
+    assert cache.get("a") is None
+    assert len(cache) == 0
@@ -0,0 +1,46 @@
+import sqlite3
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from infra.api.fastapi.metrics import RequestMetricsMiddleware, metrics_api
+from infra.metrics.registry import MetricsRegistry
+from infra.metrics.statements import StatementCounter
+
+
+def test_statements_counted_per_request() -> None:
+    registry = MetricsRegistry()
+    statements = StatementCounter(registry)
+    con = sqlite3.connect(":memory:", check_same_thread=False)
+    statements.attach(con)
+
+    app = FastAPI()
+    app.include_router(metrics_api)
+    app.add_middleware(
+        RequestMetricsMiddleware, registry=registry, statements=statements
+    )
+    app.state.metrics = registry
+
+    @app.get("/items/{item}")
+    def get_item(item: str) -> str:
+        con.execute("SELECT 1")
+        con.execute("SELECT 2")
+        return item
+
+    client = TestClient(app)
+    assert client.get("/items/a").status_code == 200
+    assert client.get("/items/b").status_code == 200
+    con.execute("SELECT 3")
+    response = client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain")
+    lines = response.text.splitlines()
+    assert "bitcoin_db_statements_total 5" in lines
+    assert (
+        'bitcoin_http_request_db_statements_sum{method="GET",route="/items/{item}"} 4'
+        in lines
+    )
+    assert (
+        "bitcoin_http_request_duration_seconds_count"
+        '{method="GET",route="/items/{item}",status="200"} 2'
+    ) in lines
@@ -0,0 +1,45 @@
+from infra.metrics.registry import MetricsRegistry
+
+
+def test_counter() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests", ("path",))
+    counter.inc("/a")
+    counter.inc("/a", amount=2)
+    counter.inc('/"b"')
+
+    assert registry.counter("requests_total", "Requests", ("path",)) is counter
+    assert counter.value("/a") == 3
+    assert registry.render() == (
+        "# HELP requests_total Requests\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{path="/\\"b\\""} 1\n'
+        'requests_total{path="/a"} 3\n'
+    )
+
+
+def test_histogram() -> None:
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    histogram.observe(0.05)
+    histogram.observe(0.1)
+    histogram.observe(0.5)
+    histogram.observe(3)
+
+    assert histogram.count() == 4
+    assert registry.render() == (
+        "# HELP latency_seconds Latency\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{le="0.1"} 2\n'
+        'latency_seconds_bucket{le="1"} 3\n'
+        'latency_seconds_bucket{le="+Inf"} 4\n'
+        "latency_seconds_sum 3.65\n"
+        "latency_seconds_count 4\n"
+    )
+
+
+def test_callback() -> None:
+    registry = MetricsRegistry()
+    registry.callback("cache_hits_total", "Hits", "counter", lambda: 7)
+
+    assert registry.render().splitlines()[-1] == "cache_hits_total 7"
@@ -0,0 +1,61 @@
+from collections import Counter
+from decimal import Decimal
+
+from core.models.statistics import MinuteStatistics, Statistics
+from infra.persistence.postgres.migrations import (
+    MIGRATIONS,
+    SCHEMA_VERSION,
+    STATISTICS_SHARDS,
+    migrate,
+    schema_version,
+)
+from infra.persistence.postgres.postgres_transaction_repository import (
+    PostgresTransactionRepository,
+)
+from tests.postgres import postgres_pool
+
+
+def test_fresh_database() -> None:
+    with postgres_pool() as pool:
+        with pool.writer() as conn:
+            assert schema_version(conn) == SCHEMA_VERSION
+            assert migrate(conn) == (SCHEMA_VERSION, SCHEMA_VERSION)
+
+            conn.execute("DROP SCHEMA public CASCADE")
+            conn.execute("CREATE SCHEMA public")
+            conn.commit()
+            assert migrate(conn) == (0, SCHEMA_VERSION)
+            assert schema_version(conn) == SCHEMA_VERSION
+
+
+def test_statistics_sharded_with_their_totals() -> None:
+    with postgres_pool() as pool:
+        with pool.writer() as conn:
+            conn.execute("DROP SCHEMA public CASCADE")
+            conn.execute("CREATE SCHEMA public")
+            for migration in MIGRATIONS[:-1]:
+                migration(conn)
+            conn.execute(
+                "CREATE TABLE schema_version (version INTEGER NOT NULL);"
+                f"INSERT INTO schema_version (version) VALUES ({SCHEMA_VERSION - 1});"
+                "UPDATE statistics SET profit = 3, transaction_count = 2;"
+                "INSERT INTO daily_statistics VALUES ('1970-01-01', 3, 2);"
+                "INSERT INTO minute_statistics VALUES (10, 200000000, 3, 2);"
+                "INSERT INTO minute_transfer_sizes VALUES (10, 5, 2)"
+            )
+            conn.commit()
+
+            assert migrate(conn) == (SCHEMA_VERSION - 1, SCHEMA_VERSION)
+
+        repo = PostgresTransactionRepository(pool)
+        assert repo.get_statistics() == Statistics(Decimal("0.00000003"), 2)
+        assert repo.get_daily_statistics() == {
+            "1970-01-01": Statistics(Decimal("0.00000003"), 2)
+        }
+        assert repo.get_minute_statistics(10, 10) == [
+            MinuteStatistics(10, Decimal(2), Decimal("0.00000003"), 2, Counter({5: 2}))
+        ]
+        with pool.reader() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM statistics").fetchone() == (
+                STATISTICS_SHARDS,
+            )
@@ -1,8 +1,18 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator
 
 import pytest
 
-from core.interactors.rate_provider import GeckoRateProvider
+from core.interactors.rate_provider import (
+    CachingRateProvider,
+    GeckoRateProvider,
+    RateCacheStats,
+)
 
 
 @pytest.fixture
@@ -28,3 +38,142 @@ def vcr_config() -> dict[str, str]:
 @pytest.mark.vcr()
 def test_rate(provider: GeckoRateProvider) -> None:
     assert provider.fetch() == Decimal("22882.95047526271446258760988712310791015625")
+
+
+class StubRateHandler(BaseHTTPRequestHandler):
+    server: "StubRateServer"
+
+    def do_GET(self) -> None:
+        self.server.request_count += 1
+        time.sleep(self.server.delay_seconds)
+
+        if self.server.rate is None:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        body = json.dumps({"bitcoin": {"usd": self.server.rate}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_: Any) -> None:
+        pass
+
+
+class StubRateServer(ThreadingHTTPServer):
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StubRateHandler)
+        self.rate: str | None = "20000.5"
+        self.delay_seconds = 0.0
+        self.request_count = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/price"
+
+
+@pytest.fixture
+def stub_server() -> Iterator[StubRateServer]:
+    server = StubRateServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_caching_provider_serves_fresh_rate_from_cache(
+    stub_server: StubRateServer,
+) -> None:
+    provider = CachingRateProvider(GeckoRateProvider(stub_server.url), 60, 300)
+
+    assert provider.fetch() == Decimal("20000.5")
+    assert provider.fetch() == Decimal("20000.5")
+    assert stub_server.request_count == 1
+    assert provider.stats == RateCacheStats(hits=1, misses=1)
+
+
+def test_caching_provider_serves_stale_rate_within_bound(
+    stub_server: StubRateServer,
+) -> None:
+    clock = FakeClock()
+    provider = CachingRateProvider(GeckoRateProvider(stub_server.url), 60, 300, clock)
+    provider.fetch()
+    stub_server.rate = None
+
+    clock.now += 120
+
+    assert provider.fetch() == Decimal("20000.5")
+    assert stub_server.request_count == 1
+    assert provider.stats.stale == 1
+
+
+def test_caching_provider_refuses_rate_past_staleness_bound(
+    stub_server: StubRateServer,
+) -> None:
+    clock = FakeClock()
+    provider = CachingRateProvider(GeckoRateProvider(stub_server.url), 60, 300, clock)
+    provider.fetch()
+    stub_server.rate = None
+
+    clock.now += 301
+
+    assert provider.fetch() is None
+    assert provider.stats.failures == 1
+
+
+def test_caching_provider_coalesces_concurrent_misses(
+    stub_server: StubRateServer,
+) -> None:
+    stub_server.delay_seconds = 0.2
+    provider = CachingRateProvider(GeckoRateProvider(stub_server.url), 60, 300)
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        rates = list(executor.map(lambda _: provider.fetch(), range(10)))
+
+    assert rates == [Decimal("20000.5")] * 10
+    assert stub_server.request_count == 1
+    assert provider.stats.misses == 10
+
+
+def test_caching_provider_coalesces_concurrent_misses_during_outage(
+    stub_server: StubRateServer,
+) -> None:
+    stub_server.rate = None
+    stub_server.delay_seconds = 0.2
+    provider = CachingRateProvider(GeckoRateProvider(stub_server.url), 60, 300)
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        rates = list(executor.map(lambda _: provider.fetch(), range(10)))
+
+    assert rates == [None] * 10
+    assert stub_server.request_count == 1
+    assert provider.stats.failures == 1
+
+
+def test_caching_provider_refreshes_in_background(
+    stub_server: StubRateServer,
+) -> None:
+    provider = CachingRateProvider(GeckoRateProvider(stub_server.url), 0.05, 300)
+    provider.start()
+    try:
+        deadline = time.monotonic() + 5
+        while stub_server.request_count < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert provider.fetch() == Decimal("20000.5")
+    finally:
+        provider.stop()
+
+    assert stub_server.request_count >= 3
+    assert provider.stats.misses == 0
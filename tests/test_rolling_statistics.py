@@ -0,0 +1,159 @@
+from collections import Counter
+from decimal import Decimal
+
+import pytest
+
+from core.interactors.rolling_statistics import (
+    OPEN_MINUTES,
+    RollingStatistics,
+    percentile,
+)
+from core.models.statistics import (
+    MinuteStatistics,
+    WindowStatistics,
+    bucket_size,
+    size_bucket,
+)
+
+ONE_BITCOIN = 100_000_000
+
+
+class MinuteStore:
+    def __init__(self) -> None:
+        self.minutes: dict[int, MinuteStatistics] = {}
+        self.reads: list[tuple[int, int]] = []
+
+    def record(self, minute: int, amount: int, fee: int = 0) -> None:
+        statistics = self.minutes.setdefault(minute, MinuteStatistics(minute))
+        statistics.volume += Decimal(amount) / ONE_BITCOIN
+        statistics.profit += Decimal(fee) / ONE_BITCOIN
+        statistics.transaction_count += 1
+        statistics.sizes[size_bucket(amount)] += 1
+
+    def get_minute_statistics(
+        self, since_minute: int, until_minute: int
+    ) -> list[MinuteStatistics]:
+        self.reads.append((since_minute, until_minute))
+        return [
+            MinuteStatistics(
+                minute.minute,
+                minute.volume,
+                minute.profit,
+                minute.transaction_count,
+                Counter(minute.sizes),
+            )
+            for index, minute in sorted(self.minutes.items())
+            if since_minute <= index <= until_minute
+        ]
+
+
+class Clock:
+    def __init__(self, minute: int) -> None:
+        self.minute = minute
+
+    def __call__(self) -> float:
+        return self.minute * 60 + 30
+
+
+def rolling(store: MinuteStore, clock: Clock) -> RollingStatistics:
+    return RollingStatistics(store, retention_minutes=100, clock=clock)  # type: ignore
+
+
+def test_window_sums_closed_and_open_minutes() -> None:
+    store = MinuteStore()
+    for minute in [140, 141, 148, 150]:
+        store.record(minute, ONE_BITCOIN, 10)
+
+    statistics = rolling(store, Clock(150)).window(10)
+
+    # Minute 141 is the first of the ten ending now, 140 is already outside
+    assert statistics.volume == Decimal(3)
+    assert statistics.profit == Decimal("0.0000003")
+    assert statistics.transaction_count == 3
+
+
+def test_closed_minutes_read_once() -> None:
+    store = MinuteStore()
+    clock = Clock(150)
+    statistics = rolling(store, clock)
+    statistics.window(10)
+    store.reads.clear()
+
+    clock.minute = 153
+    statistics.window(10)
+
+    closed_until = 153 - OPEN_MINUTES
+    assert store.reads == [(149, closed_until), (closed_until + 1, 153)]
+
+
+def test_window_slides_as_minutes_pass() -> None:
+    store = MinuteStore()
+    clock = Clock(200)
+    statistics = rolling(store, clock)
+    for minute in range(150, 200):
+        store.record(minute, ONE_BITCOIN)
+
+    assert statistics.window(60).transaction_count == 50
+    for minute in range(201, 230):
+        clock.minute = minute
+        store.record(minute - 1, 2 * ONE_BITCOIN)
+        expected = [
+            stored
+            for index, stored in store.minutes.items()
+            if minute - 60 < index <= minute
+        ]
+
+        window = statistics.window(60)
+        assert window.volume == sum(stored.volume for stored in expected)
+        assert window.transaction_count == sum(
+            stored.transaction_count for stored in expected
+        )
+
+
+def test_window_rebuilt_after_long_idle() -> None:
+    store = MinuteStore()
+    clock = Clock(200)
+    statistics = rolling(store, clock)
+    store.record(190, ONE_BITCOIN)
+    assert statistics.window(100).transaction_count == 1
+
+    store.record(500, ONE_BITCOIN)
+    clock.minute = 510
+
+    assert statistics.window(100).transaction_count == 1
+
+
+def test_percentiles_from_transfer_sizes() -> None:
+    store = MinuteStore()
+    for index in range(100):
+        store.record(140 + index % 8, ONE_BITCOIN if index < 98 else 100 * ONE_BITCOIN)
+
+    statistics = rolling(store, Clock(150)).window(60)
+
+    assert statistics.p50_amount == Decimal(bucket_size(size_bucket(ONE_BITCOIN))) / (
+        ONE_BITCOIN
+    )
+    assert statistics.p99_amount is not None
+    assert abs(statistics.p99_amount - 100) / 100 < Decimal("0.1")
+
+
+def test_empty_window_has_no_percentiles() -> None:
+    statistics = rolling(MinuteStore(), Clock(150)).window(60)
+
+    assert statistics == WindowStatistics()
+
+
+def test_percentile_rank() -> None:
+    sizes = Counter({size_bucket(1000): 1, size_bucket(100_000): 1})
+
+    assert percentile(sizes, 0.5) == Decimal(bucket_size(size_bucket(1000))) / (
+        ONE_BITCOIN
+    )
+    assert percentile(sizes, 0.99) == Decimal(bucket_size(size_bucket(100_000))) / (
+        ONE_BITCOIN
+    )
+
+
+def test_window_longer_than_retention_rejected() -> None:
+    with pytest.raises(ValueError):
+        rolling(MinuteStore(), Clock(150)).window(101)
@@ -0,0 +1,39 @@
+import sqlite3
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from infra.api.fastapi.sql_profile import SqlProfileMiddleware
+from infra.persistence.sqlite.profiler import ProfilingConnection
+
+
+def get_client(profile_all: bool) -> TestClient:
+    con = sqlite3.connect(
+        ":memory:", factory=ProfilingConnection, check_same_thread=False
+    )
+    app = FastAPI()
+    app.add_middleware(SqlProfileMiddleware, profile_all=profile_all)
+
+    @app.get("/items")
+    def get_items() -> int:
+        for value in range(3):
+            con.execute("SELECT ?", [value]).fetchone()
+        return 3
+
+    return TestClient(app)
+
+
+def test_profile_on_request() -> None:
+    client = get_client(profile_all=False)
+
+    assert "x-sql-statements" not in client.get("/items").headers
+
+    response = client.get("/items", headers={"X-SQL-Profile": "1"})
+    assert response.headers["x-sql-statements"] == "3"
+    assert response.headers["x-sql-repeated"] == "2"
+
+
+def test_profile_all_requests() -> None:
+    client = get_client(profile_all=True)
+
+    assert client.get("/items").headers["x-sql-statements"] == "3"
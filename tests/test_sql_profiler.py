@@ -0,0 +1,53 @@
+import sqlite3
+
+import pytest
+
+from infra.persistence.sqlite.profiler import ProfilingConnection, profiling
+
+
+@pytest.fixture
+def con() -> sqlite3.Connection:
+    con = sqlite3.connect(
+        ":memory:", factory=ProfilingConnection, check_same_thread=False
+    )
+    con.execute("CREATE TABLE items (value INTEGER)")
+    con.executemany("INSERT INTO items VALUES (?)", [(i,) for i in range(10)])
+    return con
+
+
+def test_records_statements_and_rows(con: sqlite3.Connection) -> None:
+    with profiling() as profile:
+        con.execute("SELECT value FROM items WHERE value < ?", [3]).fetchall()
+        cursor = con.cursor()
+        cursor.execute("SELECT value FROM items")
+        cursor.fetchmany(4)
+        assert len(list(con.execute("SELECT value FROM items WHERE value > 7"))) == 2
+        con.execute("UPDATE items SET value = value + 1 WHERE value > 4")
+
+    assert [(s.sql, s.rows) for s in profile.statements] == [
+        ("SELECT value FROM items WHERE value < ?", 3),
+        ("SELECT value FROM items", 4),
+        ("SELECT value FROM items WHERE value > 7", 2),
+        ("UPDATE items SET value = value + 1 WHERE value > 4", 5),
+    ]
+    assert all(s.duration_seconds > 0 for s in profile.statements)
+    assert profile.repeated() == {}
+
+
+def test_flags_repeated_statements(con: sqlite3.Connection) -> None:
+    with profiling() as profile:
+        for value in range(3):
+            con.execute("SELECT value FROM items WHERE value = ?", [value]).fetchone()
+        con.execute("SELECT COUNT(*) FROM items").fetchone()
+
+    assert profile.repeated() == {"SELECT value FROM items WHERE value = ?": 3}
+    assert profile.report()["statements"] == 4
+
+
+def test_nothing_recorded_outside_profiling(con: sqlite3.Connection) -> None:
+    con.execute("SELECT value FROM items").fetchall()
+
+    with profiling() as profile:
+        pass
+
+    assert profile.statements == []
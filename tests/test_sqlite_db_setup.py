@@ -0,0 +1,82 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from infra.persistence.sqlite.db_setup import (
+    SqliteConnectionPool,
+    SqliteSettings,
+    create_db,
+    initialize_schema,
+)
+from infra.persistence.sqlite.migrations import SCHEMA_VERSION, schema_version
+
+
+@pytest.fixture
+def pool(tmp_path: Path) -> SqliteConnectionPool:
+    pool = SqliteConnectionPool(
+        SqliteSettings(str(tmp_path / "test.db"), readers=2, writers=1)
+    )
+    with pool.writer() as conn:
+        create_db(conn)
+        conn.commit()
+    return pool
+
+
+def test_pool_uses_wal_journal(pool: SqliteConnectionPool) -> None:
+    with pool.reader() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_reader_is_read_only(pool: SqliteConnectionPool) -> None:
+    with pool.reader() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO users (username, token) VALUES ('a', 'b')")
+
+
+def test_reader_not_blocked_by_open_write(pool: SqliteConnectionPool) -> None:
+    with pool.writer() as writer:
+        writer.execute("BEGIN IMMEDIATE")
+        writer.execute("INSERT INTO users (username, token) VALUES ('a', 'b')")
+
+        with pool.reader() as reader:
+            assert reader.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+
+        writer.commit()
+
+    with pool.reader() as reader:
+        assert reader.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 1
+
+
+def test_checkout_rolls_back_unfinished_transaction(
+    pool: SqliteConnectionPool,
+) -> None:
+    with pool.writer() as writer:
+        writer.execute("INSERT INTO users (username, token) VALUES ('a', 'b')")
+
+    with pool.reader() as reader:
+        assert reader.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+
+
+def test_connections_are_reused(pool: SqliteConnectionPool) -> None:
+    with pool.reader() as first:
+        pass
+    with pool.reader() as second:
+        assert first is second
+
+
+def test_workers_initialize_schema_once(tmp_path: Path) -> None:
+    path = str(tmp_path / "test.db")
+    pools = [SqliteConnectionPool(SqliteSettings(path, readers=1)) for _ in range(4)]
+
+    with ThreadPoolExecutor(len(pools)) as executor:
+        list(
+            executor.map(
+                lambda pool: initialize_schema(pool, f"{path}.lock"),
+                pools,
+            )
+        )
+
+    with pools[0].reader() as conn:
+        assert schema_version(conn) == SCHEMA_VERSION
@@ -0,0 +1,132 @@
+import sqlite3
+from decimal import Decimal
+from typing import Iterator
+
+import pytest
+
+from core.models.idempotency import IdempotencyKey, IdempotencyRecord
+from core.models.transaction import Transaction
+from core.models.user import User
+from core.models.wallet import Wallet
+from core.repositories.user_repository import UserRepository
+from core.repositories.wallet_repository import WalletRepository
+from infra.persistence.postgres.postgres_idempotency_repository import (
+    PostgresIdempotencyRepository,
+)
+from infra.persistence.postgres.postgres_transaction_repository import (
+    PostgresTransactionRepository,
+)
+from infra.persistence.postgres.postgres_user_repository import PostgresUserRepository
+from infra.persistence.postgres.postgres_wallet_repository import (
+    PostgresWalletRepository,
+)
+from infra.persistence.sqlite.db_setup import SharedConnection, create_db
+from infra.persistence.sqlite.sqlite_idempotency_repository import (
+    SqliteIdempotencyRepository,
+)
+from infra.persistence.sqlite.sqlite_transaction_repository import (
+    SqliteTransactionRepository,
+)
+from infra.persistence.sqlite.sqlite_user_repository import SqliteUserRepository
+from infra.persistence.sqlite.sqlite_wallet_repository import SqliteWalletRepository
+from tests.postgres import postgres_pool
+
+Repositories = tuple[
+    SqliteTransactionRepository | PostgresTransactionRepository,
+    SqliteIdempotencyRepository | PostgresIdempotencyRepository,
+]
+
+TRANSACTION = Transaction("address1", "address2", Decimal("0.015"), Decimal(1))
+KEY = IdempotencyKey("token1", "key", "hash")
+
+
+def seed(users: UserRepository, wallets: WalletRepository) -> None:
+    users.create_user(User("user1", "token1"))
+    wallets.create_wallet(Wallet("address1", Decimal(10), "token1"))
+    wallets.create_wallet(Wallet("address2", Decimal(0), "token1"))
+
+
+@pytest.fixture
+def now() -> list[float]:
+    return [0.0]
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def repos(request: pytest.FixtureRequest, now: list[float]) -> Iterator[Repositories]:
+    if request.param == "postgres":
+        with postgres_pool() as pool:
+            seed(PostgresUserRepository(pool), PostgresWalletRepository(pool))
+            yield (
+                PostgresTransactionRepository(
+                    pool, clock=lambda: now[0], idempotency_ttl_seconds=60
+                ),
+                PostgresIdempotencyRepository(pool, 60, clock=lambda: now[0]),
+            )
+        return
+
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    create_db(conn)
+    db = SharedConnection(conn)
+    seed(SqliteUserRepository(db), SqliteWalletRepository(db))
+    yield (
+        SqliteTransactionRepository(
+            db, clock=lambda: now[0], idempotency_ttl_seconds=60
+        ),
+        SqliteIdempotencyRepository(db, 60, clock=lambda: now[0]),
+    )
+
+
+def test_key_stored_with_transfer(repos: Repositories) -> None:
+    transactions, keys = repos
+
+    assert keys.get("token1", "key") is None
+    assert transactions.transfer(TRANSACTION, KEY)
+    assert keys.get("token1", "key") == IdempotencyRecord("hash", TRANSACTION)
+
+
+def test_taken_key_rolls_back_transfer(repos: Repositories) -> None:
+    transactions, keys = repos
+    transactions.transfer(TRANSACTION, KEY)
+
+    assert not transactions.transfer(TRANSACTION, IdempotencyKey("token1", "key", "x"))
+    assert len(transactions.get_all_transactions()) == 1
+    assert transactions.get_statistics().transaction_count == 1
+    assert keys.get("token1", "key") == IdempotencyRecord("hash", TRANSACTION)
+
+
+def test_keys_scoped_by_token(repos: Repositories) -> None:
+    transactions, keys = repos
+    transactions.transfer(TRANSACTION, KEY)
+
+    assert transactions.transfer(TRANSACTION, IdempotencyKey("token2", "key", "hash"))
+    assert keys.get("token2", "key") == IdempotencyRecord("hash", TRANSACTION)
+
+
+def test_rejected_transfer_stores_no_key(repos: Repositories) -> None:
+    transactions, keys = repos
+
+    rejected = Transaction("address1", "address2", Decimal(0), Decimal(11))
+    assert not transactions.transfer(rejected, KEY)
+    assert keys.get("token1", "key") is None
+
+
+def test_batch_rejects_repeated_key(repos: Repositories) -> None:
+    transactions, keys = repos
+
+    results = transactions.transfer_many([TRANSACTION] * 3, False, [KEY, KEY, None])
+
+    assert results == [True, False, True]
+    assert len(transactions.get_all_transactions()) == 2
+
+
+def test_expired_key_can_be_reused(repos: Repositories, now: list[float]) -> None:
+    transactions, keys = repos
+    transactions.transfer(TRANSACTION, KEY)
+
+    now[0] = 59
+    assert keys.get("token1", "key") is not None
+    now[0] = 60
+    assert keys.get("token1", "key") is None
+
+    assert transactions.transfer(TRANSACTION, IdempotencyKey("token1", "key", "x"))
+    assert keys.get("token1", "key") == IdempotencyRecord("x", TRANSACTION)
@@ -0,0 +1,146 @@
+import os
+import stat
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from core.models.transaction import Transaction
+from core.models.user import User
+from core.models.wallet import Wallet
+from infra.persistence.sqlite.db_setup import (
+    SqliteConnectionPool,
+    SqliteSettings,
+    create_db,
+)
+from infra.persistence.sqlite.ledger import (
+    archive_partitions,
+    load_partitions,
+    period_of,
+    shift_period,
+)
+from infra.persistence.sqlite.sqlite_transaction_repository import (
+    SqliteTransactionRepository,
+)
+from infra.persistence.sqlite.sqlite_user_repository import SqliteUserRepository
+from infra.persistence.sqlite.sqlite_wallet_repository import SqliteWalletRepository
+
+JANUARY = 1_704_067_200  # 2024-01-01
+FEBRUARY = 1_706_745_600  # 2024-02-01
+MARCH = 1_709_251_200  # 2024-03-01
+
+
+@pytest.fixture
+def pool(tmp_path: Path) -> SqliteConnectionPool:
+    pool = SqliteConnectionPool(
+        SqliteSettings(str(tmp_path / "test.db"), readers=2, writers=1)
+    )
+    with pool.writer() as conn:
+        create_db(conn)
+        conn.commit()
+    users = SqliteUserRepository(pool)
+    wallets = SqliteWalletRepository(pool)
+    users.create_user(User("user1", "token1"))
+    for address in ["address1", "address2", "address3"]:
+        wallets.create_wallet(Wallet(address, Decimal(0), "token1"))
+    return pool
+
+
+@pytest.fixture
+def repo(pool: SqliteConnectionPool) -> SqliteTransactionRepository:
+    repo = SqliteTransactionRepository(pool)
+    for clock in [JANUARY, JANUARY + 1, FEBRUARY, MARCH, MARCH + 1]:
+        repo.clock = lambda: clock
+        repo.add_transaction(
+            Transaction("address1", "address2", Decimal("0.1"), Decimal(clock % 7))
+        )
+    return repo
+
+
+def test_period_of() -> None:
+    assert period_of(JANUARY) == "2024-01"
+    assert period_of(None) == "0000-00"
+
+
+@pytest.mark.parametrize(
+    "period, months, shifted",
+    [
+        ("2024-03", -3, "2023-12"),
+        ("2024-12", 1, "2025-01"),
+        ("2024-01", 0, "2024-01"),
+        ("2023-11", 14, "2025-01"),
+    ],
+)
+def test_shift_period(period: str, months: int, shifted: str) -> None:
+    assert shift_period(period, months) == shifted
+
+
+def test_transactions_routed_by_month(
+    pool: SqliteConnectionPool, repo: SqliteTransactionRepository
+) -> None:
+    with pool.reader() as conn:
+        partitions = load_partitions(conn.cursor())
+        assert [
+            (partition.table_name, partition.first_id, partition.last_id)
+            for partition in partitions
+        ] == [
+            ("transactions_2024_01", 1, 2),
+            ("transactions_2024_02", 3, 3),
+            ("transactions_2024_03", 4, 5),
+        ]
+        assert conn.execute("SELECT id FROM transactions_2024_03").fetchall() == [
+            (4,),
+            (5,),
+        ]
+
+
+def test_pages_span_partitions(repo: SqliteTransactionRepository) -> None:
+    everything = repo.get_all_transactions()
+
+    first = repo.get_transactions("address1", limit=2)
+    second = repo.get_transactions("address1", limit=2, after_id=2)
+    third = repo.get_user_transactions("token1", limit=2, after_id=4)
+
+    assert first + second + third == everything
+    assert repo.get_transactions("address3") == []
+
+
+def test_archived_partitions_stay_readable(
+    tmp_path: Path, pool: SqliteConnectionPool, repo: SqliteTransactionRepository
+) -> None:
+    everything = repo.get_all_transactions()
+    history = repo.get_transactions("address2")
+    statistics = repo.get_statistics()
+
+    with pool.writer() as conn:
+        archived = archive_partitions(conn, "2024-03")
+
+    assert [partition.period for partition in archived] == ["2024-01", "2024-02"]
+    path = tmp_path / "ledger" / "transactions_2024_01.db"
+    assert not os.stat(path).st_mode & stat.S_IWUSR
+    with pool.reader() as conn:
+        assert (
+            conn.execute(
+                "SELECT name FROM sqlite_master WHERE name = 'transactions_2024_01'"
+            ).fetchone()
+            is None
+        )
+
+    assert repo.get_all_transactions() == everything
+    assert repo.get_transactions("address2") == history
+    assert list(repo.iter_transactions(since=FEBRUARY, until=MARCH)) == everything[2:3]
+    assert repo.rebuild_statistics() == statistics
+
+
+def test_archived_period_rejects_writes(
+    pool: SqliteConnectionPool, repo: SqliteTransactionRepository
+) -> None:
+    with pool.writer() as conn:
+        archive_partitions(conn, "2024-02")
+
+    repo.clock = lambda: JANUARY + 2
+    with pytest.raises(ValueError):
+        repo.add_transaction(
+            Transaction("address1", "address2", Decimal(0), Decimal(1))
+        )
+    assert len(repo.get_all_transactions()) == 5
@@ -0,0 +1,156 @@
+import sqlite3
+from decimal import InvalidOperation
+
+import pytest
+
+from core.models.statistics import size_bucket
+from infra.persistence.sqlite.ledger import reserve_ids
+from infra.persistence.sqlite.migrations import (
+    MIGRATIONS,
+    SCHEMA_VERSION,
+    create_decimal_tables,
+    migrate,
+    schema_version,
+)
+
+
+@pytest.fixture
+def legacy() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    create_decimal_tables(conn)
+    conn.executescript(
+        "INSERT INTO users (username, token) VALUES ('user1', 'token1');"
+        "INSERT INTO wallets (id, address, user_id, balance) "
+        "VALUES (3, 'address1', 1, '0.98500000000000001');"
+        "INSERT INTO wallets (id, address, user_id, balance) "
+        "VALUES (4, 'address2', 1, '1.01');"
+        "INSERT INTO transactions (id, from_wallet_id, to_wallet_id, fee, amount, "
+        "created_at) VALUES (7, 3, 4, '0.000000015', '0.01', 86400);"
+        "INSERT INTO transactions (id, from_wallet_id, to_wallet_id, fee, amount, "
+        "created_at) VALUES (8, 4, 3, '0.5', '1', NULL);"
+        "INSERT INTO statistics (id, profit, transaction_count) "
+        "VALUES (1, '0.500000015', 2);"
+    )
+    conn.commit()
+    return conn
+
+
+def test_fresh_database() -> None:
+    conn = sqlite3.connect(":memory:")
+
+    assert migrate(conn) == (0, SCHEMA_VERSION)
+    assert schema_version(conn) == SCHEMA_VERSION
+    assert migrate(conn) == (SCHEMA_VERSION, SCHEMA_VERSION)
+
+
+def test_amounts_become_satoshis(legacy: sqlite3.Connection) -> None:
+    migrate(legacy)
+
+    assert legacy.execute("SELECT id, balance FROM wallets").fetchall() == [
+        (3, 98500000),
+        (4, 101000000),
+    ]
+    assert legacy.execute(
+        "SELECT id, from_wallet_id, to_wallet_id, fee, amount "
+        "FROM transactions_1970_01"
+    ).fetchall() == [(7, 3, 4, 2, 1000000)]
+    assert legacy.execute(
+        "SELECT id, from_wallet_id, to_wallet_id, fee, amount "
+        "FROM transactions_0000_00"
+    ).fetchall() == [(8, 4, 3, 50000000, 100000000)]
+
+
+def test_ledger_partitioned_by_month(legacy: sqlite3.Connection) -> None:
+    migrate(legacy)
+
+    assert legacy.execute(
+        "SELECT period, table_name, first_id, last_id, archive_path "
+        "FROM ledger_partitions ORDER BY first_id"
+    ).fetchall() == [
+        ("1970-01", "transactions_1970_01", 7, 7, None),
+        ("0000-00", "transactions_0000_00", 8, 8, None),
+    ]
+    assert (
+        legacy.execute(
+            "SELECT name FROM sqlite_master WHERE name = 'transactions'"
+        ).fetchone()
+        is None
+    )
+
+
+def test_statistics_rebuilt_from_rounded_fees(legacy: sqlite3.Connection) -> None:
+    migrate(legacy)
+
+    assert legacy.execute(
+        "SELECT profit, transaction_count FROM statistics"
+    ).fetchall() == [(50000002, 2)]
+    assert legacy.execute("SELECT * FROM daily_statistics").fetchall() == [
+        ("1970-01-02", 2, 1)
+    ]
+
+
+def test_activity_counters_backfilled(legacy: sqlite3.Connection) -> None:
+    migrate(legacy)
+
+    assert legacy.execute("SELECT wallet_count FROM users").fetchall() == [(2,)]
+    assert legacy.execute(
+        "SELECT id, transaction_count, last_activity_at FROM wallets"
+    ).fetchall() == [(3, 2, 86400), (4, 2, 86400)]
+
+
+def test_minute_statistics_backfilled(legacy: sqlite3.Connection) -> None:
+    migrate(legacy)
+
+    # The undated transfer belongs to no minute
+    assert legacy.execute("SELECT * FROM minute_statistics").fetchall() == [
+        (1440, 1000000, 2, 1)
+    ]
+    assert legacy.execute("SELECT * FROM minute_transfer_sizes").fetchall() == [
+        (1440, size_bucket(1000000), 1)
+    ]
+
+
+def test_new_ids_continue_after_migrated_rows(legacy: sqlite3.Connection) -> None:
+    migrate(legacy)
+
+    assert reserve_ids(legacy.cursor(), "1970-02", 2) == ("transactions_1970_02", 9)
+    assert reserve_ids(legacy.cursor(), "1970-01", 1) == ("transactions_1970_01", 11)
+
+
+def test_unfinished_idempotency_keys_dropped() -> None:
+    conn = sqlite3.connect(":memory:")
+    for migration in MIGRATIONS[:-1]:
+        migration(conn)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION - 1}")
+    conn.executescript(
+        "INSERT INTO idempotency_keys (user_token, key, request_hash, created_at) "
+        "VALUES ('token1', 'claimed', 'hash', 0);"
+        "INSERT INTO idempotency_keys (user_token, key, request_hash, created_at, "
+        "from_address, to_address, fee, amount) "
+        "VALUES ('token1', 'done', 'hash', 0, 'address1', 'address2', 0, 1);"
+    )
+
+    migrate(conn)
+
+    assert conn.execute("SELECT key FROM idempotency_keys").fetchall() == [("done",)]
+
+
+def test_newer_schema_rejected() -> None:
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+
+    with pytest.raises(RuntimeError):
+        migrate(conn)
+
+
+def test_failed_migration_rolls_back(legacy: sqlite3.Connection) -> None:
+    legacy.execute("UPDATE wallets SET balance = 'garbage' WHERE id = 4")
+    legacy.commit()
+
+    with pytest.raises(InvalidOperation):
+        migrate(legacy)
+
+    assert schema_version(legacy) == 0
+    assert legacy.execute("SELECT balance FROM wallets WHERE id = 4").fetchone() == (
+        "garbage",
+    )
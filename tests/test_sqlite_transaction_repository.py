@@ -1,55 +1,105 @@
 import sqlite3
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Iterator
 
 import pytest
 
+from core.models.statistics import (
+    ROLLUP_RETENTION_MINUTES,
+    MinuteStatistics,
+    Statistics,
+    size_bucket,
+)
 from core.models.transaction import Transaction
-from infra.persistence.sqlite.db_setup import create_db
+from core.models.user import User
+from core.models.wallet import Wallet, WalletActivity
+from core.repositories.user_repository import UserRepository
+from core.repositories.wallet_repository import WalletRepository
+from infra.persistence.postgres.migrations import STATISTICS_SHARDS
+from infra.persistence.postgres.postgres_transaction_repository import (
+    PostgresTransactionRepository,
+)
+from infra.persistence.postgres.postgres_user_repository import PostgresUserRepository
+from infra.persistence.postgres.postgres_wallet_repository import (
+    PostgresWalletRepository,
+)
+from infra.persistence.sqlite.db_setup import (
+    SharedConnection,
+    SqliteConnectionPool,
+    SqliteSettings,
+    create_db,
+)
 from infra.persistence.sqlite.sqlite_transaction_repository import (
     SqliteTransactionRepository,
+    export_query,
+    transaction_select,
+    user_transactions_query,
+    wallet_transactions_query,
 )
+from infra.persistence.sqlite.sqlite_user_repository import SqliteUserRepository
+from infra.persistence.sqlite.sqlite_wallet_repository import SqliteWalletRepository
+from tests.postgres import postgres_pool
+
+Repository = SqliteTransactionRepository | PostgresTransactionRepository
+
+
+def seed(users: UserRepository, wallets: WalletRepository) -> None:
+    users.create_user(User("user1", "token1"))
+    users.create_user(User("user2", "token2"))
+    for address, token in [
+        ("address1", "token1"),
+        ("address2", "token1"),
+        ("address3", "token1"),
+        ("address4", "token1"),
+        ("address5", "token2"),
+        ("address6", "token2"),
+    ]:
+        wallets.create_wallet(Wallet(address, Decimal(0), token))
 
 
 @pytest.fixture
-def repo() -> SqliteTransactionRepository:
+def sqlite_repo() -> SqliteTransactionRepository:
     conn = sqlite3.connect(":memory:")
     create_db(conn)
-    insert_rows = [
-        "INSERT INTO users (username, token) VALUES ('user1', 'token1');",
-        "INSERT INTO users (username, token) VALUES ('user2', 'token2');"
-        "INSERT INTO wallets (address, user_id, balance) VALUES ('address1', 1, 0);",
-        "INSERT INTO wallets (address, user_id, balance) VALUES ('address2', 1, 0);",
-        "INSERT INTO wallets (address, user_id, balance) VALUES ('address3', 1, 0);",
-        "INSERT INTO wallets (address, user_id, balance) VALUES ('address4', 1, 0);",
-        "INSERT INTO wallets (address, user_id, balance) VALUES ('address5', 2, 0);",
-        "INSERT INTO wallets (address, user_id, balance) VALUES ('address6', 2, 0);",
-    ]
-    for statement in insert_rows:
-        conn.cursor().executescript(statement)
-    conn.commit()
-    return SqliteTransactionRepository(conn)
+    db = SharedConnection(conn)
+    seed(SqliteUserRepository(db), SqliteWalletRepository(db))
+    return SqliteTransactionRepository(db)
+
 
+@pytest.fixture(params=["sqlite", "postgres"])
+def repo(request: pytest.FixtureRequest) -> Iterator[Repository]:
+    if request.param == "postgres":
+        with postgres_pool() as pool:
+            seed(PostgresUserRepository(pool), PostgresWalletRepository(pool))
+            yield PostgresTransactionRepository(pool)
+        return
 
-def test_add_transaction(repo: SqliteTransactionRepository) -> None:
-    transaction = Transaction("address1", "address2", Decimal(0.1), Decimal(10))
+    yield request.getfixturevalue("sqlite_repo")
+
+
+def test_add_transaction(repo: Repository) -> None:
+    transaction = Transaction("address1", "address2", Decimal("0.1"), Decimal(10))
     repo.add_transaction(transaction)
     assert repo.get_all_transactions() == [transaction]
 
 
-def test_get_transactions(repo: SqliteTransactionRepository) -> None:
-    transaction1 = Transaction("address1", "address3", Decimal(0.1), Decimal(10))
-    transaction2 = Transaction("address2", "address3", Decimal(0.2), Decimal(10))
-    transaction3 = Transaction("address4", "address2", Decimal(0.3), Decimal(10))
+def test_get_transactions(repo: Repository) -> None:
+    transaction1 = Transaction("address1", "address3", Decimal("0.1"), Decimal(10))
+    transaction2 = Transaction("address2", "address3", Decimal("0.2"), Decimal(10))
+    transaction3 = Transaction("address4", "address2", Decimal("0.3"), Decimal(10))
     repo.add_transaction(transaction1)
     repo.add_transaction(transaction2)
     repo.add_transaction(transaction3)
     assert repo.get_transactions("address2") == [transaction2, transaction3]
 
 
-def test_get_user_transactions(repo: SqliteTransactionRepository) -> None:
-    transaction1 = Transaction("address1", "address2", Decimal(0.1), Decimal(5))
-    transaction2 = Transaction("address1", "address5", Decimal(0.2), Decimal(10))
-    transaction3 = Transaction("address5", "address6", Decimal(0.3), Decimal(15))
+def test_get_user_transactions(repo: Repository) -> None:
+    transaction1 = Transaction("address1", "address2", Decimal("0.1"), Decimal(5))
+    transaction2 = Transaction("address1", "address5", Decimal("0.2"), Decimal(10))
+    transaction3 = Transaction("address5", "address6", Decimal("0.3"), Decimal(15))
 
     repo.add_transaction(transaction1)
     repo.add_transaction(transaction2)
@@ -62,11 +112,540 @@ def test_get_user_transactions(repo: SqliteTransactionRepository) -> None:
     assert transaction3 not in res
 
 
-def test_get_all_transactions(repo: SqliteTransactionRepository) -> None:
-    transaction1 = Transaction("address1", "address2", Decimal(0.1), Decimal(10))
-    transaction2 = Transaction("address2", "address3", Decimal(0.2), Decimal(10))
-    transaction3 = Transaction("address3", "address4", Decimal(0.3), Decimal(10))
+def test_get_all_transactions(repo: Repository) -> None:
+    transaction1 = Transaction("address1", "address2", Decimal("0.1"), Decimal(10))
+    transaction2 = Transaction("address2", "address3", Decimal("0.2"), Decimal(10))
+    transaction3 = Transaction("address3", "address4", Decimal("0.3"), Decimal(10))
     repo.add_transaction(transaction1)
     repo.add_transaction(transaction2)
     repo.add_transaction(transaction3)
     assert repo.get_all_transactions() == [transaction1, transaction2, transaction3]
+
+
+def test_get_statistics_empty(repo: Repository) -> None:
+    assert repo.get_statistics() == Statistics()
+
+
+def test_get_statistics_tracks_added_transactions(
+    repo: Repository,
+) -> None:
+    repo.add_transaction(
+        Transaction("address1", "address2", Decimal("0.1"), Decimal(10))
+    )
+    repo.add_transaction(
+        Transaction("address2", "address3", Decimal("0.2"), Decimal(10))
+    )
+
+    assert repo.get_statistics() == Statistics(Decimal("0.3"), 2)
+
+
+def test_get_daily_statistics(repo: Repository) -> None:
+    timestamps = iter([0, 60, 86400])
+    repo.clock = lambda: next(timestamps)
+    repo.add_transaction(
+        Transaction("address1", "address2", Decimal("0.1"), Decimal(10))
+    )
+    repo.add_transaction(
+        Transaction("address1", "address2", Decimal("0.2"), Decimal(10))
+    )
+    repo.add_transaction(
+        Transaction("address1", "address2", Decimal("0.4"), Decimal(10))
+    )
+
+    assert repo.get_daily_statistics() == {
+        "1970-01-01": Statistics(Decimal("0.3"), 2),
+        "1970-01-02": Statistics(Decimal("0.4"), 1),
+    }
+
+
+def test_rebuild_statistics_matches_incremental(
+    repo: Repository,
+) -> None:
+    repo.add_transaction(
+        Transaction("address1", "address2", Decimal("0.1"), Decimal(10))
+    )
+    repo.add_transaction(
+        Transaction("address2", "address3", Decimal("0.2"), Decimal(10))
+    )
+    incremental = repo.get_statistics()
+    daily = repo.get_daily_statistics()
+
+    assert repo.rebuild_statistics() == incremental
+    assert repo.get_daily_statistics() == daily
+
+
+def test_statistics_recovered_for_ledger_without_aggregate(
+    repo: Repository,
+) -> None:
+    repo.add_transaction(
+        Transaction("address1", "address2", Decimal("0.1"), Decimal(10))
+    )
+    with repo.db.writer() as conn:
+        conn.execute("DELETE FROM statistics")
+        conn.commit()
+
+    repo.add_transaction(
+        Transaction("address2", "address3", Decimal("0.2"), Decimal(10))
+    )
+
+    assert repo.get_statistics() == Statistics(Decimal("0.3"), 2)
+
+
+def test_get_minute_statistics(repo: Repository) -> None:
+    timestamps = iter([60, 119, 120, 240])
+    repo.clock = lambda: next(timestamps)
+    for fee, amount in [("0.1", "1"), ("0.2", "2"), ("0.3", "1"), ("0.4", "1")]:
+        repo.add_transaction(
+            Transaction("address1", "address2", Decimal(fee), Decimal(amount))
+        )
+
+    assert repo.get_minute_statistics(1, 3) == [
+        MinuteStatistics(
+            1,
+            Decimal(3),
+            Decimal("0.3"),
+            2,
+            Counter({size_bucket(100_000_000): 1, size_bucket(200_000_000): 1}),
+        ),
+        MinuteStatistics(
+            2, Decimal(1), Decimal("0.3"), 1, Counter({size_bucket(100_000_000): 1})
+        ),
+    ]
+
+
+def test_minute_statistics_pruned_past_retention(repo: Repository) -> None:
+    timestamps = iter([0, ROLLUP_RETENTION_MINUTES * 60])
+    repo.clock = lambda: next(timestamps)
+    for _ in range(2):
+        repo.add_transaction(
+            Transaction("address1", "address2", Decimal("0.1"), Decimal(1))
+        )
+
+    minutes = repo.get_minute_statistics(0, ROLLUP_RETENTION_MINUTES)
+    assert [minute.minute for minute in minutes] == [ROLLUP_RETENTION_MINUTES]
+
+
+def test_rebuild_statistics_restores_minute_statistics(repo: Repository) -> None:
+    repo.clock = lambda: 600
+    repo.add_transaction(
+        Transaction("address1", "address2", Decimal("0.1"), Decimal(1))
+    )
+    repo.add_transaction(
+        Transaction("address2", "address3", Decimal("0.2"), Decimal(2))
+    )
+    incremental = repo.get_minute_statistics(0, 10)
+    with repo.db.writer() as conn:
+        conn.execute("DELETE FROM minute_statistics")
+        conn.execute("DELETE FROM minute_transfer_sizes")
+        conn.commit()
+
+    repo.rebuild_statistics()
+
+    assert repo.get_minute_statistics(0, 10) == incremental
+
+
+def wallet_repo(repo: Repository) -> WalletRepository:
+    if isinstance(repo, PostgresTransactionRepository):
+        return PostgresWalletRepository(repo.db)
+    return SqliteWalletRepository(repo.db)
+
+
+def get_balance(repo: Repository, address: str) -> Decimal:
+    wallet = wallet_repo(repo).get_wallet(address)
+    assert wallet is not None
+    return wallet.balance
+
+
+def set_balance(repo: Repository, address: str, balance: str) -> None:
+    wallet_repo(repo).update_wallet_balance_if_exists(address, Decimal(balance))
+
+
+def test_transfer_moves_balance_and_records_transaction(
+    repo: Repository,
+) -> None:
+    set_balance(repo, "address1", "1.5")
+    transaction = Transaction("address1", "address5", Decimal("0.1"), Decimal("1"))
+
+    assert repo.transfer(transaction) is True
+
+    assert get_balance(repo, "address1") == Decimal("0.4")
+    assert get_balance(repo, "address5") == Decimal("1")
+    assert repo.get_all_transactions() == [transaction]
+    assert repo.get_statistics() == Statistics(Decimal("0.1"), 1)
+
+
+def test_transfer_balance_insufficient(repo: Repository) -> None:
+    set_balance(repo, "address1", "1")
+    transaction = Transaction("address1", "address5", Decimal("0.1"), Decimal("1"))
+
+    assert repo.transfer(transaction) is False
+
+    assert get_balance(repo, "address1") == Decimal("1")
+    assert get_balance(repo, "address5") == Decimal("0")
+    assert repo.get_all_transactions() == []
+
+
+def test_transfer_wallet_non_existent(repo: Repository) -> None:
+    set_balance(repo, "address1", "1")
+    transaction = Transaction("address1", "WRONG", Decimal("0"), Decimal("1"))
+
+    assert repo.transfer(transaction) is False
+    assert get_balance(repo, "address1") == Decimal("1")
+
+
+def test_transfers_record_wallet_activity(repo: Repository) -> None:
+    timestamps = iter([100, 200, 300])
+    repo.clock = lambda: next(timestamps)
+    set_balance(repo, "address1", "3")
+
+    assert repo.transfer(
+        Transaction("address1", "address5", Decimal("0"), Decimal("1"))
+    )
+    assert repo.transfer_many(
+        [
+            Transaction("address1", "address1", Decimal("0"), Decimal("1")),
+            Transaction("address1", "address2", Decimal("0"), Decimal("1")),
+            Transaction("address1", "address2", Decimal("0"), Decimal("5")),
+        ],
+        atomic=False,
+    ) == [True, True, False]
+    assert not repo.transfer(
+        Transaction("address2", "address6", Decimal("0"), Decimal("5"))
+    )
+    repo.add_transaction(
+        Transaction("address5", "address6", Decimal("0"), Decimal("1"))
+    )
+
+    wallets = wallet_repo(repo)
+    assert wallets.get_wallet_activity("address1") == WalletActivity(3, 200)
+    assert wallets.get_wallet_activity("address2") == WalletActivity(1, 200)
+    assert wallets.get_wallet_activity("address5") == WalletActivity(2, 300)
+    assert wallets.get_wallet_activity("address6") == WalletActivity(1, 300)
+    assert wallets.get_wallet_activity("address3") == WalletActivity(0, None)
+
+
+def test_transfer_to_same_wallet(repo: Repository) -> None:
+    set_balance(repo, "address1", "1")
+    transaction = Transaction("address1", "address1", Decimal("0"), Decimal("1"))
+
+    assert repo.transfer(transaction) is True
+    assert get_balance(repo, "address1") == Decimal("1")
+
+
+def test_concurrent_transfers_never_overdraw(tmp_path: Path) -> None:
+    pool = SqliteConnectionPool(
+        SqliteSettings(str(tmp_path / "test.db"), readers=2, writers=4)
+    )
+    with pool.writer() as conn:
+        create_db(conn)
+        conn.executescript(
+            "INSERT INTO users (username, token) VALUES ('user1', 'token1');"
+            "INSERT INTO wallets (address, user_id, balance) "
+            "VALUES ('from', 1, 1000000000);"
+            "INSERT INTO wallets (address, user_id, balance) VALUES ('to', 1, 0);"
+        )
+        conn.commit()
+    repo = SqliteTransactionRepository(pool)
+
+    def transfer(_: int) -> bool:
+        return repo.transfer(Transaction("from", "to", Decimal("0"), Decimal("1")))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(transfer, range(40)))
+
+    assert results.count(True) == 10
+    assert get_balance(repo, "from") == Decimal("0")
+    assert get_balance(repo, "to") == Decimal("10")
+    assert repo.get_statistics().transaction_count == 10
+    pool.close()
+
+
+def test_postgres_concurrent_transfers_never_overdraw() -> None:
+    with postgres_pool() as pool:
+        seed(PostgresUserRepository(pool), PostgresWalletRepository(pool))
+        repo = PostgresTransactionRepository(pool)
+        set_balance(repo, "address1", "10")
+
+        def transfer(_: int) -> bool:
+            return repo.transfer(
+                Transaction("address1", "address5", Decimal("0"), Decimal("1"))
+            )
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(transfer, range(40)))
+
+        assert results.count(True) == 10
+        assert get_balance(repo, "address1") == Decimal("0")
+        assert get_balance(repo, "address5") == Decimal("10")
+        assert repo.get_statistics().transaction_count == 10
+
+
+def test_postgres_opposite_transfers_do_not_deadlock() -> None:
+    with postgres_pool() as pool:
+        seed(PostgresUserRepository(pool), PostgresWalletRepository(pool))
+        repo = PostgresTransactionRepository(pool)
+        set_balance(repo, "address1", "10")
+        set_balance(repo, "address5", "10")
+
+        def transfer(index: int) -> bool:
+            pair = ["address1", "address5"] if index % 2 else ["address5", "address1"]
+            return repo.transfer_many(
+                [
+                    Transaction(pair[0], pair[1], Decimal("0"), Decimal("1")),
+                    Transaction(pair[1], pair[0], Decimal("0"), Decimal("1")),
+                ],
+                atomic=True,
+            )[0]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(transfer, range(40)))
+
+        assert all(results)
+        assert get_balance(repo, "address1") == Decimal("10")
+        assert repo.get_statistics().transaction_count == 80
+
+
+def test_postgres_disjoint_transfers_do_not_share_statistics() -> None:
+    with postgres_pool() as pool:
+        seed(PostgresUserRepository(pool), PostgresWalletRepository(pool))
+        repo = PostgresTransactionRepository(pool, clock=lambda: 600)
+        set_balance(repo, "address1", "10")
+        set_balance(repo, "address3", "10")
+        repo.transfer(Transaction("address1", "address2", Decimal("0.1"), Decimal(1)))
+
+        with pool.writer() as holder:
+            # Stands in for an uncommitted transfer from address1
+            holder.execute(
+                "UPDATE statistics SET profit = profit WHERE shard = "
+                "(SELECT id FROM wallets WHERE address = 'address1') %% %s",
+                [STATISTICS_SHARDS],
+            )
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                other = executor.submit(
+                    repo.transfer,
+                    Transaction("address3", "address4", Decimal("0.2"), Decimal(1)),
+                )
+                assert other.result(timeout=5)
+            holder.rollback()
+
+        assert repo.get_statistics() == Statistics(Decimal("0.3"), 2)
+        assert repo.get_daily_statistics() == {
+            "1970-01-01": Statistics(Decimal("0.3"), 2)
+        }
+        [minute] = repo.get_minute_statistics(10, 10)
+        assert minute.transaction_count == 2
+        assert minute.sizes == Counter({size_bucket(100_000_000): 2})
+
+
+def test_postgres_opposite_rollup_order_does_not_deadlock() -> None:
+    with postgres_pool() as pool:
+        repo = PostgresTransactionRepository(pool)
+        # Spanning minutes and buckets, so no single row serializes the writers
+        rows = [
+            (minute, amount, 1, 0)
+            for minute in (10, 11)
+            for amount in (100_000, 100_000_000)
+        ]
+
+        def record(index: int) -> None:
+            with pool.writer() as conn:
+                repo._record_rollup(conn.cursor(), rows if index % 2 else rows[::-1], 0)
+                conn.commit()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(record, range(400)))
+
+        minutes = repo.get_minute_statistics(10, 11)
+        assert [minute.transaction_count for minute in minutes] == [800, 800]
+        assert minutes[0].sizes == Counter(
+            {size_bucket(100_000): 400, size_bucket(100_000_000): 400}
+        )
+
+
+def query_plan(
+    repo: SqliteTransactionRepository, query: str, arguments: list[int]
+) -> list[str]:
+    with repo.db.reader() as conn:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", arguments).fetchall()
+    return [row[3] for row in rows]
+
+
+@pytest.mark.parametrize(
+    "query, arguments",
+    [
+        (wallet_transactions_query, [1, 0, 1, 0, 10]),
+        (
+            lambda select: user_transactions_query(select, 2),
+            [1, 2, 0, 1, 2, 0, 1, 2, 10],
+        ),
+        (
+            lambda select: export_query(select, 1, 0, 10, 0, 10)[0],
+            [1, 0, 0, 10, 1, 0, 0, 10, 10],
+        ),
+    ],
+)
+@pytest.mark.parametrize("index", ["from_wallet_id", "to_wallet_id"])
+def test_history_queries_use_indexes(
+    sqlite_repo: SqliteTransactionRepository,
+    query: Callable[[str], str],
+    arguments: list[int],
+    index: str,
+) -> None:
+    sqlite_repo.clock = lambda: 0
+    sqlite_repo.add_transaction(
+        Transaction("address1", "address2", Decimal("0"), Decimal(1))
+    )
+    plan = query_plan(
+        sqlite_repo, query(transaction_select("transactions_1970_01")), arguments
+    )
+
+    assert any(f"transactions_1970_01_{index}" in step for step in plan)
+    scanned_tables = {step.split()[1] for step in plan if step.startswith("SCAN ")}
+    assert scanned_tables.isdisjoint({"t", "wf", "wt"})
+
+
+def test_get_user_transactions_between_own_wallets_listed_once(
+    repo: Repository,
+) -> None:
+    transaction = Transaction("address1", "address2", Decimal("0"), Decimal(5))
+    repo.add_transaction(transaction)
+
+    assert repo.get_user_transactions("token1") == [transaction]
+
+
+def test_get_transactions_to_same_wallet_listed_once(
+    repo: Repository,
+) -> None:
+    transaction = Transaction("address1", "address1", Decimal("0"), Decimal(5))
+    repo.add_transaction(transaction)
+
+    assert repo.get_transactions("address1") == [transaction]
+
+
+def test_get_transactions_paginated(repo: Repository) -> None:
+    transactions = [
+        Transaction("address1", "address2", Decimal("0"), Decimal(amount))
+        for amount in range(5)
+    ]
+    for transaction in transactions:
+        repo.add_transaction(transaction)
+    repo.add_transaction(Transaction("address3", "address4", Decimal(0), Decimal(1)))
+
+    first_page = repo.get_transactions("address2", limit=2)
+    assert first_page == transactions[:2]
+
+    second_page = repo.get_transactions("address2", 2, after_id=first_page[-1].id or 0)
+    assert second_page == transactions[2:4]
+
+    last_page = repo.get_transactions("address2", 2, after_id=second_page[-1].id or 0)
+    assert last_page == transactions[4:]
+
+
+def test_get_user_transactions_paginated(repo: Repository) -> None:
+    transactions = [
+        Transaction("address1", "address5", Decimal("0"), Decimal(1)),
+        Transaction("address6", "address2", Decimal("0"), Decimal(2)),
+        Transaction("address5", "address6", Decimal("0"), Decimal(3)),
+        Transaction("address3", "address4", Decimal("0"), Decimal(4)),
+    ]
+    for transaction in transactions:
+        repo.add_transaction(transaction)
+
+    first_page = repo.get_user_transactions("token1", limit=2)
+    assert first_page == transactions[:2]
+
+    last_page = repo.get_user_transactions("token1", 2, after_id=first_page[-1].id or 0)
+    assert last_page == transactions[3:]
+
+
+def test_iter_transactions_in_batches(repo: Repository) -> None:
+    repo.export_batch_size = 2
+    transactions = [
+        Transaction("address1", "address2", Decimal("0"), Decimal(amount))
+        for amount in range(5)
+    ]
+    for transaction in transactions:
+        repo.add_transaction(transaction)
+
+    assert list(repo.iter_transactions()) == transactions
+
+
+def test_iter_transactions_filtered(repo: Repository) -> None:
+    timestamps = iter([100, 200, 300, 400])
+    repo.clock = lambda: next(timestamps)
+    transaction1 = Transaction("address1", "address2", Decimal("0"), Decimal(1))
+    transaction2 = Transaction("address2", "address3", Decimal("0"), Decimal(2))
+    transaction3 = Transaction("address3", "address4", Decimal("0"), Decimal(3))
+    transaction4 = Transaction("address4", "address2", Decimal("0"), Decimal(4))
+    for transaction in [transaction1, transaction2, transaction3, transaction4]:
+        repo.add_transaction(transaction)
+
+    assert list(repo.iter_transactions(since=200, until=400)) == [
+        transaction2,
+        transaction3,
+    ]
+    assert list(repo.iter_transactions("address2", since=200)) == [
+        transaction2,
+        transaction4,
+    ]
+    exported = list(repo.iter_transactions("address1"))
+    assert exported == [transaction1]
+    assert exported[0].created_at == 100
+
+
+def test_export_returns_reader_between_pages(tmp_path: Path) -> None:
+    pool = SqliteConnectionPool(SqliteSettings(str(tmp_path / "test.db"), readers=1))
+    with pool.writer() as conn:
+        create_db(conn)
+    seed(SqliteUserRepository(pool), SqliteWalletRepository(pool))
+    repo = SqliteTransactionRepository(pool, export_batch_size=2)
+    for amount in range(5):
+        repo.add_transaction(
+            Transaction("address1", "address2", Decimal("0"), Decimal(amount))
+        )
+
+    export = repo.iter_transactions()
+    first = next(export)
+    # The only reader is free again while the client works through the page
+    statistics = ThreadPoolExecutor(1).submit(repo.get_statistics)
+
+    assert statistics.result(timeout=5).transaction_count == 5
+    assert [first, *export] == repo.get_all_transactions()
+    pool.close()
+
+
+def test_transfer_many_best_effort(repo: Repository) -> None:
+    set_balance(repo, "address1", "3")
+    transactions = [
+        Transaction("address1", "address2", Decimal("0.5"), Decimal("1")),
+        Transaction("address1", "address2", Decimal("0.5"), Decimal("2")),
+        Transaction("address2", "address5", Decimal("0"), Decimal("1")),
+        Transaction("address1", "WRONG", Decimal("0"), Decimal("1")),
+    ]
+
+    assert repo.transfer_many(transactions, atomic=False) == [
+        True,
+        False,
+        True,
+        False,
+    ]
+
+    assert get_balance(repo, "address1") == Decimal("1.5")
+    assert get_balance(repo, "address2") == Decimal("0")
+    assert get_balance(repo, "address5") == Decimal("1")
+    assert repo.get_all_transactions() == [transactions[0], transactions[2]]
+    assert repo.get_statistics() == Statistics(Decimal("0.5"), 2)
+
+
+def test_transfer_many_atomic_rolls_back(repo: Repository) -> None:
+    set_balance(repo, "address1", "3")
+    transactions = [
+        Transaction("address1", "address2", Decimal("0"), Decimal("1")),
+        Transaction("address1", "address2", Decimal("0"), Decimal("5")),
+    ]
+
+    assert repo.transfer_many(transactions, atomic=True) == [True, False]
+
+    assert get_balance(repo, "address1") == Decimal("3")
+    assert repo.get_all_transactions() == []
+    assert repo.get_statistics() == Statistics()
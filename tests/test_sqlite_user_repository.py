@@ -1,18 +1,26 @@
 import sqlite3
+from typing import Iterator
 
 import pytest
 
 from core.models.user import User
 from core.repositories.user_repository import UserRepository
-from infra.persistence.sqlite.db_setup import create_db
+from infra.persistence.postgres.postgres_user_repository import PostgresUserRepository
+from infra.persistence.sqlite.db_setup import SharedConnection, create_db
 from infra.persistence.sqlite.sqlite_user_repository import SqliteUserRepository
+from tests.postgres import postgres_pool
 
 
-@pytest.fixture
-def user_repo() -> UserRepository:
+@pytest.fixture(params=["sqlite", "postgres"])
+def user_repo(request: pytest.FixtureRequest) -> Iterator[UserRepository]:
+    if request.param == "postgres":
+        with postgres_pool() as pool:
+            yield PostgresUserRepository(pool)
+        return
+
     conn = sqlite3.connect(":memory:", check_same_thread=False)
     create_db(conn)
-    return SqliteUserRepository(conn)
+    yield SqliteUserRepository(SharedConnection(conn))
 
 
 def test_basic_create_user(user_repo: UserRepository) -> None:
@@ -66,3 +74,12 @@ def test_same_username(user_repo: UserRepository) -> None:
 
     assert user_repo.create_user(test_user1) is True
     assert user_repo.username_taken("abc") is True
+
+
+def test_iter_usernames(user_repo: UserRepository) -> None:
+    assert list(user_repo.iter_usernames()) == []
+
+    user_repo.create_user(User("abc", "efg"))
+    user_repo.create_user(User("hij", "klm"))
+
+    assert sorted(user_repo.iter_usernames()) == ["abc", "hij"]
@@ -1,16 +1,30 @@
 import sqlite3
 from decimal import Decimal
+from typing import Iterator
 
 import pytest
 
-from core.models.wallet import Wallet
+from core.models.user import User
+from core.models.wallet import Wallet, WalletActivity
 from core.repositories.wallet_repository import WalletRepository
-from infra.persistence.sqlite.db_setup import create_db
+from infra.persistence.postgres.postgres_user_repository import PostgresUserRepository
+from infra.persistence.postgres.postgres_wallet_repository import (
+    PostgresWalletRepository,
+)
+from infra.persistence.sqlite.db_setup import SharedConnection, create_db
 from infra.persistence.sqlite.sqlite_wallet_repository import SqliteWalletRepository
+from tests.postgres import postgres_pool
 
 
-@pytest.fixture
-def repo() -> WalletRepository:
+@pytest.fixture(params=["sqlite", "postgres"])
+def repo(request: pytest.FixtureRequest) -> Iterator[WalletRepository]:
+    if request.param == "postgres":
+        with postgres_pool() as pool:
+            PostgresUserRepository(pool).create_user(User("test1", "test1"))
+            PostgresUserRepository(pool).create_user(User("test2", "test2"))
+            yield PostgresWalletRepository(pool)
+        return
+
     conn = sqlite3.connect(":memory:")
     create_db(conn)
 
@@ -24,7 +38,7 @@ def repo() -> WalletRepository:
 
     conn.commit()
 
-    return SqliteWalletRepository(conn)
+    yield SqliteWalletRepository(SharedConnection(conn))
 
 
 def test_create_wallet_wrong_user(repo: WalletRepository) -> None:
@@ -67,3 +81,30 @@ def test_get_wallets_by_user_correct(repo: WalletRepository) -> None:
     repo.create_wallet(wallet2)
 
     assert repo.get_wallets_by_user("test1") == [wallet1, wallet2]
+
+
+def test_get_wallets(repo: WalletRepository) -> None:
+    wallet1 = Wallet("wallet1", Decimal("123"), "test1")
+    wallet2 = Wallet("wallet2", Decimal("111"), "test2")
+    repo.create_wallet(wallet1)
+    repo.create_wallet(wallet2)
+
+    assert repo.get_wallets(["wallet2", "wallet1", "wrong"]) == [wallet1, wallet2]
+
+
+def test_count_wallets_by_user(repo: WalletRepository) -> None:
+    assert repo.count_wallets_by_user("test1") == 0
+    repo.create_wallet(Wallet("wallet1", Decimal("123"), "test1"))
+    repo.create_wallet(Wallet("wallet2", Decimal("111"), "test1"))
+    repo.create_wallet(Wallet("wallet3", Decimal("111"), "wrong"))
+
+    assert repo.count_wallets_by_user("test1") == 2
+    assert repo.count_wallets_by_user("test2") == 0
+    assert repo.count_wallets_by_user("wrong") == 0
+
+
+def test_get_wallet_activity(repo: WalletRepository) -> None:
+    repo.create_wallet(Wallet("wallet1", Decimal("123"), "test1"))
+
+    assert repo.get_wallet_activity("wallet1") == WalletActivity(0, None)
+    assert repo.get_wallet_activity("wrong") is None
@@ -1,16 +1,22 @@
 import unittest.mock
 from decimal import Decimal
 
+import pytest
+
 from core.interactors.fee_provider import FeeProvider
 from core.interactors.transaction_interactor import (
     BitcoinServiceTransactionInteractor,
     TransactionInteractor,
     TransactionResponse,
     TransactionStatus,
+    TransferRequest,
+    transfer_hash,
 )
+from core.models.idempotency import IdempotencyKey, IdempotencyRecord
 from core.models.transaction import Transaction
 from core.models.user import User
 from core.models.wallet import Wallet
+from core.repositories.idempotency_repository import IdempotencyRepository
 from core.repositories.transaction_repository import TransactionRepository
 from core.repositories.user_repository import UserRepository
 from core.repositories.wallet_repository import WalletRepository
@@ -20,6 +26,7 @@ from tests.mock_repo import get_transaction_repo, get_user_repo, get_wallet_repo
 def get_fee_provider(fee: Decimal) -> FeeProvider:
     provider = unittest.mock.Mock()
     provider.provide.return_value = fee
+    provider.provide_many.side_effect = lambda amounts, _: [fee] * len(amounts)
     return provider
 
 
@@ -30,12 +37,14 @@ def get_transaction_interactor(
     user_repo: UserRepository = get_user_repo(User("test", "test")),
     wallet_repo: WalletRepository = get_wallet_repo(),
     fee_provider: FeeProvider = get_fee_provider(Decimal("0.1")),
+    idempotency_repo: IdempotencyRepository | None = None,
 ) -> TransactionInteractor:
     return BitcoinServiceTransactionInteractor(
         transaction_repo=transaction_repo,
         user_repo=user_repo,
         wallet_repo=wallet_repo,
         fee_provider=fee_provider,
+        idempotency_repo=idempotency_repo,
     )
 
 
@@ -132,3 +141,339 @@ def test_get_transactions_by_wallet_user_non_existent() -> None:
     interactor = get_transaction_interactor()
     transactions = interactor.get_transactions_by_wallet("test", "WRONG")
     assert transactions.status == TransactionStatus.UNAUTHORIZED
+
+
+def test_do_transaction_balance_insufficient() -> None:
+    wallet_repo = get_wallet_repo()
+    wallet_repo.__setattr__("get_wallet", get_wallet)
+    interactor = get_transaction_interactor(wallet_repo=wallet_repo)
+    transaction = interactor.do_transaction("test1", "test2", "test", Decimal("1"))
+    assert transaction.status == TransactionStatus.BALANCE_INSUFFICIENT
+
+
+def test_do_transaction_balance_changed_concurrently() -> None:
+    wallet_repo = get_wallet_repo()
+    wallet_repo.__setattr__("get_wallet", get_wallet)
+    wallet_repo.__setattr__("get_wallets", get_wallets)
+    transaction_repo = get_transaction_repo([])
+    transaction_repo.__setattr__("transfer", lambda *_: False)
+    interactor = get_transaction_interactor(
+        transaction_repo=transaction_repo, wallet_repo=wallet_repo
+    )
+    transaction = interactor.do_transaction("test1", "test2", "test", Decimal("0.1"))
+    assert transaction.status == TransactionStatus.BALANCE_INSUFFICIENT
+
+
+def test_do_transaction_wallet_gone_before_commit() -> None:
+    wallet_repo = get_wallet_repo()
+    wallet_repo.__setattr__("get_wallet", get_wallet)
+    wallet_repo.__setattr__("get_wallets", lambda _: [])
+    transaction_repo = get_transaction_repo([])
+    transaction_repo.__setattr__("transfer", lambda *_: False)
+    interactor = get_transaction_interactor(
+        transaction_repo=transaction_repo, wallet_repo=wallet_repo
+    )
+    transaction = interactor.do_transaction("test1", "test2", "test", Decimal("0.1"))
+    assert transaction.status == TransactionStatus.WALLET_NOT_FOUND
+
+
+def test_get_transactions_passes_page() -> None:
+    transaction_repo = get_transaction_repo([])
+    interactor = get_transaction_interactor(transaction_repo=transaction_repo)
+    interactor.get_transactions("test", 10, 20)
+    transaction_repo.get_user_transactions.assert_called_once_with(  # type: ignore
+        "test", 10, 20
+    )
+
+
+def test_get_transactions_by_wallet_passes_page() -> None:
+    transaction_repo = get_transaction_repo([])
+    interactor = get_transaction_interactor(transaction_repo=transaction_repo)
+    interactor.get_transactions_by_wallet("test", "test", 10, 20)
+    transaction_repo.get_transactions.assert_called_once_with(  # type: ignore
+        "test", 10, 20
+    )
+
+
+class StoredKeys:
+    def __init__(self) -> None:
+        self.records: dict[tuple[str, str], IdempotencyRecord] = {}
+
+    def get(self, user_token: str, key: str) -> IdempotencyRecord | None:
+        return self.records.get((user_token, key))
+
+    def store(self, transaction: Transaction, key: IdempotencyKey) -> None:
+        self.records[key.user_token, key.key] = IdempotencyRecord(
+            key.request_hash, transaction
+        )
+
+
+def get_idempotent_interactor(
+    results: list[bool | type[Exception]],
+) -> tuple[TransactionInteractor, StoredKeys, unittest.mock.Mock]:
+    stored = StoredKeys()
+    outcomes = iter(results)
+
+    # Keys are stored only by the transfers that commit, like the SQL repositories
+    def transfer(transaction: Transaction, key: IdempotencyKey) -> bool:
+        outcome = next(outcomes)
+        if outcome is RuntimeError:
+            raise RuntimeError
+        if outcome is ConnectionError:
+            stored.store(transaction, key)
+            raise ConnectionError
+        if outcome:
+            stored.store(transaction, key)
+        return bool(outcome)
+
+    wallet_repo = get_wallet_repo()
+    wallet_repo.__setattr__("get_wallet", get_wallet)
+    wallet_repo.__setattr__("get_wallets", get_wallets)
+    transaction_repo = unittest.mock.Mock()
+    transaction_repo.transfer.side_effect = transfer
+    interactor = get_transaction_interactor(
+        transaction_repo=transaction_repo,
+        wallet_repo=wallet_repo,
+        idempotency_repo=stored,
+    )
+    return interactor, stored, transaction_repo
+
+
+def test_do_transaction_retry_replays_response() -> None:
+    interactor, _, transaction_repo = get_idempotent_interactor([True])
+
+    first = interactor.do_transaction("test1", "test2", "test", Decimal("0.1"), "key")
+    retry = interactor.do_transaction("test1", "test2", "test", Decimal("0.1"), "key")
+
+    assert first == retry
+    assert retry.status == TransactionStatus.SUCCESS
+    assert transaction_repo.transfer.call_count == 1
+
+
+def test_do_transaction_key_passed_to_transfer() -> None:
+    interactor, _, transaction_repo = get_idempotent_interactor([True])
+
+    interactor.do_transaction("test1", "test2", "test", Decimal("0.5"), "key")
+
+    transaction_repo.transfer.assert_called_once_with(
+        Transaction("test1", "test2", Decimal("0.1"), Decimal("0.5")),
+        IdempotencyKey("test", "key", transfer_hash("test1", "test2", Decimal("0.5"))),
+    )
+
+
+def test_do_transaction_key_reused_for_other_request() -> None:
+    interactor, _, transaction_repo = get_idempotent_interactor([True])
+
+    interactor.do_transaction("test1", "test2", "test", Decimal("0.1"), "key")
+    response = interactor.do_transaction(
+        "test1", "test2", "test", Decimal("0.2"), "key"
+    )
+
+    assert response == TransactionResponse(
+        TransactionStatus.IDEMPOTENCY_KEY_REUSED, None
+    )
+    assert transaction_repo.transfer.call_count == 1
+
+
+def test_do_transaction_concurrent_duplicate_replays_winner() -> None:
+    interactor, stored, transaction_repo = get_idempotent_interactor([False])
+    winner = Transaction("test1", "test2", Decimal("0.1"), Decimal("0.5"))
+    key = IdempotencyKey("test", "key", transfer_hash("test1", "test2", Decimal("0.5")))
+
+    # The other request commits the key between our lookup and our transfer
+    def transfer(transaction: Transaction, _: IdempotencyKey) -> bool:
+        stored.store(winner, key)
+        return False
+
+    transaction_repo.transfer.side_effect = transfer
+    response = interactor.do_transaction(
+        "test1", "test2", "test", Decimal("0.5"), "key"
+    )
+
+    assert response == TransactionResponse(TransactionStatus.SUCCESS, winner)
+
+
+def test_do_transaction_rejected_key_not_stored() -> None:
+    interactor, _, transaction_repo = get_idempotent_interactor([False, False])
+
+    for _ in range(2):
+        response = interactor.do_transaction(
+            "test1", "test2", "test", Decimal("0.1"), "key"
+        )
+        assert response.status == TransactionStatus.BALANCE_INSUFFICIENT
+    assert transaction_repo.transfer.call_count == 2
+
+
+def test_do_transaction_failure_before_commit_can_be_retried() -> None:
+    interactor, _, transaction_repo = get_idempotent_interactor([RuntimeError, True])
+
+    with pytest.raises(RuntimeError):
+        interactor.do_transaction("test1", "test2", "test", Decimal("0.1"), "key")
+    response = interactor.do_transaction(
+        "test1", "test2", "test", Decimal("0.1"), "key"
+    )
+
+    assert response.status == TransactionStatus.SUCCESS
+    assert transaction_repo.transfer.call_count == 2
+
+
+def test_do_transaction_failure_after_commit_not_repeated() -> None:
+    interactor, _, transaction_repo = get_idempotent_interactor([ConnectionError])
+
+    with pytest.raises(ConnectionError):
+        interactor.do_transaction("test1", "test2", "test", Decimal("0.1"), "key")
+    response = interactor.do_transaction(
+        "test1", "test2", "test", Decimal("0.1"), "key"
+    )
+
+    assert response.status == TransactionStatus.SUCCESS
+    assert transaction_repo.transfer.call_count == 1
+
+
+def get_wallets(addresses: list[str]) -> list[Wallet]:
+    return [
+        wallet
+        for wallet in (get_wallet(address) for address in addresses)
+        if wallet is not None
+    ]
+
+
+def get_batch_interactor(results: list[bool]) -> TransactionInteractor:
+    wallet_repo = get_wallet_repo()
+    wallet_repo.__setattr__("get_wallets", get_wallets)
+    transaction_repo = get_transaction_repo([])
+    transaction_repo.__setattr__("transfer_many", lambda *_: results)
+    return get_transaction_interactor(
+        transaction_repo=transaction_repo, wallet_repo=wallet_repo
+    )
+
+
+def test_do_transactions_best_effort() -> None:
+    interactor = get_batch_interactor([True, False])
+    responses = interactor.do_transactions(
+        [
+            TransferRequest("test1", "test2", Decimal("0.1")),
+            TransferRequest("test1", "WRONG", Decimal("0.1")),
+            TransferRequest("test2", "test1", Decimal("0.1")),
+            TransferRequest("test1", "test3", Decimal("0.9")),
+        ],
+        "test",
+        atomic=False,
+    )
+    assert responses == [
+        TransactionResponse(
+            TransactionStatus.SUCCESS,
+            Transaction("test1", "test2", Decimal("0.1"), Decimal("0.1")),
+        ),
+        TransactionResponse(TransactionStatus.WALLET_NOT_FOUND, None),
+        TransactionResponse(TransactionStatus.UNAUTHORIZED, None),
+        TransactionResponse(TransactionStatus.BALANCE_INSUFFICIENT, None),
+    ]
+
+
+def test_do_transactions_prices_batch_at_once() -> None:
+    wallet_repo = get_wallet_repo()
+    wallet_repo.__setattr__("get_wallets", get_wallets)
+    transaction_repo = get_transaction_repo([])
+    transaction_repo.__setattr__("transfer_many", lambda *_: [True, True, True])
+    fee_provider = get_fee_provider(Decimal("0.1"))
+    interactor = get_transaction_interactor(
+        transaction_repo=transaction_repo,
+        wallet_repo=wallet_repo,
+        fee_provider=fee_provider,
+    )
+
+    interactor.do_transactions(
+        [
+            TransferRequest("test1", "test2", Decimal("0.1")),
+            TransferRequest("test1", "test3", Decimal("0.2")),
+            TransferRequest("test1", "test2", Decimal("0.3")),
+        ],
+        "test",
+        atomic=False,
+    )
+
+    # Same-owner transfers stay free and are left out of the pricing call
+    fee_provider.provide_many.assert_called_once_with(  # type: ignore
+        [Decimal("0.1"), Decimal("0.3")], "test"
+    )
+    fee_provider.provide.assert_not_called()  # type: ignore
+
+
+def test_fees_priced_by_username() -> None:
+    wallet_repo = get_wallet_repo()
+    wallet_repo.__setattr__("get_wallet", get_wallet)
+    wallet_repo.__setattr__("get_wallets", get_wallets)
+    transaction_repo = get_transaction_repo([])
+    transaction_repo.__setattr__("transfer_many", lambda *_: [True])
+    fee_provider = get_fee_provider(Decimal("0.1"))
+    interactor = get_transaction_interactor(
+        transaction_repo=transaction_repo,
+        user_repo=get_user_repo(User("alice", "test")),
+        wallet_repo=wallet_repo,
+        fee_provider=fee_provider,
+    )
+
+    interactor.do_transaction("test1", "test2", "test", Decimal("0.1"))
+    interactor.do_transactions(
+        [TransferRequest("test1", "test2", Decimal("0.2"))], "test", atomic=False
+    )
+
+    fee_provider.provide.assert_called_once_with(  # type: ignore
+        Decimal("0.1"), "alice"
+    )
+    fee_provider.provide_many.assert_called_once_with(  # type: ignore
+        [Decimal("0.2")], "alice"
+    )
+
+
+def test_do_transactions_atomic_aborts_on_validation_failure() -> None:
+    interactor = get_batch_interactor([True])
+    responses = interactor.do_transactions(
+        [
+            TransferRequest("test1", "test2", Decimal("0.1")),
+            TransferRequest("test1", "WRONG", Decimal("0.1")),
+        ],
+        "test",
+        atomic=True,
+    )
+    assert [response.status for response in responses] == [
+        TransactionStatus.ABORTED,
+        TransactionStatus.WALLET_NOT_FOUND,
+    ]
+
+
+def test_do_transactions_atomic_aborts_on_insufficient_balance() -> None:
+    interactor = get_batch_interactor([True, False])
+    responses = interactor.do_transactions(
+        [
+            TransferRequest("test1", "test2", Decimal("0.1")),
+            TransferRequest("test1", "test3", Decimal("0.9")),
+        ],
+        "test",
+        atomic=True,
+    )
+    assert [response.status for response in responses] == [
+        TransactionStatus.ABORTED,
+        TransactionStatus.BALANCE_INSUFFICIENT,
+    ]
+
+
+def test_do_transactions_wallet_gone_before_commit() -> None:
+    interactor = get_batch_interactor([True, False])
+    wallets = iter([get_wallets(["test1", "test2"]), get_wallets(["test1"])])
+    interactor._wallet_repo.__setattr__(  # type: ignore
+        "get_wallets", lambda _: next(wallets)
+    )
+    responses = interactor.do_transactions(
+        [
+            TransferRequest("test1", "test1", Decimal("0.1")),
+            TransferRequest("test1", "test2", Decimal("0.1")),
+        ],
+        "test",
+        atomic=False,
+    )
+    assert [response.status for response in responses] == [
+        TransactionStatus.SUCCESS,
+        TransactionStatus.WALLET_NOT_FOUND,
+    ]
@@ -8,9 +8,11 @@ from core.interactors.wallet_interactor import (
     WalletInfo,
     WalletInteractor,
     WalletResponse,
+    WalletsResponse,
     WalletStatus,
 )
 from core.models.user import User
+from core.models.wallet import Wallet
 from core.repositories.user_repository import UserRepository
 from core.repositories.wallet_repository import WalletRepository
 from tests.mock_repo import get_user_repo, get_wallet_repo
@@ -120,3 +122,57 @@ def test_get_wallet_rate_get_failed() -> None:
 
     result = wallet_interactor.get_wallet("test", "test")
     assert result.status == WalletStatus.FAILED_TO_GET_RATE
+
+
+def test_get_wallets_values_portfolio_with_one_rate() -> None:
+    rate_provider = get_rate_provider(Decimal(2))
+    wallet_repo = get_wallet_repo(
+        get_wallets_by_user_return=[
+            Wallet("test1", Decimal("0.5"), "test"),
+            Wallet("test2", Decimal(3), "test"),
+        ]
+    )
+    wallet_interactor = get_wallet_interactor(
+        wallet_repo=wallet_repo, rate_provider=rate_provider
+    )
+
+    assert wallet_interactor.get_wallets("test") == WalletsResponse(
+        WalletStatus.SUCCESS,
+        [
+            WalletInfo("test1", Decimal("0.5"), Decimal(1)),
+            WalletInfo("test2", Decimal(3), Decimal(6)),
+        ],
+    )
+    rate_provider.fetch.assert_called_once_with()  # type: ignore
+    wallet_repo.get_wallets_by_user.assert_called_once_with("test")  # type: ignore
+
+
+def test_get_wallets_unknown_user() -> None:
+    wallet_interactor = get_wallet_interactor(user_repo=get_user_repo(None))
+
+    assert wallet_interactor.get_wallets("wrong") == WalletsResponse(
+        WalletStatus.UNAUTHORIZED, []
+    )
+
+
+def test_get_wallets_empty_skips_rate() -> None:
+    rate_provider = get_rate_provider(None)
+    wallet_interactor = get_wallet_interactor(rate_provider=rate_provider)
+
+    assert wallet_interactor.get_wallets("test") == WalletsResponse(
+        WalletStatus.SUCCESS, []
+    )
+    rate_provider.fetch.assert_not_called()  # type: ignore
+
+
+def test_get_wallets_rate_unavailable() -> None:
+    wallet_interactor = get_wallet_interactor(
+        wallet_repo=get_wallet_repo(
+            get_wallets_by_user_return=[Wallet("test1", Decimal(1), "test")]
+        ),
+        rate_provider=get_rate_provider(None),
+    )
+
+    assert wallet_interactor.get_wallets("test") == WalletsResponse(
+        WalletStatus.FAILED_TO_GET_RATE, []
+    )
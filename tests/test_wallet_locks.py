@@ -0,0 +1,173 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from core.interactors.fee_provider import PercentageFeeProvider
+from core.interactors.transaction_interactor import (
+    BitcoinServiceTransactionInteractor,
+    TransactionStatus,
+    TransferRequest,
+)
+from core.interactors.wallet_locks import LockingTransactionInteractor, StripedLocks
+from core.models.idempotency import IdempotencyKey
+from core.models.transaction import Transaction
+from core.models.user import User
+from core.models.wallet import Wallet
+from tests.mock_repo import get_user_repo
+
+WALLETS = 8
+INITIAL_BALANCE = Decimal(1)
+FEE_RATIO = Decimal("0.01")
+
+
+class RacyLedger:
+    # Checks balances, but nothing stops another thread writing in between
+    def __init__(self) -> None:
+        self.balances = {f"wallet{i}": INITIAL_BALANCE for i in range(WALLETS)}
+        self.fees = Decimal(0)
+        # The platform's fee total is shared by every wallet, as in SQL it is
+        # updated atomically rather than under the wallet locks
+        self._fees_lock = threading.Lock()
+
+    def get_wallet(self, address: str) -> Wallet:
+        return Wallet(address, self.balances[address], f"user-{address}")
+
+    def get_wallets(self, addresses: list[str]) -> list[Wallet]:
+        return [self.get_wallet(address) for address in addresses]
+
+    def transfer(
+        self, transaction: Transaction, idempotency_key: IdempotencyKey | None = None
+    ) -> bool:
+        return self.transfer_many([transaction], atomic=True)[0]
+
+    def transfer_many(
+        self,
+        transactions: list[Transaction],
+        atomic: bool,
+        idempotency_keys: list[IdempotencyKey | None] | None = None,
+    ) -> list[bool]:
+        touched = {
+            address
+            for transaction in transactions
+            for address in (
+                transaction.from_wallet_address,
+                transaction.to_wallet_address,
+            )
+        }
+        balances = {address: self.balances[address] for address in touched}
+        results = []
+        for transaction in transactions:
+            debit = transaction.amount + transaction.fee
+            results.append(balances[transaction.from_wallet_address] >= debit)
+            if results[-1]:
+                balances[transaction.from_wallet_address] -= debit
+                balances[transaction.to_wallet_address] += transaction.amount
+        if atomic and not all(results):
+            return results
+
+        # Yield between the read and the write to invite interleaving
+        time.sleep(0)
+        self.balances.update(balances)
+        with self._fees_lock:
+            self.fees += sum(
+                transaction.fee
+                for transaction, success in zip(transactions, results)
+                if success
+            )
+        return results
+
+
+def locked_interactor(ledger: RacyLedger) -> LockingTransactionInteractor:
+    return LockingTransactionInteractor(
+        BitcoinServiceTransactionInteractor(
+            get_user_repo(User("user", "user")),
+            ledger,  # type: ignore
+            ledger,  # type: ignore
+            PercentageFeeProvider(FEE_RATIO),
+        ),
+        StripedLocks(),
+    )
+
+
+def test_stripes_acquired_in_order() -> None:
+    locks = StripedLocks(4)
+    addresses = [f"wallet{i}" for i in range(WALLETS)]
+
+    with locks.hold(addresses):
+        assert all(lock.locked() for lock in locks._locks)
+    assert not any(lock.locked() for lock in locks._locks)
+
+
+def test_disjoint_wallets_held_in_parallel() -> None:
+    locks = StripedLocks()
+    pairs = [("wallet0", "wallet1"), ("wallet2", "wallet3")]
+    assert len({locks.stripe(address) for pair in pairs for address in pair}) == 4
+    barrier = threading.Barrier(2, timeout=5)
+
+    def hold(pair: tuple[str, str]) -> None:
+        with locks.hold(pair):
+            # Only passes if the other pair is held at the same time
+            barrier.wait()
+
+    with ThreadPoolExecutor(2) as executor:
+        for future in [executor.submit(hold, pair) for pair in pairs]:
+            future.result()
+
+
+def test_opposite_transfers_do_not_deadlock() -> None:
+    locks = StripedLocks()
+    counter = [0]
+
+    def hold(addresses: list[str]) -> None:
+        with locks.hold(addresses):
+            counter[0] += 1
+
+    with ThreadPoolExecutor(16) as executor:
+        futures = [
+            executor.submit(
+                hold,
+                ["wallet0", "wallet1"] if index % 2 else ["wallet1", "wallet0"],
+            )
+            for index in range(2000)
+        ]
+        for future in futures:
+            future.result(timeout=10)
+    assert counter[0] == 2000
+
+
+def test_concurrent_transfers_never_overdraw() -> None:
+    ledger = RacyLedger()
+    interactor = locked_interactor(ledger)
+    rng = random.Random(7)
+
+    def transfer(index: int) -> list[TransactionStatus]:
+        source, destination = rng.sample(sorted(ledger.balances), 2)
+        amount = Decimal(rng.randint(1, 40)) / 100
+        if index % 10:
+            response = interactor.do_transaction(
+                source, destination, f"user-{source}", amount
+            )
+            return [response.status]
+        responses = interactor.do_transactions(
+            [
+                TransferRequest(source, destination, amount),
+                TransferRequest(source, destination, amount),
+            ],
+            f"user-{source}",
+            atomic=True,
+        )
+        return [response.status for response in responses]
+
+    with ThreadPoolExecutor(32) as executor:
+        statuses = [
+            status
+            for result in executor.map(transfer, range(5000))
+            for status in result
+        ]
+
+    assert TransactionStatus.SUCCESS in statuses
+    assert TransactionStatus.BALANCE_INSUFFICIENT in statuses
+    assert min(ledger.balances.values()) >= 0
+    assert sum(ledger.balances.values()) + ledger.fees == WALLETS * INITIAL_BALANCE